@@ -5,6 +5,9 @@ import sys
 import json
 import hashlib
 import re
+import contextlib
+import copy
+import tempfile
 from dotenv import load_dotenv, find_dotenv
 
 from datetime import datetime
@@ -39,6 +42,7 @@ from src.engines.SearchEngineNews import NewsSearchEngine
 from src.state.StateManager import StateManager
 from src.utils.ExcelResultsExporter import ExcelResultsExporter
 from src.filters.FilterEngine import FilterEngine
+from src.pipeline.StreamingPipeline import StreamingPipeline
 
 # Configuración inicial de la página
 st.set_page_config(page_title="Buscador Inteligente", layout="wide")
@@ -105,11 +109,11 @@ def _hash_payload(payload: dict) -> str:
 def _ts_from_filename(name: str) -> str | None:
     """
     Extrae 'DD-MM-YYYY_HH-MM' de un nombre de estado.
-    Acepta patrones: '..._DD-MM-YYYY_HH-MM(.json)?'
+    Acepta patrones: '..._DD-MM-YYYY_HH-MM(.json|.sqlite)?'
     """
     if not name:
         return None
-    m = re.search(r"(\d{2}-\d{2}-\d{4})[_-](\d{2}-\d{2})(?:\.json)?$", name)
+    m = re.search(r"(\d{2}-\d{2}-\d{4})[_-](\d{2}-\d{2})(?:\.json|\.sqlite)?$", name)
     return f"{m.group(1)}_{m.group(2)}" if m else None
 
 def mostrar_filtros_ia():
@@ -176,10 +180,45 @@ def obtener_keywords(keyword, file_uploaded):
         return [keyword.strip()]
     return []
 
-def show_results(searcher, category):
-    df = pd.DataFrame.from_dict(searcher.final_results, orient="index")
+def show_results(searcher, category, pipeline=None):
+    with _pipeline_paused(pipeline):  # las etapas escriben final_results en paralelo
+        df = pd.DataFrame.from_dict(searcher.final_results, orient="index")
     log_manager.show_results(category, df)
 
+def _start_pipeline(searcher, category, run_ts):
+    """Pipeline en streaming (STREAMING_PIPELINE=1): filtra/clasifica/exporta mientras se busca."""
+    if os.getenv("STREAMING_PIPELINE", "0") != "1":
+        return None
+    return StreamingPipeline(
+        searcher,
+        searcher.filter_engine,
+        category,
+        exporter=ExcelResultsExporter(show_domain_only=False),
+        dir_path=EXPORT_DIR,
+        timestamp_str=run_ts,
+        log_manager=log_manager,
+    ).start()
+
+def _pipeline_paused(pipeline):
+    """Congela las etapas del pipeline mientras se toma un snapshot de estado."""
+    return pipeline.paused() if pipeline else contextlib.nullcontext()
+
+def _checkpoint(pipeline, searcher, category, **patch):
+    """
+    patch_state con el snapshot del motor. Con pipeline, el snapshot se copia bajo su cerrojo
+    y se escribe fuera de él: las etapas no esperan a la E/S del checkpoint.
+    """
+    with _pipeline_paused(pipeline):
+        patch.update(
+            results=searcher.final_results,
+            analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
+            engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
+            filter_stats=searcher.filter_engine.get_stats_dict(),
+        )
+        if pipeline:
+            patch = copy.deepcopy(patch)
+    return StateManager.patch_state(category, **patch)
+
 def _search_by_category(keywords, category, searcher_class, filter_class, apply_filter_ia, values_levels_ia, run_ts: str):
     """
     Ejecuta la búsqueda por categoría, guardando progreso y parando ante excepciones de proveedor.
@@ -202,66 +241,80 @@ def _search_by_category(keywords, category, searcher_class, filter_class, apply_
         timestamp_str=run_ts,
     )
 
-    processed = 0
-    for idx, kw in enumerate(keywords):
-        try:
-            # Guardamos progreso antes de empezar cada keyword
-            StateManager.patch_state(
-                category,
-                current_keyword=kw,
-                progress={
-                    "total_keywords": len(keywords),
-                    "processed_keywords": processed
-                },
-                remaining_keywords=keywords[idx:],  # incluye la actual
-                results=searcher.final_results,
-                analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
-                engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
-                filter_stats=searcher.filter_engine.get_stats_dict(),
-            )
+    pipeline = _start_pipeline(searcher, category, run_ts)
 
-            log_manager.log_state(f"🔍 Buscando '{kw}' en {category}...")
-            searcher.search(kw)
-            processed += 1
-
-            # Guardamos tras completar la keyword
-            StateManager.patch_state(
-                category,
-                progress={
-                    "total_keywords": len(keywords),
-                    "processed_keywords": processed
-                },
-                remaining_keywords=keywords[idx+1:],  # las que faltan
-                results=searcher.final_results,
-                analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
-                engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
-                filter_stats=searcher.filter_engine.get_stats_dict(),
-            )
+    processed = 0
+    try:
+        for idx, kw in enumerate(keywords):
+            try:
+                # Guardamos progreso antes de empezar cada keyword
+                _checkpoint(
+                    pipeline, searcher, category,
+                    current_keyword=kw,
+                    progress={
+                        "total_keywords": len(keywords),
+                        "processed_keywords": processed
+                    },
+                    remaining_keywords=keywords[idx:],  # incluye la actual
+                )
 
-        except (ProviderRateLimitError, ProviderBlockedError, NetworkError) as e:
-            # Guardamos y paramos: el usuario puede retomar luego
-            StateManager.mark_error(
-                category=category,
-                error_type=type(e).__name__,
-                message=getattr(e, "message", str(e)),
-                remaining_keywords=keywords[idx:],
-                current_keyword=kw,
-                progress={
-                    "total_keywords": len(keywords),
-                    "processed_keywords": processed
-                },
-                results=searcher.final_results,
-                analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
-                engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
-                filter_stats=searcher.filter_engine.get_stats_dict(),
-            )
-            st.error(f"⛔ Búsqueda interrumpida por {type(e).__name__}: {getattr(e, 'message', e)}")
-            return None
+                log_manager.log_state(f"🔍 Buscando '{kw}' en {category}...")
+                searcher.search(kw)
+                processed += 1
+
+                if pipeline:
+                    # Motores sin callback: se encola lo pendiente de esta keyword
+                    pipeline.feed_pending()
+                else:
+                    # Filtrado incremental: solo lo nuevo/modificado de esta keyword
+                    searcher.filter_engine.filter_and_classify_items(searcher, item_type=category)
+                show_results(searcher, category, pipeline)
+
+                # Guardamos tras completar la keyword
+                _checkpoint(
+                    pipeline, searcher, category,
+                    progress={
+                        "total_keywords": len(keywords),
+                        "processed_keywords": processed
+                    },
+                    remaining_keywords=keywords[idx+1:],  # las que faltan
+                )
 
-    # Filtrado final sobre todo el conjunto acumulado
+            except (ProviderRateLimitError, ProviderBlockedError, NetworkError) as e:
+                # Drenamos el pipeline para no perder lo ya ingerido
+                if pipeline:
+                    pipeline.close()
+                # Guardamos y paramos: el usuario puede retomar luego
+                StateManager.mark_error(
+                    category=category,
+                    error_type=type(e).__name__,
+                    message=getattr(e, "message", str(e)),
+                    remaining_keywords=keywords[idx:],
+                    current_keyword=kw,
+                    progress={
+                        "total_keywords": len(keywords),
+                        "processed_keywords": processed
+                    },
+                    results=searcher.final_results,
+                    analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
+                    engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
+                    filter_stats=searcher.filter_engine.get_stats_dict(),
+                )
+                st.error(f"⛔ Búsqueda interrumpida por {type(e).__name__}: {getattr(e, 'message', e)}")
+                return None
+
+        if pipeline:
+            stream_path = pipeline.close()
+            if stream_path:
+                log_manager.log_state(f"💾 NDJSON en streaming: {stream_path}")
+    finally:
+        # cualquier otra excepción (o st.stop()) no deja hilos vivos ni el NDJSON abierto
+        if pipeline:
+            pipeline.close()
+
+    # Pasada final: solo pendientes (p. ej. IA diferida con INCREMENTAL_AI=0)
     if searcher and searcher.filter_engine:
-        searcher.final_results = {}
-        searcher.filter_engine.filter_and_classify_items(searcher, item_type=category)
+        searcher.filter_engine.filter_and_classify_items(searcher, item_type=category, run_ai=True)
 
     # Si completó sin errores
     StateManager.mark_completed(
@@ -280,18 +333,35 @@ def _search_by_category(keywords, category, searcher_class, filter_class, apply_
     return searcher
 
 def _parse_saved_state_from_upload(uploaded_file):
-    """Lee JSON de estado desde el file_uploader (no busca nada automáticamente)."""
+    """
+    Lee el estado desde el file_uploader (no busca nada automáticamente).
+    Un .sqlite se vuelca a un fichero temporal y se lee de forma perezosa; se devuelve
+    también esa ruta para sembrar el estado ligado (y liberarla después).
+    """
     if not uploaded_file:
-        return None, "Debes subir un archivo JSON de estado."
+        return None, "Debes subir un archivo JSON o SQLite de estado.", None
+    seed_path = None
     try:
-        content = uploaded_file.read().decode("utf-8", errors="ignore")
-        data = json.loads(content)
+        if (uploaded_file.name or "").lower().endswith(".sqlite"):
+            fd, seed_path = tempfile.mkstemp(prefix=".upload_state_", suffix=".sqlite")
+            with os.fdopen(fd, "wb") as f:
+                f.write(uploaded_file.read())
+            data = StateManager.read_state_file(seed_path)
+            if data is None:
+                raise ValueError("base de datos sin estado")
+        else:
+            content = uploaded_file.read().decode("utf-8", errors="ignore")
+            data = json.loads(content)
     except Exception as e:
-        return None, f"Formato inválido de archivo de estado: {e}"
+        if seed_path:
+            StateManager.release_state_file(seed_path, delete=True)
+        return None, f"Formato inválido de archivo de estado: {e}", None
     for key in ("category", "remaining_keywords", "engine_state"):
         if key not in data:
-            return None, f"Falta la clave '{key}' en el archivo de estado."
-    return data, None
+            if seed_path:
+                StateManager.release_state_file(seed_path, delete=True)
+            return None, f"Falta la clave '{key}' en el archivo de estado.", None
+    return data, None, seed_path
 
 # ---(((((( INTERFAZ PRINCIPAL ))))))---
 main_action = st.sidebar.selectbox("¿Qué quieres hacer?", ["Nueva Búsqueda", "Retomar Búsqueda"])
@@ -303,8 +373,8 @@ if main_action == "Nueva Búsqueda":
     if st.sidebar.checkbox("🧠 Filtro IA", key="ia_filter"):
         mostrar_filtros_ia()
 else:
-    # Retomar/Cargar: cargar un JSON de estado (lo decide la persona usuaria)
-    state_file = st.sidebar.file_uploader("📁 Sube el archivo .json de estado guardado", type=["json"], key="resume_file")
+    # Retomar/Cargar: cargar un estado .json / .sqlite (lo decide la persona usuaria)
+    state_file = st.sidebar.file_uploader("📁 Sube el archivo de estado guardado (.json o .sqlite)", type=["json", "sqlite"], key="resume_file")
 
 # ---(((((( BOTÓN DE EJECUCIÓN ))))))---
 if st.sidebar.button("🔍 Ejecutar búsqueda"):
@@ -475,10 +545,10 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
     elif main_action == "Retomar Búsqueda":
         # 1) Validar archivo subido
         if not state_file:
-            st.warning("Debes subir un archivo .json de estado para retomar.")
+            st.warning("Debes subir un archivo .json o .sqlite de estado para retomar.")
             st.stop()
 
-        saved_state, err = _parse_saved_state_from_upload(state_file)
+        saved_state, err, seed_path = _parse_saved_state_from_upload(state_file)
         if err:
             st.error(err)
             st.stop()
@@ -488,10 +558,10 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
         remaining_keywords = saved_state.get("remaining_keywords", []) or []
         params = saved_state.get("params", {}) or {}
         engine_snap = saved_state.get("engine_state")
-        prev_results = saved_state.get("results", {}) or {}
-        prev_analysed = saved_state.get("analiced_ids", []) or []
 
         if not state_category:
+            if seed_path:
+                StateManager.release_state_file(seed_path, delete=True)
             st.error("El archivo no indica 'category'.")
             st.stop()
 
@@ -502,6 +572,8 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
         }
         engine_cls = categories.get(state_category)
         if not engine_cls:
+            if seed_path:
+                StateManager.release_state_file(seed_path, delete=True)
             st.error(f"Categoría no reconocida en el estado: {state_category}")
             st.stop()
 
@@ -512,8 +584,16 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
         StateManager.bind_state_basename(
             category=state_category,
             basename_without_ext=basename_no_ext,
-            seed_dict=saved_state  # sembrar el fichero local con el contenido subido
+            seed_dict=None if seed_path else saved_state,  # sembrar el fichero local con el contenido subido
+            seed_path=seed_path,
         )
+        if seed_path:
+            # a partir de aquí se lee (perezosamente) del estado ligado, no del temporal
+            saved_state = StateManager.load_state(state_category)
+            StateManager.release_state_file(seed_path, delete=True)
+            remaining_keywords = saved_state.get("remaining_keywords", []) or []
+            params = saved_state.get("params", {}) or {}
+            engine_snap = saved_state.get("engine_state")
 
         # Fijar run_ts desde el nombre, si lo contiene
         ts_from_name = _ts_from_filename(uploaded_name)
@@ -526,15 +606,15 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
             try:
                 searcher.load_state_snapshot(engine_snap)
             except Exception:
-                searcher.final_results = prev_results
+                searcher.final_results = saved_state.get("results", {}) or {}
                 try:
-                    searcher.ia_analyzed_ids = set(prev_analysed)
+                    searcher.ia_analyzed_ids = set(saved_state.get("analiced_ids", []) or [])
                 except Exception:
                     pass
         else:
-            searcher.final_results = prev_results
+            searcher.final_results = saved_state.get("results", {}) or {}
             try:
-                searcher.ia_analyzed_ids = set(prev_analysed)
+                searcher.ia_analyzed_ids = set(saved_state.get("analiced_ids", []) or [])
             except Exception:
                 pass
 
@@ -575,40 +655,43 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
         )
 
         # 7) Bucle de retomado
+        pipeline = _start_pipeline(searcher, state_category, st.session_state.get("current_run_ts"))
+
         def _resume_loop():
             processed = saved_state.get("progress", {}).get("processed_keywords", 0)
             total = saved_state.get("progress", {}).get("total_keywords", processed + len(remaining_keywords))
 
             for idx, kw in enumerate(remaining_keywords):
                 try:
-                    StateManager.patch_state(
-                        state_category,
+                    _checkpoint(
+                        pipeline, searcher, state_category,
                         timestamp_str=st.session_state.get("current_run_ts"),
                         current_keyword=kw,
                         progress={"total_keywords": total, "processed_keywords": processed},
                         remaining_keywords=remaining_keywords[idx:],
-                        results=searcher.final_results,
-                        filter_stats=searcher.filter_engine.get_stats_dict(),
-                        analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
-                        engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
                     )
 
                     log_manager.log_state(f"🔍 Retomando '{kw}' en {state_category}...")
                     searcher.search(kw)
                     processed += 1
 
-                    StateManager.patch_state(
-                        state_category,
+                    if pipeline:
+                        pipeline.feed_pending()
+                    else:
+                        # Filtrado incremental: solo lo nuevo/modificado de esta keyword
+                        searcher.filter_engine.filter_and_classify_items(searcher, item_type=state_category)
+                    show_results(searcher, state_category, pipeline)
+
+                    _checkpoint(
+                        pipeline, searcher, state_category,
                         timestamp_str=st.session_state.get("current_run_ts"),
                         progress={"total_keywords": total, "processed_keywords": processed},
                         remaining_keywords=remaining_keywords[idx+1:],
-                        results=searcher.final_results,
-                        filter_stats=searcher.filter_engine.get_stats_dict(),
-                        analiced_ids=list(getattr(searcher, "ia_analyzed_ids", [])),
-                        engine_state=searcher.get_state_snapshot() if hasattr(searcher, "get_state_snapshot") else None,
                     )
 
                 except (ProviderRateLimitError, ProviderBlockedError, NetworkError) as e:
+                    if pipeline:
+                        pipeline.close()
                     StateManager.mark_error(
                         category=state_category,
                         timestamp_str=st.session_state.get("current_run_ts"),
@@ -626,10 +709,14 @@ if st.sidebar.button("🔍 Ejecutar búsqueda"):
                     return None
             return True
 
-        ok = _resume_loop()
+        try:
+            ok = _resume_loop()
+        finally:
+            # también ante excepciones no previstas o st.stop(): sin hilos vivos ni NDJSON abierto
+            if pipeline:
+                pipeline.close()
         if ok is not None:
-            searcher.final_results = {}
-            searcher.filter_engine.filter_and_classify_items(searcher, item_type=state_category)
+            searcher.filter_engine.filter_and_classify_items(searcher, item_type=state_category, run_ai=True)
 
         log_manager.render_all_tables()
         if ok is None:
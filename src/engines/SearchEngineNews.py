@@ -7,13 +7,20 @@ from requests.adapters import HTTPAdapter, Retry
 from dotenv import load_dotenv, find_dotenv
 import time
 from urllib.parse import urlparse
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait, FIRST_COMPLETED
+import heapq
 import hashlib
+import threading
 
 from src.utils.Methods import Methods
 from src.utils.Errors import ProviderRateLimitError, ProviderBlockedError, NetworkError, ProviderBadQueryError
 from src.utils.SearchQueryBuilder import SearchQueryBuilder
 from src.utils.DescriptionExtractor import DescriptionExtractor
+from src.utils.UrlMetadataCache import UrlMetadataCache
+from src.utils.DomainHealth import DomainHealth
+from src.utils.EnrichmentQueue import EnrichmentQueue
+from src.utils.HttpCache import HttpCache
 
 
 class NewsSearchEngine:
@@ -24,6 +31,9 @@ class NewsSearchEngine:
     - Límite de páginas por query (por defecto 3)
     """
 
+    # campos de contenido que un master hereda al fusionar duplicados (nunca salidas cacheadas de filtros/IA)
+    _MERGE_FIELDS = ("Title", "Summary", "Year", "Date", "URL", "Language")
+
     def __init__(
         self,
         ia_analyzed_ids=None,
@@ -45,12 +55,29 @@ class NewsSearchEngine:
         # Flags de depuración
         self.debug = os.getenv("DEBUG_LOGS", "0") == "1"
         self.trace_enrich = os.getenv("ENRICH_TRACE", "0") == "1"
+        # Nº de descargas de enriquecimiento simultáneas (cada dominio sigue con una a la vez)
+        self.enrich_concurrency = max(1, int(os.getenv("ENRICH_CONCURRENCY", "16")))
+        # Candidatos que se sacan de la cola por tanda: max_total × este factor (margen para
+        # presupuestos por dominio, caché y dominios aparcados); el resto sigue en la cola
+        self.enrich_candidate_factor = max(1.0, float(os.getenv("ENRICH_CANDIDATE_FACTOR", "3")))
+        # Caché persistente de metadatos por URL (desc/lang/canonical), con TTL positivo y negativo
+        self.url_cache = UrlMetadataCache() if os.getenv("ENRICH_CACHE", "1") == "1" else None
+        # Salud por dominio (éxito, latencia, estados): adapta pausa/concurrencia y aparca dominios estériles
+        self.domain_health = DomainHealth() if os.getenv("DOMAIN_HEALTH", "1") == "1" else None
 
         # ------------------------- Estado -------------------------
         self.keyword = ""
         self.ia_analyzed_ids = set(ia_analyzed_ids or [])
         self.final_results = final_results or {}
         self.raw_items = {}
+        # IDs nuevos o modificados desde la última pasada de filtros (filtrado incremental)
+        self.dirty_ids = set()
+        # Aviso opcional (pipeline en streaming): se llama sin argumentos cuando la ingesta deja dirty_ids
+        self.on_dirty = None
+        # Cerrojo del estado (raw_items, índices, dirty_ids): lo comparten ingesta y etapas del pipeline en streaming
+        self.lock = threading.RLock()
+        # Cola persistente de enriquecimiento (intentos + siguiente instante elegible)
+        self.enrich_queue = EnrichmentQueue()
         self.gnews_ids = set(gnews_ids or [])       # GNews
         self.newsapi_ids = set(newsapi_ids or [])   # NewsAPI
         self.serpapi_ids = set(serpapi_ids or [])   # SerpAPI
@@ -76,6 +103,11 @@ class NewsSearchEngine:
         self.enable_summary_fallback = True           # usar resumen si los títulos difieren
         self.summary_hamming_threshold = 12           # umbral para SimHash de resumen (64 bits)
         self.summary_jaccard_min = 0.70               # antes 0.75
+        # Re-dedup tras enriquecer: ítems con canónica/resumen nuevos se sondean contra los índices
+        self.redup_after_enrich = os.getenv("REDUP_AFTER_ENRICH", "1") == "1"
+        self.summary_bands = 8                        # bandas LSH del simhash de resumen
+        self._idx_by_summary_band = None              # (banda, valor) -> [master_id,...] (perezoso)
+        self._redup_ids = set()
 
         # ------------------------- Logging -------------------------
         self.log_manager = log_manager
@@ -107,7 +139,13 @@ class NewsSearchEngine:
             respect_retry_after_header=True,
             raise_on_status=False,
         )
-        self.session.mount("https://", HTTPAdapter(max_retries=retries))
+        # El pool cubre muchos dominios a la vez durante el enriquecimiento concurrente
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=64, pool_maxsize=max(10, self.enrich_concurrency))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Caché HTTP condicional (ETag/Last-Modified): páginas sin cambios vuelven como 304
+        self.http_cache = HttpCache() if os.getenv("HTTP_CACHE", "1") == "1" else None
 
         # ------------------------- Rate limit -------------------------
         self.min_interval = {
@@ -217,6 +255,12 @@ class NewsSearchEngine:
     def _note_success(self, host: str):
         self._block_counters[host] = 0
 
+    def _http_get(self, url: str, params=None, headers=None):
+        """GET con validadores ETag/Last-Modified si la caché HTTP está activa (304 → cuerpo cacheado)."""
+        if self.http_cache is not None:
+            return self.http_cache.get(self.session, url, params=params, headers=headers, timeout=self.timeout)
+        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
     def _request_json(self, url: str, params: dict, source_host: str) -> dict:
         # Log de salida (ocultando credenciales)
         if self.debug:
@@ -228,7 +272,7 @@ class NewsSearchEngine:
 
         self._respect_rate_limit(source_host)
         try:
-            resp = self.session.get(url, params=params, timeout=self.timeout)
+            resp = self._http_get(url, params=params)
         except requests.RequestException as e:
             raise NetworkError(f"[{source_host}] Error de red: {e}") from e
 
@@ -256,7 +300,7 @@ class NewsSearchEngine:
             time.sleep(self.base_sleep + random.uniform(0, 1))
             self._respect_rate_limit(source_host)
             try:
-                resp = self.session.get(url, params=params, timeout=self.timeout)
+                resp = self._http_get(url, params=params)
             except requests.RequestException as e:
                 raise NetworkError(f"[{source_host}] Error de red tras reintento: {e}") from e
 
@@ -1027,14 +1071,6 @@ class NewsSearchEngine:
     def _enrich_missing_summaries(self, max_items=80, per_domain_budget=5, prefer_sources=("GDELT", "SerpAPI.GoogleNews", "NewsData")):
         self.log_manager.log_state(f"🟠 Enriqueciendo resúmenes vacíos (máx {max_items}; {per_domain_budget}/dominio)…")
 
-        # Crea extractor con la sesión del motor (si la clase la soporta)
-        try:
-            extractor = DescriptionExtractor(self.session)
-        except TypeError:
-            extractor = DescriptionExtractor()
-            if hasattr(extractor, "session"):
-                extractor.session = self.session
-
         done = 0
         budget = {}
 
@@ -1064,12 +1100,18 @@ class NewsSearchEngine:
             dom = self._domain(url)
             if budget.get(dom, 0) >= per_domain_budget:
                 continue
+            if self.domain_health is not None and self.domain_health.should_skip(dom):
+                continue
 
-            info = extractor.extract(url)
+            info = self._fetch_description(url)
             desc = info.get("desc") or ""
             if desc:
                 it["Summary"] = desc
                 it["NeedsEnrichment"] = False
+                it.pop("_sum_simhash64", None)
+                self.enrich_queue.done(it.get("ID"))
+                self._redup_ids.add(it.get("ID"))
+                self._mark_dirty(it.get("ID"))
                 if info.get("lang") and not it.get("Language"):
                     it["Language"] = info["lang"]
 
@@ -1083,10 +1125,13 @@ class NewsSearchEngine:
                 done += 1
                 budget[dom] = budget.get(dom, 0) + 1
 
+        if self.domain_health is not None:
+            self.domain_health.save()
+        self.redup_pending()
         self._log(f"🟢 Enriquecidos: {done}")
 
     def enrich_all_pending(self, max_total=200, per_domain_budget=6, min_gap=1.1,
-                           backoff_on_block=True, overflow=True, time_budget_s=180):
+                           backoff_on_block=True, overflow=True, time_budget_s=180, concurrency=None):
         """
         Enriquecer descripciones faltantes antes de filtrar/IA.
         - max_total: tope de URLs a enriquecer en esta pasada
@@ -1095,111 +1140,185 @@ class NewsSearchEngine:
         - backoff_on_block: si vemos 403/429, multiplicamos pausa
         - overflow: si sobran cupos, se reciclan a dominios con cola
         - time_budget_s: presupuesto de tiempo para esta pasada
+        - concurrency: descargas simultáneas (por defecto ENRICH_CONCURRENCY)
+
+        Planificador concurrente: cola de dominios ordenada por su siguiente instante permitido
+        (heap). Hay muchos dominios en vuelo a la vez, cada uno con las peticiones simultáneas que
+        permita su salud y respetando min_gap/backoff entre hits; el volcado al ítem se hace en este hilo.
+
+        Los candidatos salen de self.enrich_queue (los elegibles, más recientes primero; como mucho
+        max_total × ENRICH_CANDIDATE_FACTOR): éxito → done, fallo → defer con backoff, no intentados → requeue.
         """
-        from collections import defaultdict
+        queue = self.enrich_queue
 
-        # 1) candidatos: sin resumen, con URL, dentro de 2020–2025
+        # 1) candidatos: elegibles en la cola (sin resumen, con URL, dentro de 2020–2025)
         cand = []
-        for mid, it in self.raw_items.items():
-            if it.get("NeedsEnrichment") and (it.get("URL") or "").strip():
-                y = it.get("Year")
-                if y and 2020 <= int(y) <= 2025:
-                    url = it["URL"].strip()
-                    dom = Methods._domain_of(Methods.normalize_url(url), (it.get("Source") or [""])[0])
-                    cand.append((mid, url, dom))
-        # ordena por fecha desc (si la tienes) para priorizar lo reciente
-        cand.sort(key=lambda t: (self.raw_items[t[0]].get("Date") or ""), reverse=True)
-
-        quotas = defaultdict(lambda: per_domain_budget)
+        max_cand = int(max_total * self.enrich_candidate_factor)
+        while len(cand) < max_cand:
+            mid = queue.pop()
+            if mid is None:
+                break
+            if not self.needs_enrichment(mid):
+                queue.done(mid)
+                continue
+            it = self.raw_items[mid]
+            url = it["URL"].strip()
+            dom = Methods._domain_of(Methods.normalize_url(url), (it.get("Source") or [""])[0])
+            cand.append((mid, url, dom))
+
         next_ok = defaultdict(float)  # siguiente instante permitido por dominio
-        processed = 0
         started = time.time()
+        workers = max(1, concurrency or self.enrich_concurrency)
+        health = self.domain_health
 
         # helper: extractor compartido
-        extractor = getattr(self, "_desc_extractor", None)
-        if extractor is None:
-            try:
-                self._desc_extractor = DescriptionExtractor(self.session)
-            except TypeError:
-                self._desc_extractor = DescriptionExtractor()
-                if hasattr(self._desc_extractor, "session"):
-                    self._desc_extractor.session = self.session
-            extractor = self._desc_extractor
+        self._get_desc_extractor()
+
+        # 1b) caché de metadatos: los aciertos no pasan por red ni por el pacing por dominio;
+        #     los negativos vigentes se saltan (no se repite el fallo ni su backoff)
+        from_cache, cached_neg = 0, 0
+        if self.url_cache is not None:
+            rest = []
+            for mid, url, dom in cand:
+                hit = self._cached_description(url)
+                if hit is None:
+                    rest.append((mid, url, dom))
+                elif not hit.get("desc"):
+                    cached_neg += 1
+                    queue.defer(mid)
+                elif from_cache < max_total and self._apply_enrichment(mid, url, hit):
+                    from_cache += 1
+                else:
+                    queue.requeue(mid)
+            cand = rest
+
+        # 1c) dominios aparcados por la salud por dominio (fallan de forma sistemática):
+        #     se difieren hasta que expire la suspensión, sin contar intento
+        parked = set()
+        if health is not None:
+            parked = {dom for _, _, dom in cand if health.should_skip(dom)}
+            for mid, _, dom in cand:
+                if dom in parked:
+                    queue.defer(mid, delay=health.domains[dom]["skip_until"] - time.time(), attempt=False)
+            cand = [c for c in cand if c[2] not in parked]
 
         if self.trace_enrich:
-            pending_est = sum(1 for it in self.raw_items.values() if it.get("NeedsEnrichment") and (it.get("URL") or "").strip())
-            self._log(f"🔎 Enrichment batch: candidatos={pending_est} max_total={max_total} per_domain={per_domain_budget}")
-
-        # 2) primera pasada: respetando presupuesto por dominio
-        leftovers = []
-        for mid, url, dom in cand:
-            if processed >= max_total or (time.time() - started) > time_budget_s:
-                leftovers.append((mid, url, dom))
-                continue
-            if quotas[dom] <= 0:
-                leftovers.append((mid, url, dom))
-                continue
-
-            if self.trace_enrich:
-                self._log(f"  · {dom} quota={quotas[dom]} wait={max(0.0, next_ok[dom]-time.time()):.2f}s URL={url[:90]}")
-
-            # pacing por dominio
-            wait = max(0.0, next_ok[dom] - time.time())
-            if wait > 0:
-                time.sleep(wait + random.uniform(0, 0.2))
-
-            res = extractor.extract(url)
-            desc, lang, canonical = res.get("desc", ""), res.get("lang"), res.get("canonical")
-
-            # backoff si parece bloqueado (heurística mínima)
-            blocked = (desc == "") and (lang is None)
-            if blocked and backoff_on_block:
-                next_ok[dom] = time.time() + (min_gap * 6)
-                continue
-
-            if canonical and canonical != url:
-                if self.trace_enrich:
-                    self._log(f"    ↪ canónica detectada: {canonical}")
-                self._maybe_reindex_to_canonical(mid, canonical)
-
-            if desc:
-                it = self.raw_items[mid]
-                it["Summary"] = desc
-                it["Language"] = lang or it.get("Language")
-                it["NeedsEnrichment"] = False
-                processed += 1
-                quotas[dom] -= 1
-
-            next_ok[dom] = time.time() + min_gap + random.uniform(0, 0.4)
-
-        # 3) overflow: reparte cupos sobrantes (opcional)
-        if overflow and processed < max_total:
-            remaining = max_total - processed
-            for mid, url, dom in leftovers:
-                if remaining <= 0 or (time.time() - started) > time_budget_s:
-                    break
-
-                wait = max(0.0, next_ok[dom] - time.time())
-                if wait > 0:
-                    time.sleep(wait + random.uniform(0, 0.2))
-
-                res = extractor.extract(url)
-                desc, lang, canonical = res.get("desc", ""), res.get("lang"), res.get("canonical")
-                if not desc:
-                    next_ok[dom] = time.time() + (min_gap * (6 if backoff_on_block else 1))
+            self._log(f"🔎 Enrichment batch: candidatos={len(cand)} max_total={max_total} "
+                      f"per_domain={per_domain_budget} concurrencia={workers} "
+                      f"caché={from_cache} (+{cached_neg} negativos) dominios aparcados={len(parked)}")
+
+        def _out_of_time():
+            return (time.time() - started) > time_budget_s
+
+        def _slots(dom):
+            return health.slots(dom) if health is not None else 1
+
+        def _gap(dom):
+            return health.gap(dom, min_gap) if health is not None else min_gap
+
+        def _schedule(queues: dict, limit: int, quota: int | None, pool) -> tuple[int, list]:
+            """
+            Procesa las colas por dominio hasta `limit` éxitos. quota=None → sin tope por dominio.
+            Devuelve (enriquecidos, sobrantes no intentados).
+            """
+            done_ok = 0
+            used = defaultdict(int)
+            busy = defaultdict(int)  # peticiones en vuelo por dominio (máx. _slots(dom))
+            ready = [(next_ok[dom], i, dom) for i, dom in enumerate(queues)]
+            heapq.heapify(ready)
+            queued = set(queues)     # dominios presentes en el heap
+            seq = len(ready)
+            inflight = {}  # future -> (mid, url, dom)
+
+            def _requeue(dom):
+                nonlocal seq
+                if dom in queued or not queues[dom] or busy[dom] >= _slots(dom):
+                    return
+                if quota is not None and used[dom] + busy[dom] >= quota:
+                    return
+                if health is not None and health.should_skip(dom):
+                    return
+                seq += 1
+                queued.add(dom)
+                heapq.heappush(ready, (next_ok[dom], seq, dom))
+
+            while ready or inflight:
+                # lanza todo lo que ya está listo mientras haya hueco
+                while (ready and len(inflight) < workers and done_ok + len(inflight) < limit
+                       and not _out_of_time() and ready[0][0] <= time.time()):
+                    _, _, dom = heapq.heappop(ready)
+                    queued.discard(dom)
+                    if not queues[dom] or (health is not None and health.should_skip(dom)):
+                        continue
+                    mid, url = queues[dom].popleft()
+                    busy[dom] += 1
+                    if self.trace_enrich:
+                        self._log(f"  · {dom} usados={used[dom]} en_vuelo={busy[dom]} URL={url[:90]}")
+                    inflight[pool.submit(self._fetch_description, url, False)] = (mid, url, dom)
+                    # dominios sanos admiten más de una petición a la vez (escalonadas)
+                    next_ok[dom] = time.time() + _gap(dom) / _slots(dom)
+                    _requeue(dom)
+
+                if not inflight:
+                    if not ready or done_ok >= limit or _out_of_time():
+                        break
+                    # nadie en vuelo: duerme hasta que el primer dominio esté listo
+                    time.sleep(max(0.0, ready[0][0] - time.time()) + random.uniform(0, 0.2))
                     continue
 
-                if canonical and canonical != url:
-                    self._maybe_reindex_to_canonical(mid, canonical)
-
-                it = self.raw_items[mid]
-                it["Summary"] = desc
-                it["Language"] = lang or it.get("Language")
-                it["NeedsEnrichment"] = False
-                remaining -= 1
-                processed += 1
-                next_ok[dom] = time.time() + min_gap + random.uniform(0, 0.4)
-
+                timeout = None
+                if ready and len(inflight) < workers and done_ok + len(inflight) < limit and not _out_of_time():
+                    timeout = max(0.0, ready[0][0] - time.time())
+                finished, _ = futures_wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    mid, url, dom = inflight.pop(fut)
+                    busy[dom] -= 1
+                    try:
+                        res = fut.result() or {}
+                    except Exception:
+                        res = {}
+
+                    # backoff si parece bloqueado (403/429/timeout...; la pausa base aprende por dominio)
+                    blocked = DomainHealth.is_block(res)
+                    if blocked:
+                        wait = _gap(dom) * (6 if backoff_on_block else 1)
+                    else:
+                        wait = _gap(dom) + random.uniform(0, 0.4)
+                    next_ok[dom] = max(next_ok[dom], time.time() + wait)
+                    if not blocked and self._apply_enrichment(mid, url, res):
+                        done_ok += 1
+                        used[dom] += 1
+                    else:
+                        queue.defer(mid)
+                    _requeue(dom)
+
+            leftovers = [(mid, url, dom) for dom, q in queues.items() for mid, url in q]
+            return done_ok, leftovers
+
+        def _by_domain(entries):
+            queues = {}
+            for mid, url, dom in entries:
+                queues.setdefault(dom, deque()).append((mid, url))
+            return queues
+
+        processed = from_cache
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich") as pool:
+            # 2) primera pasada: respetando presupuesto por dominio
+            fetched, leftovers = _schedule(_by_domain(cand), max_total - processed, per_domain_budget, pool)
+            processed += fetched
+
+            # 3) overflow: reparte cupos sobrantes (opcional)
+            if overflow and processed < max_total and leftovers and not _out_of_time():
+                extra, leftovers = _schedule(_by_domain(leftovers), max_total - processed, None, pool)
+                processed += extra
+
+        # 4) lo no intentado vuelve a la cola tal cual
+        for mid, _, _ in leftovers:
+            queue.requeue(mid)
+
+        if health is not None:
+            health.save()
+        self.redup_pending()
         self._log(f"🟢 Enrichment: +{processed} items enriquecidos.")
         return processed
 
@@ -1216,22 +1335,19 @@ class NewsSearchEngine:
         total = 0
 
         # Asegura extractor con sesión compartida
-        if not hasattr(self, "_desc_extractor"):
-            try:
-                self._desc_extractor = DescriptionExtractor(self.session)
-            except TypeError:
-                self._desc_extractor = DescriptionExtractor()
-                if hasattr(self._desc_extractor, "session"):
-                    self._desc_extractor.session = self.session
+        self._get_desc_extractor()
 
         while True:
-            pending = sum(
-                1 for it in self.raw_items.values()
-                if it.get("NeedsEnrichment") and (it.get("URL") or "").strip()
-                   and (it.get("Year") or 0) and 2020 <= int(it["Year"]) <= 2025
-            )
+            # solo cuenta lo que ya se puede intentar: lo diferido con backoff no da progreso ahora
+            pending = self.enrich_queue.eligible()
             if pending == 0:
-                self._log("🟢 Enrichment: backlog vacío.")
+                waiting = len(self.enrich_queue)
+                if not waiting:
+                    self._log("🟢 Enrichment: backlog vacío.")
+                else:
+                    nxt = self.enrich_queue.next_eligible()
+                    when = f" (siguiente reintento en {max(0, nxt - _t.time()) / 60:.0f} min)" if nxt else ""
+                    self._log(f"🟡 Enrichment: solo quedan {waiting} diferidos{when}; deteniendo.")
                 break
 
             if (_t.time() - started) > time_budget_s:
@@ -1249,13 +1365,121 @@ class NewsSearchEngine:
             total += (processed or 0)
 
             if not processed:
-                self._log("🟡 Enrichment: sin progreso en esta tanda; deteniendo.")
+                nxt = self.enrich_queue.next_eligible()
+                when = f" (siguiente reintento en {max(0, nxt - _t.time()) / 60:.0f} min)" if nxt else ""
+                self._log(f"🟡 Enrichment: sin progreso en esta tanda; deteniendo. Pendientes={pending}{when}")
                 break
 
             _t.sleep(random.uniform(*sleep_between_batches))
 
         return total
 
+    def _get_desc_extractor(self):
+        """Extractor de descripciones compartido (reutiliza la sesión HTTP del motor)."""
+        extractor = getattr(self, "_desc_extractor", None)
+        if extractor is None:
+            try:
+                extractor = DescriptionExtractor(self.session)
+            except TypeError:
+                extractor = DescriptionExtractor()
+                if hasattr(extractor, "session"):
+                    extractor.session = self.session
+            self._desc_extractor = extractor
+        return extractor
+
+    def _cached_description(self, url: str) -> dict | None:
+        """Resultado vigente en la caché de metadatos (positivo o negativo) o None si hay que ir a red."""
+        if self.url_cache is None:
+            return None
+        try:
+            return self.url_cache.get(url)
+        except Exception as e:
+            self._log(f"🟡 Caché de metadatos no disponible: {e}")
+            self.url_cache = None
+            return None
+
+    def _fetch_description(self, url: str, check_cache: bool = True) -> dict:
+        """
+        Descripción de una URL: caché de metadatos primero; si no, extractor y se guarda el resultado.
+        Si la entrada caducada trae ETag/Last-Modified se revalida con GET condicional (304 → se reutiliza).
+        """
+        if check_cache:
+            hit = self._cached_description(url)
+            if hit is not None:
+                return hit
+        prev = None
+        if self.url_cache is not None:
+            try:
+                prev = self.url_cache.lookup(url)
+            except Exception:
+                prev = None
+        validators = None
+        if prev and prev["desc"] and (prev["etag"] or prev["last_modified"]):
+            validators = {"etag": prev["etag"], "last_modified": prev["last_modified"]}
+        res = self._get_desc_extractor().extract(url, validators=validators) or {}
+        if res.get("status") == 304 and validators:
+            res.update({k: prev[k] for k in ("desc", "lang", "canonical")})
+            res["etag"] = res.get("etag") or prev["etag"]
+            res["last_modified"] = res.get("last_modified") or prev["last_modified"]
+        if self.domain_health is not None:
+            self.domain_health.record(Methods._domain_of(Methods.normalize_url(url)), res)
+        cache = self.url_cache
+        if cache is not None:
+            try:
+                cache.put(url, res)
+            except Exception:
+                pass
+        return res
+
+    def _apply_enrichment(self, mid, url, res: dict) -> bool:
+        """Vuelca el resultado del extractor en el ítem. Devuelve True si se obtuvo descripción."""
+        desc, lang, canonical = res.get("desc", ""), res.get("lang"), res.get("canonical")
+        if canonical and canonical != url:
+            if self.trace_enrich:
+                self._log(f"    ↪ canónica detectada: {canonical}")
+            self._maybe_reindex_to_canonical(mid, canonical)
+        it = self.raw_items.get(mid)
+        if not desc or it is None:
+            return False
+        it["Summary"] = desc
+        it["Language"] = lang or it.get("Language")
+        it["NeedsEnrichment"] = False
+        it.pop("_sum_simhash64", None)
+        self.enrich_queue.done(mid)
+        self._redup_ids.add(mid)
+        self._mark_dirty(mid)
+        return True
+
+    def _queue_enrichment(self, mid):
+        """Encola el ítem si necesita enriquecimiento (prioridad: más reciente primero)."""
+        if not self.needs_enrichment(mid):
+            return
+        ymd = self._ymd_from_ddmmyyyy(self.raw_items[mid].get("Date") or "")
+        self.enrich_queue.push(mid, prio=-ymd.toordinal() if ymd else 0.0)
+
+    def needs_enrichment(self, mid) -> bool:
+        """True si el ítem no tiene resumen, tiene URL y está dentro del rango 2020–2025."""
+        it = self.raw_items.get(mid) or {}
+        if not it.get("NeedsEnrichment") or not (it.get("URL") or "").strip():
+            return False
+        try:
+            return 2020 <= int(it.get("Year") or 0) <= 2025
+        except (TypeError, ValueError):
+            return False
+
+    def enrich_item(self, mid) -> dict:
+        """
+        Enriquece un único ítem (sin pacing: lo gestiona quien llama, p. ej. el pipeline).
+        Devuelve el resultado del extractor ({"desc","lang","canonical"}) o {} si no aplica.
+        """
+        if not self.needs_enrichment(mid):
+            return {}
+        url = self.raw_items[mid]["URL"].strip()
+        res = self._fetch_description(url)
+        if not self._apply_enrichment(mid, url, res):
+            self.enrich_queue.defer(mid)
+        return res
+
     def _maybe_reindex_to_canonical(self, master_id, canonical_url):
         """Si la canónica difiere, mueve índices para que el ID por URL apunte a la canónica."""
         canon_norm = Methods.normalize_url(canonical_url)
@@ -1267,11 +1491,169 @@ class NewsSearchEngine:
         old_url = item.get("URL")
         if old_url and Methods.normalize_url(old_url) == canon_norm:
             return
-        # actualiza URL y re-indexa tablas auxiliares si las usas
+        # actualiza URL y re-indexa tablas auxiliares; si la canónica ya es de otro master,
+        # no se pisa el índice: el re-dedup fusionará ambos
         item["URL"] = canonical_url
         item["ID"] = item.get("ID") or canon_norm
-        if hasattr(self, "idx_by_url"):
+        if self.idx_by_url.get(canon_norm) not in self.raw_items:
             self.idx_by_url[canon_norm] = master_id
+        url_sig = self._url_signature(canonical_url)
+        if url_sig and self.idx_by_url_sig.get(url_sig) not in self.raw_items:
+            self.idx_by_url_sig[url_sig] = master_id
+        self._redup_ids.add(master_id)
+
+    # --------------------- Re-deduplicación tras enriquecer ---------------------
+
+    def _summary_simhash(self, item: dict) -> int:
+        summ = (item.get("Summary") or "").strip()
+        if not summ:
+            return 0
+        sim = item.get("_sum_simhash64")
+        if not sim:
+            try:
+                sim = Methods.simhash64(Methods.char_ngrams(summ, n=3))
+            except Exception:
+                sim = 0
+            item["_sum_simhash64"] = sim
+        return sim
+
+    def _summary_index(self):
+        """Índice LSH por simhash de resumen; se construye una vez (p. ej. tras reanudar) y luego se mantiene."""
+        if self._idx_by_summary_band is None:
+            idx = defaultdict(list)
+            for mid, it in self.raw_items.items():
+                sim = self._summary_simhash(it)
+                if sim:
+                    for bk in Methods.simhash_bands(sim, bands=self.summary_bands):
+                        idx[bk].append(mid)
+            self._idx_by_summary_band = idx
+        return self._idx_by_summary_band
+
+    def _index_summary(self, mid):
+        if self._idx_by_summary_band is None:
+            return  # se indexará al construir el índice
+        sim = self._summary_simhash(self.raw_items.get(mid) or {})
+        if sim:
+            for bk in Methods.simhash_bands(sim, bands=self.summary_bands):
+                if mid not in self._idx_by_summary_band[bk]:
+                    self._idx_by_summary_band[bk].append(mid)
+
+    def _find_duplicate(self, mid):
+        """Otro master que sea el mismo artículo: misma URL/firma de URL o resumen casi idéntico."""
+        it = self.raw_items[mid]
+        url = (it.get("URL") or "").strip()
+        if url:
+            for idx, key in ((self.idx_by_url, Methods.normalize_url(url)), (self.idx_by_url_sig, self._url_signature(url))):
+                other = idx.get(key) if key else None
+                if other and other != mid and other in self.raw_items:
+                    return other
+
+        summ = (it.get("Summary") or "").strip()
+        sim = self._summary_simhash(it)
+        if not sim:
+            return None
+        new_d = self._ymd_from_ddmmyyyy(it.get("Date") or "")
+        new_tok = self._summary_tokens(summ)
+        dom = Methods._domain_of(Methods.normalize_url(url), (it.get("Source") or [""])[0])
+        index = self._summary_index()
+        seen, best, best_hd, best_sj = {mid}, None, 999, -1.0
+        for bk in Methods.simhash_bands(sim, bands=self.summary_bands):
+            for cid in index.get(bk, []):
+                if cid in seen:
+                    continue
+                seen.add(cid)
+                ex = self.raw_items.get(cid)
+                if not ex or not self._dates_close(new_d, self._ymd_from_ddmmyyyy(ex.get("Date") or ""), days=self.cross_days):
+                    continue
+                hd = Methods.hamming_dist64(sim, self._summary_simhash(ex))
+                sj = Methods.jaccard(new_tok, self._summary_tokens(ex.get("Summary") or ""))
+                if hd > self.summary_hamming_threshold or sj < self.summary_jaccard_min:
+                    continue
+                # mismo dominio: la og:description suele ser genérica del sitio → exige títulos parecidos
+                ex_dom = Methods._domain_of(Methods.normalize_url(ex.get("URL") or ""), (ex.get("Source") or [""])[0])
+                if dom and dom == ex_dom:
+                    tj = Methods.jaccard(set(Methods.tokens_strong(it.get("Title") or "")),
+                                         set(Methods.tokens_strong(ex.get("Title") or "")))
+                    if tj < 0.5:
+                        continue
+                if (hd < best_hd) or (hd == best_hd and sj > best_sj):
+                    best, best_hd, best_sj = cid, hd, sj
+        return best
+
+    def _merge_masters(self, keep, dup):
+        """Fusiona el master `dup` en `keep` (fuentes, campos de contenido vacíos) y revierte la decisión previa de `dup`."""
+        a, b = self.raw_items[keep], self.raw_items.pop(dup)
+        fe = self.filter_engine
+        if fe is not None and hasattr(fe, "forget_item"):
+            fe.forget_item(self, b)
+        else:
+            for k in [k for k, v in self.final_results.items() if v is b]:
+                self.final_results.pop(k, None)
+
+        for src in b.get("Source") or []:
+            if src not in a["Source"]:
+                a["Source"].append(src)
+        for k in self._MERGE_FIELDS:
+            if b.get(k) and not a.get(k):
+                a[k] = b[k]
+                if k == "Summary":
+                    a.pop("_sum_simhash64", None)
+                    self._index_summary(keep)
+        if (a.get("Summary") or "").strip():
+            a["NeedsEnrichment"] = False
+            self.enrich_queue.done(keep)
+        else:
+            # puede haber heredado una URL nueva de `dup`: sus fallos anteriores ya no valen
+            self.enrich_queue.forget(keep)
+            self._queue_enrichment(keep)
+        self.enrich_queue.forget(dup)
+        self.dirty_ids.discard(dup)
+        self._redup_ids.discard(dup)
+        self.duplicate_count += 1
+        self._mark_dirty(keep)
+
+    def _remap_indexes(self, merged: dict):
+        """Redirige a su master final todas las entradas de índice que apuntaban a masters fusionados."""
+        def _final(m):
+            while m in merged:
+                m = merged[m]
+            return m
+
+        for idx in (self.idx_by_url, self.idx_by_url_sig, self.idx_by_title, self.idx_by_title_sha):
+            for k, v in idx.items():
+                if v in merged:
+                    idx[k] = _final(v)
+        list_indexes = [self.idx_by_simhash_band, self.idx_by_title_prefix, self.idx_by_bow_sig]
+        if self._idx_by_summary_band is not None:
+            list_indexes.append(self._idx_by_summary_band)
+        for idx in list_indexes:
+            for k, ids in idx.items():
+                if any(v in merged for v in ids):
+                    idx[k] = list(dict.fromkeys(_final(v) for v in ids))
+
+    def redup_pending(self) -> int:
+        """
+        Re-dedup incremental: sondea los ítems cuya canónica o resumen cambió al enriquecer y los
+        fusiona con su duplicado (se conserva el master ya indexado). Devuelve nº de fusiones.
+        """
+        if not self.redup_after_enrich or not self._redup_ids:
+            self._redup_ids.clear()
+            return 0
+        ids, self._redup_ids = self._redup_ids, set()
+        merged = {}
+        for mid in ids:
+            if mid not in self.raw_items:
+                continue
+            other = self._find_duplicate(mid)
+            if other:
+                self._merge_masters(other, mid)
+                merged[mid] = other
+            else:
+                self._index_summary(mid)
+        if merged:
+            self._remap_indexes(merged)
+            self._log(f"🧬 Re-dedup tras enriquecer: {len(merged)} duplicados fusionados.")
+        return len(merged)
 
     # --------------------- State ---------------------
 
@@ -1335,7 +1717,15 @@ class NewsSearchEngine:
         Clave primaria por TÍTULO normalizado + auxiliares por URL, firma de URL (host+path),
         y (título+fecha+dominio) con LSH (SimHash), prefijo de tokens y firma bag-of-words.
         Incluye fallback opcional por similitud de resúmenes.
+        Si hay on_dirty (pipeline en streaming), se le avisa tras registrar el ítem.
         """
+        with self.lock:
+            self._add_or_update_result(new_data)
+        # fuera del cerrojo: encolar puede bloquear por backpressure mientras las etapas lo necesitan
+        if self.on_dirty is not None and self.dirty_ids:
+            self.on_dirty()
+
+    def _add_or_update_result(self, new_data):
         # Índice BOW perezoso por si no está declarado en __init__
         if not hasattr(self, "idx_by_bow_sig"):
             from collections import defaultdict
@@ -1497,6 +1887,8 @@ class NewsSearchEngine:
             master_id = norm_url if norm_url else f"t:{Methods._hash12(t_key or norm_title or url)}"
             self.raw_items[master_id] = new_data
             self.raw_items[master_id]["ID"] = master_id
+            self._mark_dirty(master_id)
+            self._queue_enrichment(master_id)
             # índices
             if norm_url:
                 self.idx_by_url[norm_url] = master_id
@@ -1520,6 +1912,7 @@ class NewsSearchEngine:
                     self.raw_items[master_id]["_sum_simhash64"] = Methods.simhash64(Methods.char_ngrams(summ, n=3))
                 except Exception:
                     pass
+                self._index_summary(master_id)
             return
 
         # ---- Merge si ya existía
@@ -1527,6 +1920,8 @@ class NewsSearchEngine:
         if not existing:
             self.raw_items[master_id] = new_data
             self.raw_items[master_id]["ID"] = master_id
+            self._mark_dirty(master_id)
+            self._queue_enrichment(master_id)
             if norm_url:
                 self.idx_by_url[norm_url] = master_id
             if t_key:
@@ -1548,14 +1943,18 @@ class NewsSearchEngine:
                 if not prev or prev in ("no abstract",) or "not available" in prev or "no disponible" in prev:
                     if new and not new.startswith("no abstract") and "not available" not in new and "no disponible" not in new:
                         existing["Summary"] = v
+                        self._mark_dirty(master_id)
                         # cache simhash de resumen
                         try:
                             existing["_sum_simhash64"] = Methods.simhash64(Methods.char_ngrams(v, n=3))
                         except Exception:
                             pass
+                        self._index_summary(master_id)
             else:
                 if not existing.get(k):
                     existing[k] = v
+                    if k in ("Title", "Year"):
+                        self._mark_dirty(master_id)
 
         # asegura índices secundarios
         if norm_url and norm_url not in self.idx_by_url:
@@ -1583,6 +1982,10 @@ class NewsSearchEngine:
 
         self.duplicate_count += 1
 
+    def _mark_dirty(self, mid):
+        """Marca un ítem como pendiente de (re)filtrar."""
+        if mid and mid in self.raw_items:
+            self.dirty_ids.add(mid)
 
     def get_state_snapshot(self) -> dict:
         return {
@@ -1597,6 +2000,8 @@ class NewsSearchEngine:
             "duplicate_count": self.duplicate_count,
             "idx_by_url": self.idx_by_url,
             "idx_by_title": self.idx_by_title,
+            "dirty_ids": list(self.dirty_ids),
+            "enrich_queue": self.enrich_queue.to_snapshot(),
         }
 
     def load_state_snapshot(self, snap: dict) -> None:
@@ -1611,3 +2016,12 @@ class NewsSearchEngine:
         self.duplicate_count = snap.get("duplicate_count", 0)
         self.idx_by_url = snap.get("idx_by_url", {}) or {}
         self.idx_by_title = snap.get("idx_by_title", {}) or {}
+        # pendientes de filtrar: los guardados + los que nunca pasaron por el filtro
+        self.dirty_ids = set(snap.get("dirty_ids", [])) | {
+            k for k, it in self.raw_items.items() if not it.get("_FilterFP")
+        }
+        # cola de enriquecimiento (con intentos/diferidos); snapshots antiguos: se reconstruye
+        self.enrich_queue.load_snapshot(snap.get("enrich_queue"))
+        for k in self.raw_items:
+            if k not in self.enrich_queue:
+                self._queue_enrichment(k)
@@ -2,6 +2,7 @@ import os
 import requests
 import time
 import random
+import threading
 from datetime import datetime
 from urllib.parse import urlparse
 from requests.adapters import HTTPAdapter, Retry
@@ -10,6 +11,7 @@ from dotenv import load_dotenv, find_dotenv
 from src.utils.Methods import Methods
 from src.utils.Errors import ProviderRateLimitError, ProviderBlockedError, NetworkError
 from src.utils.SearchQueryBuilder import SearchQueryBuilder
+from src.utils.HttpCache import HttpCache
 
 
 # Seguridad/ciber
@@ -109,6 +111,11 @@ class PaperSearchEngine:
         # Diccionario con todos los artículos recuperados de las APIs, indexados por DOI normalizado o título
         self.raw_items = {}
 
+        # Claves nuevas o modificadas desde la última pasada de filtros (filtrado incremental)
+        self.dirty_ids = set()
+        # Cerrojo del estado (raw_items, índices, dirty_ids): lo comparten ingesta y etapas del pipeline en streaming
+        self.lock = threading.RLock()
+
         # Conjuntos con los IDs de papers ya procesados en cada fuente
         self.semantic_ids = set(semantic_ids or [])  # Semantic Scholar
         self.openalex_ids = set(openalex_ids or [])  # OpenAlex
@@ -142,6 +149,9 @@ class PaperSearchEngine:
         )
         self.session.mount("https://", HTTPAdapter(max_retries=retries))
 
+        # Caché HTTP condicional (ETag/Last-Modified): páginas sin cambios vuelven como 304
+        self.http_cache = HttpCache() if os.getenv("HTTP_CACHE", "1") == "1" else None
+
         # --------- Límites y tiempos ----------
         self.openalex_per_page = 200
         self.max_pages_semantic = 5  # None = sin tope
@@ -223,6 +233,12 @@ class PaperSearchEngine:
     def _note_success(self, host: str):
         self._block_counters[host] = 0
 
+    def _http_get(self, url: str, params=None, headers=None):
+        """GET con validadores ETag/Last-Modified si la caché HTTP está activa (304 → cuerpo cacheado)."""
+        if self.http_cache is not None:
+            return self.http_cache.get(self.session, url, params=params, headers=headers, timeout=self.timeout)
+        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
     # =================== REQUEST JSON ROBUSTO (con excepciones) ===================
 
     def _request_json(
@@ -244,9 +260,7 @@ class PaperSearchEngine:
             # diga el proveedor y reintentamos (máx. self.max_429_retries).
             _429_tries = 0
 
-            resp = self.session.get(
-                url, params=params, headers=headers, timeout=self.timeout
-            )
+            resp = self._http_get(url, params=params, headers=headers)
 
             # 202 Accepted: resultado en preparación (Semantic Scholar)
             _202_tries = 0
@@ -257,9 +271,7 @@ class PaperSearchEngine:
                     )
                 time.sleep(10)
                 self._respect_rate_limit(source_host)
-                resp = self.session.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
+                resp = self._http_get(url, params=params, headers=headers)
                 _202_tries += 1
             if resp.status_code == 202:
                 # tras reintentos seguimos en 202 → trata como problema temporal de proveedor
@@ -290,9 +302,7 @@ class PaperSearchEngine:
                 time.sleep(min(cool, self.max_sleep))
 
                 self._respect_rate_limit(source_host)
-                resp = self.session.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
+                resp = self._http_get(url, params=params, headers=headers)
 
             if resp.status_code == 429:
                 # 👉 Agotados los reintentos: ahora sí lanzamos la excepción específica
@@ -317,9 +327,7 @@ class PaperSearchEngine:
                 cool = self.base_sleep + random.uniform(0, 3)
                 time.sleep(min(cool, self.max_sleep))
                 self._respect_rate_limit(source_host)
-                resp = self.session.get(
-                    url, params=params, headers=headers, timeout=self.timeout
-                )
+                resp = self._http_get(url, params=params, headers=headers)
                 ctype = resp.headers.get("Content-Type", "").lower()
                 host = urlparse(resp.url).netloc.lower()
                 if ("application/json" not in ctype) or (source_host not in host):
@@ -366,6 +374,10 @@ class PaperSearchEngine:
         Inserta/actualiza en self.raw_items (clave DOI normalizado o título normalizado).
         Mantiene lista de fuentes y mejora Summary cuando esté vacío/genérico.
         """
+        with self.lock:
+            self._add_or_update_result(new_data)
+
+    def _add_or_update_result(self, new_data):
         title = new_data.get("Title", "") or ""
         doi = new_data.get("DOI") or ""
 
@@ -378,6 +390,8 @@ class PaperSearchEngine:
             key = norm_title
             if norm_doi:
                 self.raw_items[norm_doi] = self.raw_items.pop(norm_title)
+                self.dirty_ids.discard(norm_title)
+                self.dirty_ids.add(norm_doi)
                 key = norm_doi
         else:
             key = norm_doi or norm_title
@@ -405,11 +419,15 @@ class PaperSearchEngine:
                         and "no disponible" not in new
                     ):
                         existing["Summary"] = v
+                        self.dirty_ids.add(key)
                 elif not existing.get(k) and v:
                     existing[k] = v
+                    if k in ("Title", "Year", "DOI"):
+                        self.dirty_ids.add(key)
             self.duplicate_count += 1
         else:
             self.raw_items[key] = new_data
+            self.dirty_ids.add(key)
 
     # ================================ PÚBLICO ================================
 
@@ -736,6 +754,7 @@ class PaperSearchEngine:
             "openalex_cursor": self.openalex_cursor,
             "openalex_page": self.openalex_page,
             "openalex_total_found": self.openalex_total_found,
+            "dirty_ids": list(self.dirty_ids),
         }
 
     def load_state_snapshot(self, snap: dict) -> None:
@@ -755,3 +774,7 @@ class PaperSearchEngine:
         self.openalex_cursor = snap.get("openalex_cursor", "*")
         self.openalex_page = snap.get("openalex_page", 0)
         self.openalex_total_found = snap.get("openalex_total_found", 0)
+        # pendientes de filtrar: los guardados + los que nunca pasaron por el filtro
+        self.dirty_ids = set(snap.get("dirty_ids", [])) | {
+            k for k, it in self.raw_items.items() if not it.get("_FilterFP")
+        }
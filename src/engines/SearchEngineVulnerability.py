@@ -2,16 +2,18 @@ import os
 import re
 import time
 import random
+import threading
 import requests
 from datetime import datetime
 from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter, Retry
 from dotenv import load_dotenv, find_dotenv
 
 from src.utils.Methods import Methods
 from src.utils.Errors import ProviderRateLimitError, ProviderBlockedError, NetworkError
+from src.utils.HttpCache import HttpCache
+from src.utils.HtmlParsing import table_rows
 
 
 class VulnerabilitySearchEngine:
@@ -56,6 +58,11 @@ class VulnerabilitySearchEngine:
         # Diccionario con todos los elementos recuperados de las APIs, indexados por ID
         self.raw_items = {}
 
+        # IDs nuevos desde la última pasada de filtros (filtrado incremental)
+        self.dirty_ids = set()
+        # Cerrojo del estado (raw_items, índices, dirty_ids): lo comparten ingesta y etapas del pipeline en streaming
+        self.lock = threading.RLock()
+
         # Conjuntos con los IDs de vulnerabilidades ya procesados en cada fuente
         self.nvd_ids = set(nvd_ids or [])   # NVD
         self.mitre_ids = set(mitre_ids or [])  # MITRE
@@ -83,6 +90,9 @@ class VulnerabilitySearchEngine:
         self.session.mount("https://", HTTPAdapter(max_retries=retries))
         self.session.mount("http://", HTTPAdapter(max_retries=retries))
 
+        # Caché HTTP condicional (ETag/Last-Modified): páginas sin cambios vuelven como 304
+        self.http_cache = HttpCache() if os.getenv("HTTP_CACHE", "1") == "1" else None
+
         # ---- Límites y tiempos ----
         self.timeout = 30
         self.base_sleep = 0.6
@@ -192,6 +202,12 @@ class VulnerabilitySearchEngine:
     def _note_success(self, host: str):
         self._block_counters[host] = 0
 
+    def _http_get(self, url: str, params=None, headers=None):
+        """GET con validadores ETag/Last-Modified si la caché HTTP está activa (304 → cuerpo cacheado)."""
+        if self.http_cache is not None:
+            return self.http_cache.get(self.session, url, params=params, headers=headers, timeout=self.timeout)
+        return self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+
     # ======================== Requests robustos (excepciones) ========================
 
     def _request_json(self, url: str, params: dict, headers: dict, source_host: str) -> dict:
@@ -204,7 +220,7 @@ class VulnerabilitySearchEngine:
         """
         try:
             self._respect_rate_limit(source_host)
-            resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            resp = self._http_get(url, params=params, headers=headers)
 
             # 429 Too Many Requests
             if resp.status_code == 429:
@@ -228,7 +244,7 @@ class VulnerabilitySearchEngine:
                 # reintento único tras pequeño enfriamiento
                 time.sleep(min(self.base_sleep + random.uniform(0, 2), self.max_sleep))
                 self._respect_rate_limit(source_host)
-                resp = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+                resp = self._http_get(url, params=params, headers=headers)
                 ctype = (resp.headers.get("Content-Type") or "").lower()
                 host = urlparse(resp.url).netloc.lower()
                 if ("application/json" not in ctype) or (source_host not in host):
@@ -258,7 +274,7 @@ class VulnerabilitySearchEngine:
         """
         try:
             self._respect_rate_limit(source_host)
-            resp = self.session.get(url, params=params, headers=self.headers_html, timeout=self.timeout)
+            resp = self._http_get(url, params=params, headers=self.headers_html)
 
             ctype = (resp.headers.get("Content-Type") or "").lower()
             host = urlparse(resp.url).netloc.lower()
@@ -276,7 +292,7 @@ class VulnerabilitySearchEngine:
                 time.sleep(min(self.base_sleep + random.uniform(0, 2), self.max_sleep))
                 # Reintento único
                 self._respect_rate_limit(source_host)
-                resp = self.session.get(url, params=params, headers=self.headers_html, timeout=self.timeout)
+                resp = self._http_get(url, params=params, headers=self.headers_html)
                 ctype = (resp.headers.get("Content-Type") or "").lower()
                 host = urlparse(resp.url).netloc.lower()
 
@@ -308,6 +324,10 @@ class VulnerabilitySearchEngine:
         }
 
     def add_or_update_result(self, model: dict):
+        with self.lock:
+            self._add_or_update_result(model)
+
+    def _add_or_update_result(self, model: dict):
         key = model.get("ID")
         if not key:
             return
@@ -319,6 +339,7 @@ class VulnerabilitySearchEngine:
             self.duplicate_count += 1
         else:
             self.raw_items[key] = model
+            self.dirty_ids.add(key)
             self.num_results_bykeyword += 1
 
     # ================================ Público ================================
@@ -496,8 +517,7 @@ class VulnerabilitySearchEngine:
         total_found = 0
 
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            rows = soup.select("table tr")
+            rows = table_rows(html)
             if not rows or len(rows) < 2:
                 if self.log_manager:
                     self.log_manager.log_state("🟡 [MITRE] Sin filas de resultados.")
@@ -505,12 +525,11 @@ class VulnerabilitySearchEngine:
                 return
 
             for tr in rows[1:]:
-                cols = tr.find_all("td")
-                if len(cols) != 2:
+                if len(tr) != 2:
                     continue
 
-                cve_id = (cols[0].get_text() or "").strip()
-                description = (cols[1].get_text() or "").strip()
+                cve_id = (tr[0] or "").strip()
+                description = (tr[1] or "").strip()
                 if not cve_id:
                     continue
 
@@ -557,6 +576,7 @@ class VulnerabilitySearchEngine:
             "num_results_bykeyword": self.num_results_bykeyword,
             "apply_filter_ia": self.apply_filter_ia,
             "values_levels_ia": self.values_levels_ia,
+            "dirty_ids": list(self.dirty_ids),
         }
 
     def load_state_snapshot(self, snap: dict) -> None:
@@ -569,3 +589,7 @@ class VulnerabilitySearchEngine:
         self.num_results_bykeyword = snap.get("num_results_bykeyword", 0)
         self.apply_filter_ia = snap.get("apply_filter_ia", False)
         self.values_levels_ia = snap.get("values_levels_ia", {}) or {}
+        # pendientes de filtrar: los guardados + los que nunca pasaron por el filtro
+        self.dirty_ids = set(snap.get("dirty_ids", [])) | {
+            k for k, it in self.raw_items.items() if not it.get("_FilterFP")
+        }
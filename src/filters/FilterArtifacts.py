@@ -0,0 +1,100 @@
+# src/filters/FilterArtifacts.py
+import os
+import json
+import hashlib
+import threading
+
+from src.filters.FilterAutomotive import AutomotiveCyberFilter
+from src.filters.FilterIncident import IncidentFilter
+
+# Subir cuando cambie la forma de construir los artefactos (invalida todo lo cacheado)
+ARTIFACT_VERSION = 1
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_LEXICON_SOURCES = {
+    "automotive": os.path.join(_HERE, "FilterAutomotive.py"),
+    "incident": os.path.join(_HERE, "FilterIncident.py"),
+}
+
+# Caché en memoria del proceso: evita recompilar en cada FilterEngine (reruns de Streamlit,
+# un motor por búsqueda). No se persiste ni se comparte entre procesos; los workers de
+# InferencePool solo ejecutan el tagger IA y no usan estos filtros.
+_ARTIFACTS: dict = {}
+_KINDS: dict = {}     # fingerprint -> tipo/ruta (para soltar versiones obsoletas)
+_DIGESTS: dict = {}   # path -> ((mtime_ns, size), sha1) para no re-hashear en cada llamada
+_LOCK = threading.Lock()
+
+
+def _file_digest(path: str) -> str:
+    """sha1 del fichero; se recalcula solo si cambian mtime o tamaño."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _DIGESTS.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _DIGESTS[path] = (stamp, digest)
+    return digest
+
+
+def _fingerprint(*parts) -> str:
+    base = "|".join([f"v{ARTIFACT_VERSION}"] + [str(p) for p in parts])
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()[:16]
+
+
+def automotive_filter(cfg_path: str):
+    """
+    Devuelve (cfg, AutomotiveCyberFilter) compilados para cfg_path.
+    Se reconstruye solo si cambian el JSON, el código del léxico o ARTIFACT_VERSION.
+    """
+    kind = f"automotive:{os.path.abspath(cfg_path)}"
+    fp = _fingerprint(kind, _file_digest(cfg_path), _file_digest(_LEXICON_SOURCES["automotive"]))
+    art = _ARTIFACTS.get(fp)
+    if art is not None:
+        return art
+    with _LOCK:
+        art = _ARTIFACTS.get(fp)
+        if art is None:
+            with open(cfg_path, encoding="utf-8") as f:
+                cfg = json.load(f)
+            art = (cfg, AutomotiveCyberFilter(cfg))
+            _drop_stale(kind)
+            _ARTIFACTS[fp] = art
+            _KINDS[fp] = kind
+    return art
+
+
+def incident_filter(mode: str = "strict", scope: str = "auto-only") -> IncidentFilter:
+    """IncidentFilter compilado y compartido por (mode, scope)."""
+    kind = f"incident:{mode}:{scope}"
+    fp = _fingerprint(kind, _file_digest(_LEXICON_SOURCES["incident"]))
+    art = _ARTIFACTS.get(fp)
+    if art is not None:
+        return art
+    with _LOCK:
+        art = _ARTIFACTS.get(fp)
+        if art is None:
+            art = IncidentFilter(mode=mode, scope=scope)
+            _drop_stale(kind)
+            _ARTIFACTS[fp] = art
+            _KINDS[fp] = kind
+    return art
+
+
+def _drop_stale(kind: str):
+    """Descarta versiones anteriores del mismo artefacto (el JSON o el léxico cambiaron)."""
+    for fp in [k for k, v in _KINDS.items() if v == kind]:
+        _ARTIFACTS.pop(fp, None)
+        _KINDS.pop(fp, None)
+
+
+def invalidate():
+    """Vacía la caché (fuerza recompilación en la próxima llamada)."""
+    with _LOCK:
+        _ARTIFACTS.clear()
+        _KINDS.clear()
+        _DIGESTS.clear()
@@ -119,6 +119,10 @@ class AutomotiveCyberFilter:
         }
         self.CAPS = {"brands_max": 4, "suppliers_max": 3}
 
+        # Prefiltro barato: unión de todo léxico que puede sumar puntos.
+        # Si nada coincide, score_text() no puede superar 0 → descarte seguro.
+        self.rx_any = self._build_any_regex()
+
         self.ambiguous_brand_rules = {
             "ram": re.compile(r"(?i)\bRAM\s*(?:1500|2500|3500|TRX|truck|pickup|trucks)\b"),
             "mini": re.compile(r"(?i)\bMINI\s+(?:Cooper|Countryman|Electric)\b|\bMini\s+Cooper\b"),
@@ -128,6 +132,27 @@ class AutomotiveCyberFilter:
             "abb": re.compile(r"(?i)\bABB\b.*\b(charger|evse|ocpp|terra|robot|robotics)\b"),
         }
 
+    def _build_any_regex(self) -> re.Pattern:
+        positives = [self.rx[k] for k in ("attack_terms", "vuln_terms", "automotive_terms", "manufacturing_terms",
+                                          "attack_vectors", "protocols", "standards", "outcomes", "CVE", "CWE")]
+        positives += list(self.rx_brands.values()) + list(self.rx_suppliers.values())
+        positives += [self.AUTO_ACTIONS, self.PORTAL_STRICT, self.TELEMATICS_PORTALS]
+        parts = []
+        for rx in positives:
+            src = rx.pattern
+            if src == r"$^":
+                continue
+            if src.startswith("(?i)"):
+                src = src[4:]
+            parts.append(f"(?:{src})")
+        if not parts:
+            return re.compile(r"$^")
+        return re.compile("|".join(parts), re.I)
+
+    def may_score(self, text: str) -> bool:
+        """False si el texto no contiene ningún término puntuable (score_text daría ≤ 0)."""
+        return bool(self.rx_any.search(self._norm_text(text)))
+
     # --------- Helpers ---------
     @staticmethod
     def _norm_text(text: str) -> str:
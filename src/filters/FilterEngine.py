@@ -1,12 +1,18 @@
 # src/filters/FilterEngine.py
 import re
 import streamlit as st
-import json, os
+import os
+import contextlib
+import hashlib
+import threading
+import time
 
 from src.utils.Methods import Methods
 from src.filters.MultiModelTaggerLocal import MultiModelTaggerLocal
-from src.filters.FilterAutomotive import AutomotiveCyberFilter
-from src.filters.FilterIncident import IncidentFilter
+from src.filters import FilterArtifacts
+from src.filters.SemanticPrefilter import SemanticPrefilter
+from src.filters.InferencePool import InferencePool
+from src.utils.DiscardLog import DiscardLog
 
 
 class FilterEngine:
@@ -17,17 +23,26 @@ class FilterEngine:
       3) Filtro IA (ensemble zero-shot, niveles encadenados)
 
     Además:
+      - Filtrado incremental: solo se evalúan ítems nuevos o modificados (engine.dirty_ids)
+      - Puertas ordenadas por coste/selectividad (año → ya analizado → prefiltro de palabras →
+        automoción → incidentes → IA), con tiempos y tasas de rechazo por puerta
+      - Prefiltro semántico opcional (SEMANTIC_PREFILTER) antes del NLI en cada nivel IA
       - Dedup por título (norm_key) en noticias
-      - Guarda descartes en JSON para análisis:
-          * output/automocion_descartados.json
-          * output/incidentes_descartados.json
-          * output/ia_descartados.json
+      - Guarda descartes en JSONL append-only para análisis (ver DiscardLog):
+          * output/automocion_descartados.jsonl
+          * output/incidentes_descartados.jsonl
+          * output/ia_descartados.jsonl
     """
 
     def __init__(self, log_manager=None, incident_mode: str = "strict", incident_scope: str = "auto-only"):
-        self.analyzer = MultiModelTaggerLocal(_log_manager=log_manager)
+        # El clasificador IA se crea (y sus modelos se cargan) solo al primer uso
+        self._analyzer = None
         self.log_manager = log_manager
 
+        # Prefiltro semántico (embeddings) antes del NLI; SEMANTIC_PREFILTER=1 lo activa
+        self._semantic = None
+        self._semantic_enabled = os.getenv("SEMANTIC_PREFILTER", "0") == "1"
+
         # Debug por consola opcional
         self.debug = os.getenv("DEBUG_LOGS", "0") == "1"
 
@@ -35,7 +50,8 @@ class FilterEngine:
         self._init_automotive_filter()
 
         # === Filtro de incidentes ===
-        self._incident_filter = IncidentFilter(
+        # (compilado una vez por proceso; ver FilterArtifacts)
+        self._incident_filter = FilterArtifacts.incident_filter(
             mode=os.getenv("INCIDENT_MODE", incident_mode),
             scope=os.getenv("INCIDENT_SCOPE", incident_scope)
         )
@@ -49,16 +65,70 @@ class FilterEngine:
         self.already_processed_ia = 0
         self.filtered_by_heuristic_auto = 0
         self.filtered_by_heuristic_inci = 0
+        self.filtered_by_semantic = 0
+
+        # -------- Filtrado incremental --------
+        # INCREMENTAL_AI=0 → en las pasadas intermedias solo heurísticos; la IA queda pendiente
+        self.incremental_ai = os.getenv("INCREMENTAL_AI", "1") == "1"
+        self._warned_no_levels = False
+        # IA por lotes: pares premisa/hipótesis por forward y nº de ítems por llamada a classify_many
+        self.ai_batch_size = int(os.getenv("IA_BATCH_SIZE", "16"))
+        self.ai_chunk_items = max(1, int(os.getenv("IA_BATCH_ITEMS", "64")))
+        # IA_WORKERS > 1 → inferencia en un pool de procesos (IA_THREADS_PER_WORKER hilos cada uno)
+        self.ai_workers = int(os.getenv("IA_WORKERS", "0"))
+        self.ai_threads_per_worker = int(os.getenv("IA_THREADS_PER_WORKER", "0")) or None
+        # Los contadores pueden actualizarse desde varios hilos (pipeline en streaming)
+        self._stats_lock = threading.Lock()
+
+        # -------- Orden de puertas + estadísticas por puerta --------
+        # FILTER_GATE_ORDER: lista separada por comas (la IA siempre se evalúa al final)
+        order = [g.strip() for g in os.getenv("FILTER_GATE_ORDER", "").split(",") if g.strip()]
+        order = [g for g in order if g in self._GATE_METHODS or g == "ai"] or list(self.DEFAULT_GATE_ORDER)
+        if "ai" in order:
+            order = [g for g in order if g != "ai"] + ["ai"]
+        self._gate_order = order
+        self._gate_autoreorder = os.getenv("FILTER_GATE_REORDER", "1") == "1"
+        self._gate_warmup = max(1, int(os.getenv("FILTER_GATE_WARMUP", "200")))
+        self._gate_evals = 0
+        self.gate_stats = {}
+        # Cascada IA: {nivel: {"fast_accept", "fast_reject", "ensemble_accept", "ensemble_reject"}}
+        self.cascade_stats = {}
 
         # -------- Buffers + rutas de descartes --------
         self._discarded_incidents = []
-        self._incident_rejects_path = os.getenv("INCIDENT_REJECTS_PATH", "output/incidentes_descartados.json")
+        self._incident_rejects_path = os.getenv("INCIDENT_REJECTS_PATH", "output/incidentes_descartados.jsonl")
 
         self._discarded_ai = []
-        self._ai_rejects_path = os.getenv("IA_REJECTS_PATH", "output/ia_descartados.json")
+        self._ai_rejects_path = os.getenv("IA_REJECTS_PATH", "output/ia_descartados.jsonl")
 
         self._discarded_auto = []
-        self._auto_rejects_path = os.getenv("AUTO_REJECTS_PATH", "output/automocion_descartados.json")
+        self._auto_rejects_path = os.getenv("AUTO_REJECTS_PATH", "output/automocion_descartados.jsonl")
+
+        # Un DiscardLog por ruta (segmentos/rotación), abierto al primer volcado
+        self._discard_logs = {}
+
+    @property
+    def analyzer(self) -> MultiModelTaggerLocal:
+        if self._analyzer is None:
+            self._analyzer = MultiModelTaggerLocal(_log_manager=self.log_manager)
+        return self._analyzer
+
+    @property
+    def classifier(self):
+        """Quien ejecuta classify_many: el pool de procesos (IA_WORKERS > 1) o el tagger local."""
+        if self.ai_workers > 1:
+            return InferencePool.shared(self.ai_workers, self.ai_threads_per_worker, log_manager=self.log_manager)
+        return self.analyzer
+
+    @property
+    def semantic(self) -> SemanticPrefilter | None:
+        if self._semantic is None and self._semantic_enabled:
+            if SemanticPrefilter.available():
+                self._semantic = SemanticPrefilter(log_manager=self.log_manager)
+            else:
+                self._semantic_enabled = False
+                self._log("🟡 ⚠️ SEMANTIC_PREFILTER=1 pero sentence-transformers no está instalado; se omite.")
+        return self._semantic
 
     # ----------------- Logging helper -----------------
     def _log(self, msg: str):
@@ -68,34 +138,24 @@ class FilterEngine:
             print(msg, flush=True)
 
     # ----------------- Persistencia de descartes -----------------
+    def _discard_log(self, path: str) -> DiscardLog:
+        if path not in self._discard_logs:
+            self._discard_logs[path] = DiscardLog(path)
+        return self._discard_logs[path]
+
     def _save_json_list(self, items: list, path: str, flush_after: bool = True, tag: str = "items"):
-        """Fusiona con el JSON existente (si lo hay) y lo persiste."""
+        """Añade los registros al log JSONL (append-only: coste ∝ lote, no histórico)."""
         if not items:
             return
         try:
-            dirpath = os.path.dirname(path)
-            if dirpath:
-                os.makedirs(dirpath, exist_ok=True)
-
-            existing = []
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        existing = json.load(f)
-                        if not isinstance(existing, list):
-                            existing = []
-                except Exception:
-                    existing = []
+            batch = list(items)
+            log = self._discard_log(path)
+            log.append(batch)
 
-            existing.extend(items)
-
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(existing, f, ensure_ascii=False, indent=2)
-
-            self._log(f"💾 Guardados {len(items)} {tag} en {path}")
+            self._log(f"💾 Guardados {len(batch)} {tag} en {log.path}")
 
             if flush_after:
-                items.clear()
+                del items[:len(batch)]
         except Exception as e:
             self._log(f"🔴 Error guardando {tag}: {e}")
 
@@ -110,13 +170,11 @@ class FilterEngine:
 
     # ----------------- Filtro automoción -----------------
     def _init_automotive_filter(self):
-        """Carga el diccionario de filtros y crea el clasificador heurístico."""
+        """Obtiene el clasificador heurístico compilado (se recompila solo si cambia el JSON/léxico)."""
         cfg_path = os.getenv("AC_FILTERS_PATH", "config/automotive_cyber_filters_v1.json")
         try:
-            with open(cfg_path, encoding="utf-8") as f:
-                self._auto_cfg = json.load(f)
+            self._auto_cfg, self._auto_clf = FilterArtifacts.automotive_filter(cfg_path)
             self._log("🟢 Filtros automoción cargados.")
-            self._auto_clf = AutomotiveCyberFilter(self._auto_cfg)
         except Exception as e:
             self._auto_cfg = None
             self._auto_clf = None
@@ -149,87 +207,153 @@ class FilterEngine:
             "Filtrados por heuristica automotriz": getattr(self, "filtered_by_heuristic_auto", 0),
             "Filtrados por heuristica incidentes": getattr(self, "filtered_by_heuristic_inci", 0),
             "Repetidos IA": self.already_processed_ia,
+            "Descartados por prefiltro semántico": self.filtered_by_semantic,
             "No relacionados (IA)": self.filtered_by_ai,
             "Guardados": self.saved_items,
+            **({"Salida temprana IA (cascada)": self._cascade_summary()} if self.cascade_stats else {}),
+            **({"Tiempo IA (tokenización / modelo)": self._ai_timing_summary()} if self._ai_timings() else {}),
         }
 
+    def _ai_timings(self) -> dict:
+        """Tiempos acumulados del clasificador (vacío si aún no se ha creado)."""
+        sources = [self._analyzer.timings] if self._analyzer is not None else []
+        if self.ai_workers > 1:
+            sources.append(self.classifier.timings)
+        totals = {}
+        for timings in sources:
+            for k, v in timings.items():
+                totals[k] = totals.get(k, 0.0) + v
+        return {k: round(v, 3) for k, v in totals.items()}
+
+    def _ai_timing_summary(self) -> str:
+        t = self._ai_timings()
+        tok = t.get("prepare_s", 0.0) + t.get("tokenize_s", 0.0)
+        return f"{tok:.1f}s / {t.get('model_s', 0.0):.1f}s ({int(t.get('texts', 0))} textos, {int(t.get('truncated', 0))} recortados)"
+
     def mostrar_resultados(self):
         if self.log_manager:
             self.log_manager.show_filter_resume(self.get_summary_pretty())
 
     # ----------------- Core -----------------
-    def filter_and_classify_items(self, engine, item_type):
+    # Puerta de decisión -> contador que la refleja (para poder "deshacer" al re-evaluar)
+    _GATE_COUNTERS = {
+        "year": "filtered_by_year",
+        "keyword_prefilter": "filtered_by_heuristic_auto",
+        "automotive_filter": "filtered_by_heuristic_auto",
+        "incident_filter": "filtered_by_heuristic_inci",
+        "ia_repeat": "already_processed_ia",
+        "semantic_prefilter": "filtered_by_semantic",
+        "ai_zeroshot": "filtered_by_ai",
+        "final": "saved_items",
+    }
+
+    # Nombre de puerta configurable -> método _gate_<x>
+    _GATE_METHODS = {
+        "year": "year",
+        "already_analysed": "already_analysed",
+        "keyword_prefilter": "keyword_prefilter",
+        "automotive": "automotive",
+        "incident": "incident",
+    }
+    DEFAULT_GATE_ORDER = ["year", "already_analysed", "keyword_prefilter", "automotive", "incident", "ai"]
+    # Dependencias de orden que el reordenado automático debe respetar: puerta -> puertas que la siguen.
+    # El prefiltro de palabras es un atajo barato del heurístico de automoción: tras él no aporta nada.
+    _GATE_BEFORE = {
+        "keyword_prefilter": ("automotive",),
+    }
+
+    @staticmethod
+    def _item_fingerprint(item: dict) -> str:
         """
-        Aplica todos los filtros y usa el clasificador IA.
+        Huella de lo que afecta a la decisión: contenido (título, resumen, año) y lo que fija la
+        norm_key / source_ref (DOI, ID, URL). Un merge que solo re-clave el ítem (p. ej. aparece
+        el DOI de un paper) también cambia la huella, así que se re-evalúa con la clave nueva.
         """
-        self._log("🟠 🧪 Aplicando filtros y clasificando con IA...")
-        self.total_items += len(engine.raw_items)
-        self._log(f"🧪 Filtrado: total_raw={len(engine.raw_items)}")
-
-        # Asegura estructuras del motor
-        if not hasattr(engine, "ia_analyzed_ids"):
-            engine.ia_analyzed_ids = set()
-        if not hasattr(engine, "final_results"):
-            engine.final_results = {}
-
-        for key, item in engine.raw_items.items():
-            title = item.get("Title", "") or ""
-            summary = item.get("Summary", "") or ""
-
-            # >>> Inicializa campos de decisión para la tarjeta
-            item["Decision"] = None
-            item["DecisionGate"] = None
-            item["DecisionReasons"] = []
-            item["RulesVersion"] = os.getenv("RULES_VERSION", "rules@v1")
-
-            # Año
-            try:
-                year = int(item.get("Year"))
-            except (ValueError, TypeError):
-                year = None
-
-            # Identificador normalizado
-            if item_type == "papers":
-                raw_id = item.get("DOI", "") or ""
-                norm_key = Methods.normalize_doi(raw_id) or Methods.normalize_title(title)
-                source_ref = raw_id or None
-            elif item_type == "vulnerabilities":
-                vid = (item.get("ID") or "").strip().upper()
-                norm_key = vid
-                source_ref = vid or None
-            elif item_type == "news":
-                # ✅ dedup por TÍTULO (según tu decisión)
-                norm_key = Methods.normalize_title(title)
-                source_ref = item.get("URL") or item.get("url") or None
-            else:
-                st.warning(f"⚠️ Tipo desconocido: {item_type}")
-                continue
-
-            # Filtro de años
-            if not year or not (2020 <= year <= 2025):
-                self.filtered_by_year += 1
-                if self.debug:
-                    self._log(f"⏭️ fuera de rango ({year}) · {title[:80]}")
-                continue
-
-            """
-            # Recuperar resumen si sigue vacío
-            if not summary.strip():
-                summary = (
-                    item.get("content")
-                    or item.get("body")
-                    or item.get("Description")
-                    or item.get("Abstract")
-                    or ""
-                ).strip()
-            if not summary.strip():
-                self.missing_summary += 1
-                if self.debug:
-                    self._log(f"⏭️ sin resumen · {title[:80]}")
-                continue
-            """
-
-            # === 1) Heurístico automoción ===
+        base = "\x1f".join([
+            item.get("Title") or "",
+            item.get("Summary") or "",
+            str(item.get("Year") or ""),
+            str(item.get("DOI") or ""),
+            str(item.get("ID") or ""),
+            str(item.get("URL") or item.get("url") or ""),
+        ])
+        return hashlib.sha1(base.encode("utf-8")).hexdigest()[:16]
+
+    def _norm_key_for(self, item: dict, item_type: str):
+        """Devuelve (norm_key, source_ref) según el tipo; (None, None) si el tipo es desconocido."""
+        title = item.get("Title", "") or ""
+        if item_type == "papers":
+            raw_id = item.get("DOI", "") or ""
+            return (Methods.normalize_doi(raw_id) or Methods.normalize_title(title)), (raw_id or None)
+        if item_type == "vulnerabilities":
+            vid = (item.get("ID") or "").strip().upper()
+            return vid, (vid or None)
+        if item_type == "news":
+            # ✅ dedup por TÍTULO (según tu decisión)
+            return Methods.normalize_title(title), (item.get("URL") or item.get("url") or None)
+        return None, None
+
+    def _pending_keys(self, engine, full: bool = False) -> list:
+        """
+        Claves a (re)procesar: las marcadas como sucias por el motor (altas o merges que
+        cambian título/resumen) y las que nunca han pasado por el filtro.
+        """
+        if full or not hasattr(engine, "dirty_ids"):
+            return list(engine.raw_items.keys())
+        keys = set(engine.dirty_ids)
+        engine.dirty_ids.clear()
+        return [k for k in keys if k in engine.raw_items]
+
+    def _forget_previous(self, engine, item: dict):
+        """Revierte contadores/resultados de una decisión anterior antes de re-evaluar el ítem."""
+        item.pop("_FilterHeurFP", None)
+        prev_gate = item.get("_FilterGate")
+        if not prev_gate:
+            return
+        counter = self._GATE_COUNTERS.get(prev_gate)
+        with self._stats_lock:
+            if counter:
+                setattr(self, counter, max(0, getattr(self, counter, 0) - 1))
+            self.total_items = max(0, self.total_items - 1)
+
+        prev_key = item.get("_FilterNormKey")
+        if prev_gate == "final" and prev_key is not None:
+            cur = engine.final_results.get(prev_key)
+            # tras reanudar, final_results guarda copias: se compara por huella
+            if cur is item or (cur and cur.get("_FilterFP") == item.get("_FilterFP")):
+                engine.final_results.pop(prev_key, None)
+            if item.get("_FilterAI"):
+                engine.ia_analyzed_ids.discard(prev_key)
+        for k in ("_FilterGate", "_FilterFP", "_FilterNormKey", "_FilterAI"):
+            item.pop(k, None)
+
+    def forget_item(self, engine, item: dict):
+        """Revierte la decisión registrada de un ítem que deja de existir (p. ej. fusionado en otro master)."""
+        self._forget_previous(engine, item)
+
+    def _record_decision(self, item: dict, gate: str, norm_key, fp: str, ai_done: bool = False):
+        counter = self._GATE_COUNTERS.get(gate)
+        with self._stats_lock:
+            if counter:
+                setattr(self, counter, getattr(self, counter, 0) + 1)
+            self.total_items += 1
+        item.pop("_FilterHeurFP", None)
+        item["_FilterGate"] = gate
+        item["_FilterFP"] = fp
+        item["_FilterNormKey"] = norm_key
+        if ai_done:
+            item["_FilterAI"] = True
+
+    def _ctx_norm_key(self, ctx: dict):
+        """norm_key/source_ref del ítem en curso (calculados una sola vez y bajo demanda)."""
+        if "norm_key" not in ctx:
+            ctx["norm_key"], ctx["source_ref"] = self._norm_key_for(ctx["item"], ctx["item_type"])
+        return ctx["norm_key"]
+
+    @staticmethod
+    def _heuristic_text(item: dict, ctx: dict) -> str:
+        """Texto sobre el que corren prefiltro y heurístico (mismo para ambos)."""
+        if "heur_text" not in ctx:
             extra_text = (
                 item.get("Content")
                 or item.get("Body")
@@ -237,230 +361,632 @@ class FilterEngine:
                 or item.get("abstract")
                 or ""
             )
-            heur_score, heur_tags, heur_hits = self._heuristic_score(title, summary, extra_text)
+            ctx["heur_text"] = " ".join([t for t in [ctx["title"], ctx["summary"], extra_text] if t])
+        return ctx["heur_text"]
+
+    def _discard_record(self, ctx: dict, item: dict) -> dict:
+        """Campos comunes de los registros de descarte."""
+        return {
+            "NormKey": self._ctx_norm_key(ctx),
+            "ItemType": ctx["item_type"],
+            "SourceRef": ctx["source_ref"],
+            "Title": ctx["title"],
+            "Summary": ctx["summary"],
+            "Year": ctx["year"],
+            "Heur_Score": item.get("Heur_Score"),
+            "Heur_Tags": item.get("Heur_Tags"),
+            "Heur_Hits": item.get("Heur_Hits"),
+            "IncidentScore": item.get("IncidentScore"),
+            "IncidentReasons": item.get("IncidentReasons") or [],
+            "IncidentCategory": item.get("IncidentCategory"),
+        }
+
+    # ----------------- Puertas (gates) -----------------
+    def _gate_year(self, engine, item: dict, ctx: dict) -> str | None:
+        year = ctx["year"]
+        if not year or not (2020 <= year <= 2025):
+            if self.debug:
+                self._log(f"⏭️ fuera de rango ({year}) · {ctx['title'][:80]}")
+            return "year"
+        return None
+
+    def _gate_already_analysed(self, engine, item: dict, ctx: dict) -> str | None:
+        # Duplicados IA
+        if self._ctx_norm_key(ctx) in engine.ia_analyzed_ids:
+            if self.debug:
+                self._log(f"🌀 IA ya analizado · {ctx['title'][:80]}")
+            return "ia_repeat"
+        return None
+
+    def _gate_keyword_prefilter(self, engine, item: dict, ctx: dict) -> str | None:
+        """Sin ningún término puntuable el heurístico no puede llegar al corte: descarte sin regex caras."""
+        if not self._auto_clf or self._auto_clf.may_score(self._heuristic_text(item, ctx)):
+            return None
+        item["Heur_Score"] = 0
+        item["Heur_Tags"] = {}
+        item["Heur_Hits"] = {}
+        item["_HeurFP"] = ctx["fp"]
+        self._discarded_auto.append(self._discard_record(ctx, item))
+
+        item["Decision"] = "drop"
+        item["DecisionGate"] = "automotive_filter"
+        item["DecisionReasons"] = ["Sin términos de automoción/ciberseguridad (prefiltro)"]
+        if self.debug:
+            self._log(f"⛔ prefiltro sin términos · {ctx['title'][:80]}")
+        return "keyword_prefilter"
+
+    def _gate_automotive(self, engine, item: dict, ctx: dict) -> str | None:
+        """Heurístico automoción (reutiliza el resultado si el contenido no ha cambiado)."""
+        title = ctx["title"]
+        if item.get("_HeurFP") == ctx["fp"] and "Heur_Score" in item:
+            heur_score, heur_hits = item["Heur_Score"], item.get("Heur_Hits") or {}
+        else:
+            res = self._auto_clf.score_text(self._heuristic_text(item, ctx)) if self._auto_clf else None
+            heur_score, heur_tags, heur_hits = (res.score, res.tags, res.hits) if res else (0, {}, {})
             item["Heur_Score"] = heur_score
             item["Heur_Tags"] = heur_tags
             item["Heur_Hits"] = heur_hits
+            item["_HeurFP"] = ctx["fp"]
+
+        if heur_score >= self._cutoff_red:
+            return None
+
+        # Guardar descarte de automoción
+        self._discarded_auto.append(self._discard_record(ctx, item))
+
+        # >>> Marca decisión DROP por automoción
+        item["Decision"] = "drop"
+        item["DecisionGate"] = "automotive_filter"
+        # razones “humanas”
+        auto_reasons = []
+        if heur_hits.get("brands"):
+            auto_reasons.append(f"Marca detectada: {', '.join(heur_hits['brands'])}")
+        if heur_hits.get("attack_terms"):
+            auto_reasons.append(f"Menciona: {', '.join(heur_hits['attack_terms'])}")
+        auto_reasons.append(f"Automoción insuficiente (score={heur_score}<{self._cutoff_red})")
+        item["DecisionReasons"] = auto_reasons[:5]
 
-            if heur_score < self._cutoff_red:
-                self.filtered_by_heuristic_auto += 1
-
-                # Guardar descarte de automoción (no invocamos aún filtro de incidentes)
-                self._discarded_auto.append({
-                    "NormKey": norm_key,
-                    "ItemType": item_type,
-                    "SourceRef": source_ref,
-                    "Title": title,
-                    "Summary": summary,
-                    "Year": year,
-                    "Heur_Score": heur_score,
-                    "Heur_Tags": heur_tags,
-                    "Heur_Hits": heur_hits,
-                    "IncidentScore": None,
-                    "IncidentReasons": [],
-                    "IncidentCategory": None,
-                })
-
-
-                # >>> Marca decisión DROP por automoción
-                item["Decision"] = "drop"
-                item["DecisionGate"] = "automotive_filter"
-                # razones “humanas”
-                auto_reasons = []
-                if heur_hits.get("brands"):
-                    auto_reasons.append(f"Marca detectada: {', '.join(heur_hits['brands'])}")
-                if heur_hits.get("attack_terms"):
-                    auto_reasons.append(f"Menciona: {', '.join(heur_hits['attack_terms'])}")
-                auto_reasons.append(f"Automoción insuficiente (score={heur_score}<{self._cutoff_red})")
-                item["DecisionReasons"] = auto_reasons[:5]
-
-                if self.debug:
-                    self._log(f"⛔ auto-heuristic score={heur_score} · {title[:80]}")
-                continue
+        if self.debug:
+            self._log(f"⛔ auto-heuristic score={heur_score} · {title[:80]}")
+        return "automotive_filter"
 
-            # === 2) INCIDENTES REALES (Action Gate) ===
+    def _gate_incident(self, engine, item: dict, ctx: dict) -> str | None:
+        """INCIDENTES REALES (Action Gate)."""
+        title, summary = ctx["title"], ctx["summary"]
+        if not (item.get("_IncFP") == ctx["fp"] and item.get("IncidentScore") is not None):
             action_gate = self._incident_filter.classify(title, summary)
             item["IncidentScore"] = action_gate.score
             item["IncidentReasons"] = action_gate.reasons
             item["IncidentCategory"] = action_gate.category
+            item["_IncidentKeep"] = action_gate.keep
+            item["_IncFP"] = ctx["fp"]
+
+        if item.get("_IncidentKeep"):
+            return None
 
-            if not action_gate.keep:
-                # Guardar descarte de incidentes
-                self._discarded_incidents.append({
-                    "NormKey": norm_key,
-                    "ItemType": item_type,
-                    "SourceRef": source_ref,
-                    "Title": title,
-                    "Summary": summary,
-                    "Year": year,
-                    "Heur_Score": item.get("Heur_Score"),
-                    "Heur_Tags": item.get("Heur_Tags"),
-                    "Heur_Hits": item.get("Heur_Hits"),
-                    "IncidentScore": action_gate.score,
-                    "IncidentReasons": action_gate.reasons,
-                    "IncidentCategory": action_gate.category,
-                })
-
-                # >>> Marca decisión DROP por incident_filter
-                item["Decision"] = "drop"
-                item["DecisionGate"] = "incident_filter"
-                # razones legibles (limpia prefijos +N / -N si existieran)
-                inc_reasons = [re.sub(r"^\+?-?\d+\s*", "", r) for r in (action_gate.reasons or [])]
-                if not inc_reasons:
-                    inc_reasons = ["No evidencia suficiente de incidente real"]
-                item["DecisionReasons"] = inc_reasons[:5]
-
-                self.filtered_by_heuristic_inci += 1
-
-                if self.debug:
-                    self._log(f"⛔ incident-gate {action_gate.category} score={action_gate.score} · {title[:80]}")
+        # Guardar descarte de incidentes
+        self._discarded_incidents.append(self._discard_record(ctx, item))
+
+        # >>> Marca decisión DROP por incident_filter
+        item["Decision"] = "drop"
+        item["DecisionGate"] = "incident_filter"
+        # razones legibles (limpia prefijos +N / -N si existieran)
+        inc_reasons = [re.sub(r"^\+?-?\d+\s*", "", r) for r in (item.get("IncidentReasons") or [])]
+        if not inc_reasons:
+            inc_reasons = ["No evidencia suficiente de incidente real"]
+        item["DecisionReasons"] = inc_reasons[:5]
+
+        if self.debug:
+            self._log(f"⛔ incident-gate {item.get('IncidentCategory')} score={item.get('IncidentScore')} · {title[:80]}")
+        return "incident_filter"
+
+    def _run_gate(self, name: str, engine, item: dict, ctx: dict) -> str | None:
+        fn = getattr(self, f"_gate_{self._GATE_METHODS[name]}")
+        t0 = time.perf_counter()
+        verdict = fn(engine, item, ctx)
+        self._record_gate(name, time.perf_counter() - t0, bool(verdict))
+        return verdict
+
+    def _record_gate(self, name: str, elapsed: float, rejected: bool):
+        with self._stats_lock:
+            st_ = self.gate_stats.setdefault(name, {"calls": 0, "rejects": 0, "time_s": 0.0})
+            st_["calls"] += 1
+            st_["rejects"] += int(rejected)
+            st_["time_s"] += elapsed
+
+    def _constrain_gate_order(self, order: list) -> list:
+        """Aplica _GATE_BEFORE (adelantando la puerta previa) y deja la IA siempre la última."""
+        order = [g for g in order if g != "ai"]
+        for first, thens in self._GATE_BEFORE.items():
+            if first not in order:
                 continue
+            later = [order.index(g) for g in thens if g in order]
+            if later and order.index(first) > min(later):
+                order.insert(min(later), order.pop(order.index(first)))
+        if "ai" in self._gate_order:
+            order.append("ai")
+        return order
+
+    def _maybe_reorder_gates(self):
+        """
+        Reordena las puertas (salvo IA, siempre la última) por coste / tasa de rechazo,
+        cada FILTER_GATE_WARMUP ítems, respetando las dependencias de _GATE_BEFORE.
+        """
+        if not self._gate_autoreorder:
+            return
+        with self._stats_lock:
+            self._gate_evals += 1
+            if self._gate_evals % self._gate_warmup:
+                return
+            stats = {k: dict(v) for k, v in self.gate_stats.items()}
+
+        def rank(name):
+            s = stats.get(name) or {}
+            calls = s.get("calls", 0)
+            if not calls:
+                return 0.0  # sin datos: se queda delante para medirla
+            cost = s["time_s"] / calls
+            reject_rate = s["rejects"] / calls
+            return cost / max(reject_rate, 1e-3)
+
+        new_order = self._constrain_gate_order(sorted(self._gate_order, key=rank))
+        if new_order != self._gate_order:
+            self._gate_order = new_order
+            if self.debug:
+                self._log(f"🔀 Orden de filtros: {' → '.join(new_order)}")
+
+    def _ai_levels(self, engine) -> dict:
+        niveles = getattr(engine, "values_levels_ia", {})
+        if not niveles or not isinstance(niveles, dict):
+            if not self._warned_no_levels:
+                st.warning("⚠️ No se han definido niveles válidos para el filtrado IA.")
+                self._warned_no_levels = True
+            return {}
+        return niveles
+
+    @staticmethod
+    def _level_params(config: dict) -> dict:
+        """Parámetros de decisión del ensemble para un nivel."""
+        return {
+            "threshold": config.get("threshold", 0.4),
+            # parámetros avanzados
+            "min_votes": config.get("min_votes", 2),
+            "min_margin": config.get("min_margin", 0.15),
+            "entropy_cap": config.get("entropy_cap", 1.50),
+            "per_model_min": config.get("per_model_min", 0.00),
+            "abstain_label": config.get("abstain_label", "NO_LABEL"),
+        }
 
-            # Duplicados IA
-            if norm_key in engine.ia_analyzed_ids:
-                self.already_processed_ia += 1
-                if self.debug:
-                    self._log(f"🌀 IA ya analizado · {title[:80]}")
+    def _run_ai_batch(self, engine, entries: list, lock=None) -> list:
+        """
+        Filtro IA por lotes. entries = [(item, ctx), ...]. Devuelve los que superan todos los niveles.
+          1) Prefiltro semántico de cada nivel (barato) antes de cualquier inferencia.
+          2) Una sola pasada por modelo con la unión de etiquetas de todos los niveles (classify_levels).
+          3) Reglas de cada nivel en orden sobre la tabla compartida; el primero que descarta decide.
+        Con lock (pipeline en streaming) solo la inferencia (embeddings y NLI) corre fuera del
+        cerrojo; se ignoran los ítems que cambiaron o se fusionaron entretanto (ya vuelven a estar en cola).
+        """
+        guard = lock if lock is not None else contextlib.nullcontext()
+        alive = [(item, ctx, i) for i, (item, ctx) in enumerate(entries)]
+        spent = [0.0] * len(alive)  # tiempo IA atribuido a cada ítem (para gate_stats)
+        levels = [(lid, cfg) for lid, cfg in self._ai_levels(engine).items() if cfg.get("labels", [])]
+
+        # 1) Prefiltro semántico: descarta lo que no se parece a ninguna etiqueta positiva.
+        #    Los embeddings (y la carga del modelo) van fuera del cerrojo; las decisiones, dentro.
+        sem = {}
+        with guard:
+            alive = [e for e in alive if self._still_pending(e[0], e[1])]
+        computed = self._semantic_similarities(alive, spent, levels) if alive and levels else {}
+        with guard:
+            alive = [e for e in alive if self._still_pending(e[0], e[1])]
+            for level_id, config in levels:
+                if not alive or level_id not in computed:
+                    break
+                alive, sims, label_key = self._semantic_gate(alive, level_id, computed[level_id])
+                sem[level_id] = (sims, label_key)
+
+        # 2) Puntuación compartida entre niveles
+        per_level, per_item = None, 0.0
+        if alive and levels:
+            t0 = time.perf_counter()
+            per_level = self.classifier.classify_levels(
+                [(ctx["title"], ctx["summary"]) for _, ctx, _ in alive],
+                [(lid, cfg["labels"], self._level_params(cfg)) for lid, cfg in levels],
+                batch_size=self.ai_batch_size,
+            )
+            per_item = (time.perf_counter() - t0) / len(alive)
+
+        with guard:
+            if per_level is not None:
+                # 3) Decisión nivel a nivel
+                accepted_sims = {lid: [] for lid in sem}
+                survivors = []
+                for (item, ctx, i), results in zip(alive, per_level):
+                    if not self._still_pending(item, ctx):
+                        continue
+                    spent[i] += per_item
+                    rejected = False
+                    for level_id, config in levels:
+                        if self._apply_ai_level(item, ctx, level_id, config, results[level_id]):
+                            rejected = True
+                            break
+                        if level_id in sem and i in sem[level_id][0]:
+                            accepted_sims[level_id].append(sem[level_id][0][i])
+                    if rejected:
+                        self._record_gate("ai", spent[i], True)
+                        self._record_decision(item, "ai_zeroshot", self._ctx_norm_key(ctx), ctx["fp"])
+                    else:
+                        survivors.append((item, ctx, i))
+                alive = survivors
+
+                # Las similitudes de lo que la IA acepta calibran el suelo del prefiltro
+                for level_id, sims in accepted_sims.items():
+                    if self.semantic is not None:
+                        self.semantic.observe(sem[level_id][1], sims)
+
+            for _, _, i in alive:
+                self._record_gate("ai", spent[i], False)
+        return [(item, ctx) for item, ctx, _ in alive]
+
+    def _semantic_similarities(self, alive: list, spent: list, levels: list) -> dict:
+        """
+        Similitud de cada ítem con las etiquetas positivas de cada nivel: {level_id: (label_key, {idx: sim})}.
+        El embedding de cada ítem se calcula una vez (caché por texto) y sirve para todos los niveles.
+        """
+        sem = self.semantic
+        if sem is None:
+            return {}
+        texts = [f"{ctx['title']}. {ctx['summary']}".strip() for _, ctx, _ in alive]
+        out = {}
+        for level_id, config in levels:
+            bad = set(config.get("bad_labels", []))
+            positives = [lbl for lbl in config.get("labels", []) if lbl not in bad]
+            t0 = time.perf_counter()
+            try:
+                values = sem.similarities(texts, positives)
+            except Exception as e:
+                self._log(f"🔴 Prefiltro semántico desactivado: {e}")
+                self._semantic_enabled, self._semantic = False, None
+                return {}
+            per_item = (time.perf_counter() - t0) / max(1, len(alive))
+            for _, _, i in alive:
+                spent[i] += per_item
+            out[level_id] = (sem.label_key(positives), {i: v for (_, _, i), v in zip(alive, values)}, per_item)
+        return out
+
+    def _semantic_gate(self, alive: list, level_id, computed: tuple):
+        """
+        Prefiltro por embeddings de un nivel con las similitudes ya calculadas.
+        Devuelve (supervivientes, {idx: similitud} de la muestra de calibración, label_key).
+        Mientras el suelo se calibra no descarta nada, solo mide. Después, una fracción aleatoria
+        (SEMANTIC_EXPLORE) pasa a la IA aunque quede bajo el suelo: solo esa muestra sin sesgo
+        sigue calibrando, así la cola baja se sigue viendo y el suelo no sube solo.
+        """
+        label_key, values, per_item = computed
+        sem = self.semantic
+        floor = sem.floor(label_key)
+
+        sims, survivors = {}, []
+        for item, ctx, i in alive:
+            sim = values[i]
+            item[f"SemSim_{level_id}"] = round(sim, 3)
+            probe = floor is None or sem.sample()
+            if probe:
+                sims[i] = sim
+            rejected = floor is not None and sim < floor and not probe
+            self._record_gate("semantic", per_item, rejected)
+            if not rejected:
+                survivors.append((item, ctx, i))
                 continue
 
-            # === 3) Clasificación con IA (ensemble) ===
-            discarded_by_ia = False
-            if getattr(engine, "apply_filter_ia", False):
-                niveles = getattr(engine, "values_levels_ia", {})
+            rec = self._discard_record(ctx, item)
+            rec.update({
+                "IA_Level": level_id,
+                "IA_Label": "semantic_prefilter",
+                "Semantic_Sim": round(sim, 3),
+                "Semantic_Floor": round(floor, 3),
+                "Semantic_Model": sem.model_name,
+            })
+            self._discarded_ai.append(rec)
+
+            item["Decision"] = "drop"
+            item["DecisionGate"] = "semantic_prefilter"
+            item["DecisionReasons"] = [f"Nivel {level_id}: similitud {round(sim, 3)} < suelo {round(floor, 3)}"]
+            self._record_decision(item, "semantic_prefilter", self._ctx_norm_key(ctx), ctx["fp"])
+            if self.debug:
+                self._log(f"  ↪ descartado por prefiltro semántico en nivel {level_id} (sim={sim:.3f})")
+        return survivors, sims, label_key
 
-                if not niveles or not isinstance(niveles, dict):
-                    st.warning("⚠️ No se han definido niveles válidos para el filtrado IA.")
-                    return
+    def _record_cascade(self, level_id, stage: str | None, rejected: bool):
+        """Cuenta por nivel cuántos ítems decide cada etapa de la cascada IA y con qué resultado."""
+        if not stage:
+            return
+        with self._stats_lock:
+            lvl = self.cascade_stats.setdefault(str(level_id), {})
+            k = f"{stage}_{'reject' if rejected else 'accept'}"
+            lvl[k] = lvl.get(k, 0) + 1
+
+    def _cascade_summary(self) -> str:
+        fast = sum(v for lvl in self.cascade_stats.values() for k, v in lvl.items() if k.startswith("fast_"))
+        total = sum(v for lvl in self.cascade_stats.values() for v in lvl.values())
+        return f"{fast}/{total} ({round(100.0 * fast / total, 1)}%)" if total else "0/0"
+
+    def _apply_ai_level(self, item: dict, ctx: dict, level_id, config: dict, result) -> bool:
+        """Vuelca el resultado de un nivel en el ítem; True si el nivel lo descarta."""
+        label, score, per_model, dbg = result
+        etiquetas_malas = config.get("bad_labels", [])
+        umbral = config.get("threshold", 0.4)
+        abstain_label = config.get("abstain_label", "NO_LABEL")
+        item[f"Label_{level_id}"] = label
+        item[f"Score_{level_id}"] = round(score, 3)
+        item[f"Accepted_{level_id}"] = dbg.get("accepted", False)
+        item[f"Votes_{level_id}"] = dbg.get("votes", 0)
+        item[f"Margin_{level_id}"] = round(dbg.get("margin", 0.0), 3)
+        item[f"Entropy_{level_id}"] = round(dbg.get("entropy", 0.0), 3)
 
-                for level_id, config in niveles.items():
-                    etiquetas_nivel = config.get("labels", [])
-                    etiquetas_malas = config.get("bad_labels", [])
-                    umbral = config.get("threshold", 0.4)
+        if self.debug:
+            self._log(f"  [{level_id}] label={label} score={score:.3f} votes={dbg.get('votes')} "
+                      f"margin={dbg.get('margin', 0.0):.3f} accepted={dbg.get('accepted')}")
+
+        # Condiciones de descarte por IA
+        rejected = (
+            (not dbg.get("accepted", False)) or
+            (label in etiquetas_malas) or
+            (label == abstain_label)
+        )
+        self._record_cascade(level_id, dbg.get("stage"), rejected)
+
+        if rejected:
+            # ✅ Guardar descarte de IA
+            rec = self._discard_record(ctx, item)
+            rec.update({
+                "IA_Level": level_id,
+                "IA_Label": label,
+                "IA_Score": round(score, 3),
+                "IA_Threshold": umbral,
+                "IA_Votes": dbg.get("votes", 0),
+                "IA_Margin": round(dbg.get("margin", 0.0), 3),
+                "IA_Entropy": round(dbg.get("entropy", 0.0), 3),
+                "IA_Accepted": dbg.get("accepted", False),
+                "IA_AbstainLabel": abstain_label,
+                "IA_BadLabels": list(etiquetas_malas),
+                # Opcional: top-3 por modelo para auditoría ligera
+                "IA_PerModelTop3": {
+                    m: rows[:3] for m, rows in (per_model or {}).items()
+                }
+            })
+            self._discarded_ai.append(rec)
+
+            # >>> Marca decisión DROP por IA
+            item["Decision"] = "drop"
+            item["DecisionGate"] = "ai_zeroshot"
+            reason = []
+            reason.append(f"Nivel {level_id}: label={label} score={round(score,3)} thr={umbral}")
+            if label == abstain_label:
+                reason.append("Abstención IA")
+            if label in etiquetas_malas:
+                reason.append("Etiqueta negativa")
+            if not dbg.get("accepted", False):
+                reason.append("No cumple aceptación del ensemble")
+            item["DecisionReasons"] = reason[:5]
 
-                    # parámetros avanzados
-                    min_votes = config.get("min_votes", 2)
-                    min_margin = config.get("min_margin", 0.15)
-                    entropy_cap = config.get("entropy_cap", 1.50)
-                    per_model_min = config.get("per_model_min", 0.00)
-                    abstain_label = config.get("abstain_label", "NO_LABEL")
+            if self.debug:
+                self._log(f"  ↪ descartado por IA en nivel {level_id} (label={label})")
+            return True
+
+        return False
+
+    def _mark_keep(self, item: dict):
+        # >>> Marca decisión KEEP (pasó auto + incidentes y, si aplica, IA)
+        item["Decision"] = "keep"
+        item["DecisionGate"] = "final"
+        heur_hits = item.get("Heur_Hits") or {}
+        keep_reasons = []
+        if heur_hits.get("brands"):
+            keep_reasons.append(f"Marca detectada: {', '.join(heur_hits['brands'])}")
+        if heur_hits.get("attack_terms"):
+            keep_reasons.append(f"Menciona: {', '.join(heur_hits['attack_terms'])}")
+        # añade hasta 3 razones del action gate ya calculadas
+        inc_reasons_short = [re.sub(r"^\+?-?\d+\s*", "", r) for r in (item.get("IncidentReasons") or [])][:3]
+        keep_reasons.extend(inc_reasons_short)
+        item["DecisionReasons"] = (keep_reasons or ["Cumple filtros automoción e incidente"])[:5]
+
+    @staticmethod
+    def _new_ctx(item: dict, item_type: str, fp: str) -> dict:
+        # Año
+        try:
+            year = int(item.get("Year"))
+        except (ValueError, TypeError):
+            year = None
 
-                    if not etiquetas_nivel:
-                        continue
+        # norm_key se calcula bajo demanda: el filtro de año no lo necesita
+        return {
+            "item": item, "item_type": item_type, "fp": fp, "year": year,
+            "title": item.get("Title", "") or "", "summary": item.get("Summary", "") or "",
+        }
 
-                    # (label, score, per_model, dbg)
-                    label, score, per_model, dbg = self.analyzer.classify_with_ensemble(
-                        title,
-                        summary,
-                        custom_labels=etiquetas_nivel,
-                        threshold=umbral,
-                        min_votes=min_votes,
-                        min_margin=min_margin,
-                        entropy_cap=entropy_cap,
-                        per_model_min=per_model_min,
-                        abstain_label=abstain_label,
-                    )
-
-                    item[f"Label_{level_id}"] = label
-                    item[f"Score_{level_id}"] = round(score, 3)
-                    item[f"Accepted_{level_id}"] = dbg.get("accepted", False)
-                    item[f"Votes_{level_id}"] = dbg.get("votes", 0)
-                    item[f"Margin_{level_id}"] = round(dbg.get("margin", 0.0), 3)
-                    item[f"Entropy_{level_id}"] = round(dbg.get("entropy", 0.0), 3)
-
-                    if self.debug:
-                        self._log(f"  [{level_id}] label={label} score={score:.3f} votes={dbg.get('votes')} "
-                                  f"margin={dbg.get('margin', 0.0):.3f} accepted={dbg.get('accepted')}")
-
-                    # Condiciones de descarte por IA
-                    rejected = (
-                        (not dbg.get("accepted", False)) or
-                        (label in etiquetas_malas) or
-                        (label == abstain_label)
-                    )
+    def _still_pending(self, item: dict, ctx: dict) -> bool:
+        """True si el ítem sigue a la espera de decisión con el contenido de ctx (no cambió, ni se decidió ni se fusionó)."""
+        return item.get("_FilterHeurFP") == ctx["fp"] == self._item_fingerprint(item)
 
-                    if rejected:
-                        self.filtered_by_ai += 1
-                        discarded_by_ia = True
-
-                        # ✅ Guardar descarte de IA
-                        self._discarded_ai.append({
-                            "NormKey": norm_key,
-                            "ItemType": item_type,
-                            "SourceRef": source_ref,
-                            "Title": title,
-                            "Summary": summary,
-                            "Year": year,
-                            "Heur_Score": item.get("Heur_Score"),
-                            "Heur_Tags": item.get("Heur_Tags"),
-                            "Heur_Hits": item.get("Heur_Hits"),
-                            "IncidentScore": item.get("IncidentScore"),
-                            "IncidentReasons": item.get("IncidentReasons"),
-                            "IncidentCategory": item.get("IncidentCategory"),
-                            "IA_Level": level_id,
-                            "IA_Label": label,
-                            "IA_Score": round(score, 3),
-                            "IA_Threshold": umbral,
-                            "IA_Votes": dbg.get("votes", 0),
-                            "IA_Margin": round(dbg.get("margin", 0.0), 3),
-                            "IA_Entropy": round(dbg.get("entropy", 0.0), 3),
-                            "IA_Accepted": dbg.get("accepted", False),
-                            "IA_AbstainLabel": abstain_label,
-                            "IA_BadLabels": list(etiquetas_malas),
-                            # Opcional: top-3 por modelo para auditoría ligera
-                            "IA_PerModelTop3": {
-                                m: rows[:3] for m, rows in (per_model or {}).items()
-                            }
-                        })
-
-                        # >>> Marca decisión DROP por IA
-                        item["Decision"] = "drop"
-                        item["DecisionGate"] = "ai_zeroshot"
-                        reason = []
-                        reason.append(f"Nivel {level_id}: label={label} score={round(score,3)} thr={umbral}")
-                        if label == abstain_label:
-                            reason.append("Abstención IA")
-                        if label in etiquetas_malas:
-                            reason.append("Etiqueta negativa")
-                        if not dbg.get("accepted", False):
-                            reason.append("No cumple aceptación del ensemble")
-                        item["DecisionReasons"] = reason[:5]
-
-                        if self.debug:
-                            self._log(f"  ↪ descartado por IA en nivel {level_id} (label={label})")
-                        break  # no hace falta evaluar más niveles
-
-                if discarded_by_ia:
-                    continue
-
-                engine.ia_analyzed_ids.add(norm_key)
-
-
-            # === Guardar en resultados finales ===
-            # >>> Marca decisión KEEP (pasó auto + incidentes y, si aplica, IA)
-            if item.get("Decision") is None:
-                item["Decision"] = "keep"
-                item["DecisionGate"] = "final"
-                keep_reasons = []
-                if heur_hits.get("brands"):
-                    keep_reasons.append(f"Marca detectada: {', '.join(heur_hits['brands'])}")
-                if heur_hits.get("attack_terms"):
-                    keep_reasons.append(f"Menciona: {', '.join(heur_hits['attack_terms'])}")
-                # añade hasta 3 razones del action gate ya calculadas
-                inc_reasons_short = [re.sub(r"^\+?-?\d+\s*", "", r) for r in (item.get("IncidentReasons") or [])][:3]
-                keep_reasons.extend(inc_reasons_short)
-                item["DecisionReasons"] = (keep_reasons or ["Cumple filtros automoción e incidente"])[:5]
-
-            # === Guardar en resultados finales ===
-            engine.final_results[norm_key] = item
-            self.saved_items += 1
-            if self.debug:
-                self._log(f"✅ SAVE → {title[:80]}")
+    def _evaluate_gates(self, engine, item: dict, item_type: str):
+        """
+        Recorre las puertas en self._gate_order salvo la IA.
+        Devuelve (status, ctx) con status "skip" | "drop" | "pass".
+        Un ítem que ya pasó las puertas con este mismo contenido (IA pendiente, _FilterHeurFP)
+        vuelve como "pass" sin repetirlas.
+        """
+        fp = self._item_fingerprint(item)
+        if item.get("_FilterFP") == fp:
+            return "skip", None
 
-        # Persistir todos los descartes al finalizar el bucle
+        if item_type not in ("papers", "vulnerabilities", "news"):
+            st.warning(f"⚠️ Tipo desconocido: {item_type}")
+            return "skip", None
+
+        if item.get("_FilterHeurFP") == fp:
+            return "pass", self._new_ctx(item, item_type, fp)
+
+        # Si ya se decidió con otro contenido, revertimos la decisión anterior
+        self._forget_previous(engine, item)
+
+        # >>> Inicializa campos de decisión para la tarjeta
+        item["Decision"] = None
+        item["DecisionGate"] = None
+        item["DecisionReasons"] = []
+        item["RulesVersion"] = os.getenv("RULES_VERSION", "rules@v1")
+
+        ctx = self._new_ctx(item, item_type, fp)
+
+        self._maybe_reorder_gates()
+        for name in self._gate_order:
+            if name == "ai":
+                continue
+            gate = self._run_gate(name, engine, item, ctx)
+            if gate:
+                self._record_decision(item, gate, ctx.get("norm_key"), fp)
+                return "drop", ctx
+
+        item["_FilterHeurFP"] = fp  # se borra al registrar la decisión final
+        return "pass", ctx
+
+    def _needs_ai(self, engine) -> bool:
+        return "ai" in self._gate_order and getattr(engine, "apply_filter_ia", False)
+
+    def _finalize_keep(self, engine, item: dict, ctx: dict, ai_done: bool) -> str:
+        norm_key = self._ctx_norm_key(ctx)
+        if ai_done:
+            # en lote, otro ítem con la misma clave puede haberse aceptado antes
+            if norm_key in engine.ia_analyzed_ids:
+                self._record_decision(item, "ia_repeat", norm_key, ctx["fp"])
+                return "drop"
+            engine.ia_analyzed_ids.add(norm_key)
+
+        # === Guardar en resultados finales ===
+        self._mark_keep(item)
+        engine.final_results[norm_key] = item
+        self._record_decision(item, "final", norm_key, ctx["fp"], ai_done=ai_done)
+        if self.debug:
+            self._log(f"✅ SAVE → {ctx['title'][:80]}")
+        return "keep"
+
+    def _process_item(self, engine, key, item: dict, item_type: str, run_ai: bool = True) -> str:
+        """
+        Evalúa un ítem recorriendo las puertas (la IA siempre al final). Devuelve:
+          "keep" | "drop" | "skip" (sin cambios / tipo desconocido) | "pending_ai" (pasa heurísticos, IA diferida)
+        """
+        status, ctx = self._evaluate_gates(engine, item, item_type)
+        if status != "pass":
+            return status
+
+        # === Clasificación con IA (ensemble) ===
+        ai_done = False
+        if self._needs_ai(engine):
+            if not run_ai:
+                return "pending_ai"
+            if not self._run_ai_batch(engine, [(item, ctx)]):
+                return "drop"
+            ai_done = True
+
+        return self._finalize_keep(engine, item, ctx, ai_done)
+
+    def process_key(self, engine, key, item_type, run_ai: bool = True) -> str:
+        """Evalúa un único ítem de engine.raw_items (uso desde el pipeline en streaming)."""
+        item = engine.raw_items.get(key)
+        if item is None:
+            return "skip"
+        return self._process_item(engine, key, item, item_type, run_ai=run_ai)
+
+    def run_heuristics(self, engine, key, item_type):
+        """
+        Puertas sin IA de un ítem de engine.raw_items (etapa de heurísticos del pipeline).
+        Devuelve (status, ctx): "keep" | "drop" | "skip" ya resueltos (ctx=None) o "pending_ai"
+        con el ctx que espera classify_pending.
+        """
+        item = engine.raw_items.get(key)
+        if item is None:
+            return "skip", None
+        status, ctx = self._evaluate_gates(engine, item, item_type)
+        if status != "pass":
+            return status, None
+        if self._needs_ai(engine):
+            ctx["key"] = key
+            return "pending_ai", ctx
+        return self._finalize_keep(engine, item, ctx, ai_done=False), None
+
+    def classify_pending(self, engine, ctxs: list, lock=None) -> list:
+        """
+        IA por lotes sobre los ctx "pending_ai" de run_heuristics. Con lock, la inferencia corre
+        fuera del cerrojo y lo que cambió entretanto se ignora. Devuelve las claves aceptadas.
+        """
+        guard = lock if lock is not None else contextlib.nullcontext()
+        unique = list({ctx["key"]: ctx for ctx in ctxs}.values())
+        survivors = self._run_ai_batch(engine, [(ctx["item"], ctx) for ctx in unique], lock=lock)
+        kept = []
+        with guard:
+            for item, ctx in survivors:
+                if self._still_pending(item, ctx) and self._finalize_keep(engine, item, ctx, ai_done=True) == "keep":
+                    kept.append(ctx["key"])
+        return kept
+
+    def flush_discards(self):
+        """Persiste los descartes acumulados en memoria."""
         self._save_discarded_auto(flush=True)
         self._save_discarded_incidents(flush=True)
         self._save_discarded_ai(flush=True)
 
+    def filter_and_classify_items(self, engine, item_type, full: bool = False, run_ai: bool | None = None):
+        """
+        Aplica todos los filtros y usa el clasificador IA de forma incremental:
+        solo se evalúan los ítems nuevos o cuyo título/resumen ha cambiado desde la
+        última pasada (engine.dirty_ids). Con full=True se re-evalúa todo raw_items.
+        run_ai=False deja la IA pendiente para una pasada posterior (por defecto: INCREMENTAL_AI).
+        """
+        # Asegura estructuras del motor
+        if not hasattr(engine, "ia_analyzed_ids"):
+            engine.ia_analyzed_ids = set()
+        if not hasattr(engine, "final_results"):
+            engine.final_results = {}
+        if run_ai is None:
+            run_ai = self.incremental_ai
+
+        keys = self._pending_keys(engine, full=full)
+        if not keys:
+            return
+        self._log(f"🟠 🧪 Aplicando filtros y clasificando con IA... ({len(keys)} pendientes)")
+
+        deferred, to_classify = [], []
+        needs_ai = self._needs_ai(engine)
+        for key in keys:
+            item = engine.raw_items.get(key)
+            if item is None:
+                continue
+            if full:
+                item.pop("_FilterFP", None)
+                item.pop("_FilterHeurFP", None)
+            status, ctx = self._evaluate_gates(engine, item, item_type)
+            if status != "pass":
+                continue
+            if not needs_ai:
+                self._finalize_keep(engine, item, ctx, ai_done=False)
+            elif run_ai:
+                to_classify.append((item, ctx))
+            else:
+                deferred.append(key)
+
+        # === IA por lotes sobre los supervivientes de los heurísticos ===
+        for i in range(0, len(to_classify), self.ai_chunk_items):
+            chunk = to_classify[i:i + self.ai_chunk_items]
+            for item, ctx in self._run_ai_batch(engine, chunk):
+                self._finalize_keep(engine, item, ctx, ai_done=True)
+
+        # Los pendientes de IA siguen sucios para la siguiente pasada
+        if deferred and hasattr(engine, "dirty_ids"):
+            engine.dirty_ids.update(deferred)
+
+        # Persistir todos los descartes al finalizar el bucle
+        self.flush_discards()
+
         # Mostrar resumen
         self.mostrar_resultados()
 
@@ -473,8 +999,13 @@ class FilterEngine:
             "filtered_by_heuristic_auto": getattr(self, "filtered_by_heuristic_auto", 0),
             "filtered_by_heuristic_inci": getattr(self, "filtered_by_heuristic_inci", 0),
             "already_processed_ia": self.already_processed_ia,
+            "filtered_by_semantic": self.filtered_by_semantic,
             "filtered_by_ai": self.filtered_by_ai,
             "saved_items": self.saved_items,
+            "gate_stats": self.gate_stats,
+            "gate_order": self._gate_order,
+            "cascade_stats": self.cascade_stats,
+            "ai_timings": self._ai_timings(),
         }
 
     def load_stats_from_dict(self, d: dict | None):
@@ -486,5 +1017,14 @@ class FilterEngine:
         self.filtered_by_heuristic_auto = int(d.get("filtered_by_heuristic_auto", 0))
         self.filtered_by_heuristic_inci = int(d.get("filtered_by_heuristic_inci", 0))
         self.already_processed_ia = int(d.get("already_processed_ia", 0))
+        self.filtered_by_semantic = int(d.get("filtered_by_semantic", 0))
         self.filtered_by_ai = int(d.get("filtered_by_ai", 0))
         self.saved_items = int(d.get("saved_items", 0))
+        self.gate_stats = {k: dict(v) for k, v in (d.get("gate_stats") or {}).items()}
+        self.cascade_stats = {k: dict(v) for k, v in (d.get("cascade_stats") or {}).items()}
+        # el orden aprendido solo sirve de semilla: FILTER_GATE_ORDER explícito manda, y el guardado
+        # debe tener exactamente las puertas configuradas (si no, es de otra configuración)
+        saved_order = list(d.get("gate_order") or [])
+        if (saved_order and self._gate_autoreorder and not os.getenv("FILTER_GATE_ORDER", "").strip()
+                and sorted(saved_order) == sorted(self._gate_order)):
+            self._gate_order = self._constrain_gate_order(saved_order)
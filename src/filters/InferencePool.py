@@ -0,0 +1,219 @@
+# src/filters/InferencePool.py
+import os
+import atexit
+import queue
+import threading
+import traceback
+import multiprocessing as mp
+from collections import defaultdict
+
+
+class _QueueLog:
+    """log_manager del worker: reenvía los mensajes al proceso principal, que los registra."""
+
+    def __init__(self, worker_id: int, result_q):
+        self.worker_id = worker_id
+        self.result_q = result_q
+
+    def log_state(self, msg: str):
+        try:
+            self.result_q.put(("log", self.worker_id, str(msg), None))
+        except Exception:
+            pass
+
+
+def _worker_main(worker_id: int, threads: int, task_q, result_q):
+    """
+    Proceso de inferencia: fija sus hilos, carga una vez los modelos configurados
+    (IA_MODELS/IA_BACKENDS... se heredan del entorno) y atiende lotes hasta recibir None.
+    Los errores (con traceback) y los avisos del tagger viajan al padre por result_q.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except Exception:
+        pass
+
+    try:
+        from src.filters.MultiModelTaggerLocal import MultiModelTaggerLocal
+
+        tagger = MultiModelTaggerLocal(_log_manager=_QueueLog(worker_id, result_q))
+        for key in tagger.active_models:
+            tagger.get_pipeline(key)
+    except Exception:
+        result_q.put(("fatal", worker_id, traceback.format_exc(), None))
+        return
+    result_q.put(("ready", worker_id, None, None))
+
+    while True:
+        task = task_q.get()
+        if task is None:
+            return
+        task_id, method, items, args, kwargs = task
+        before = dict(tagger.timings)
+        try:
+            res = getattr(tagger, method)(items, *args, **kwargs)
+            delta = {k: v - before.get(k, 0.0) for k, v in tagger.timings.items()}
+            result_q.put(("ok", task_id, res, delta))
+        except Exception:
+            result_q.put(("error", task_id, traceback.format_exc(), None))
+
+
+class InferencePool:
+    """
+    Pool de procesos para el ensemble zero-shot.
+
+    - IA_WORKERS procesos (spawn), cada uno con IA_THREADS_PER_WORKER hilos de torch
+      (por defecto nº de núcleos / IA_WORKERS) para repartir los núcleos sin sobresuscribir.
+    - classify_many()/classify_levels() tienen la misma firma que en MultiModelTaggerLocal:
+      trocean los ítems entre los workers y devuelven los resultados en el orden de entrada.
+    - Si un worker falla o muere, sus trozos se calculan en este proceso.
+    - Los mensajes del tagger de cada worker y el traceback de sus errores se registran aquí
+      (con el prefijo del worker) antes de recurrir al cálculo local.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: int, threads_per_worker: int | None = None, log_manager=None):
+        self.workers = max(1, workers)
+        cores = os.cpu_count() or 1
+        self.threads = threads_per_worker or max(1, cores // self.workers)
+        self.log_manager = log_manager
+        self.timings = defaultdict(float)
+
+        self._ctx = mp.get_context("spawn")
+        self._task_q = self._ctx.Queue()
+        self._result_q = self._ctx.Queue()
+        self._procs = []
+        self._next_id = 0
+        self._lock = threading.Lock()  # una llamada a classify_many a la vez
+        self._local = None             # tagger de respaldo (solo si falla un worker)
+        self._ready = 0
+        self._broken = False
+
+    @classmethod
+    def shared(cls, workers: int, threads_per_worker: int | None = None, log_manager=None) -> "InferencePool":
+        """Pool único por proceso y configuración (los reruns de Streamlit lo reutilizan)."""
+        key = (workers, threads_per_worker)
+        with cls._shared_lock:
+            pool = cls._shared.get(key)
+            if pool is None or pool._broken:
+                pool = cls(workers, threads_per_worker, log_manager=log_manager)
+                cls._shared[key] = pool
+            return pool
+
+    # ----------------- Ciclo de vida -----------------
+    def start(self):
+        if self._procs:
+            return self
+        for i in range(self.workers):
+            p = self._ctx.Process(
+                target=_worker_main,
+                args=(i, self.threads, self._task_q, self._result_q),
+                name=f"ia-worker-{i}",
+                daemon=True,
+            )
+            p.start()
+            self._procs.append(p)
+        atexit.register(self.close)
+        self._log(f"🟠 Pool IA: {self.workers} procesos × {self.threads} hilos (cargando modelos...)")
+        return self
+
+    def close(self):
+        if not self._procs:
+            return
+        for _ in self._procs:
+            try:
+                self._task_q.put(None)
+            except Exception:
+                pass
+        for p in self._procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        self._procs = []
+
+    def _log(self, msg: str):
+        if self.log_manager:
+            self.log_manager.log_state(msg)
+        if os.getenv("DEBUG_LOGS", "0") == "1":
+            print(msg, flush=True)
+
+    def _local_tagger(self):
+        if self._local is None:
+            from src.filters.MultiModelTaggerLocal import MultiModelTaggerLocal
+            self._local = MultiModelTaggerLocal(_log_manager=self.log_manager)
+        return self._local
+
+    # ----------------- Inferencia -----------------
+    def classify_many(self, items: list, custom_labels: list, **kwargs) -> list:
+        return self._map("classify_many", items, (list(custom_labels),), kwargs)
+
+    def classify_levels(self, items: list, levels: list, **kwargs) -> list:
+        return self._map("classify_levels", items, (list(levels),), kwargs)
+
+    def _run_local(self, method: str, items: list, args: tuple, kwargs: dict) -> list:
+        return getattr(self._local_tagger(), method)(items, *args, **kwargs)
+
+    def _map(self, method: str, items: list, args: tuple, kwargs: dict) -> list:
+        if not items:
+            return []
+        if self._broken:
+            return self._run_local(method, items, args, kwargs)
+
+        with self._lock:
+            self.start()
+            n = min(len(items), self.workers)
+            size = -(-len(items) // n)
+            chunks = {}
+            for start in range(0, len(items), size):
+                self._next_id += 1
+                chunks[self._next_id] = (start, items[start:start + size])
+                self._task_q.put((self._next_id, method, chunks[self._next_id][1], args, kwargs))
+
+            results = [None] * len(items)
+            pending = set(chunks)
+            while pending:
+                try:
+                    kind, task_id, payload, delta = self._result_q.get(timeout=5)
+                except queue.Empty:
+                    if all(p.is_alive() for p in self._procs):
+                        continue
+                    self._broken = True
+                    self._log("🔴 Un worker de IA ha terminado inesperadamente; se continúa en este proceso.")
+                    break
+
+                if kind == "log":
+                    self._log(f"[ia-worker-{task_id}] {payload}")
+                    continue
+                if kind == "fatal":
+                    # el worker no pudo arrancar: sus trozos los recogerá la comprobación de vivos
+                    self._log(f"🔴 El worker de IA {task_id} no pudo arrancar:\n{payload}")
+                    continue
+                if kind == "ready":
+                    self._ready += 1
+                    if self._ready == self.workers:
+                        self._log("🟢 Pool IA listo.")
+                    continue
+                if task_id not in pending:
+                    continue  # respuesta de una llamada anterior abandonada
+                pending.discard(task_id)
+                start, chunk = chunks[task_id]
+                if kind == "ok":
+                    results[start:start + len(chunk)] = payload
+                    for k, v in (delta or {}).items():
+                        self.timings[k] += v
+                else:
+                    self._log(f"🔴 Error en worker de IA; se reintenta en este proceso:\n{payload}")
+                    results[start:start + len(chunk)] = self._run_local(method, chunk, args, kwargs)
+
+            for task_id in pending:
+                start, chunk = chunks[task_id]
+                results[start:start + len(chunk)] = self._run_local(method, chunk, args, kwargs)
+            if self._broken:
+                self.close()
+        return results
@@ -0,0 +1,97 @@
+# src/filters/ModelRegistry.py
+import hashlib
+import threading
+
+try:
+    import streamlit as st
+    from streamlit import runtime as st_runtime
+except Exception:  # streamlit no instalado o versión sin esta API
+    st = None
+    st_runtime = None
+
+
+# Registro de proceso: key -> {"fp": huella, "model": nombre, "pipe": pipeline, "refs": nº de taggers}
+_LOCAL_STORE: dict = {}
+_LOCK = threading.RLock()
+
+
+def _in_streamlit() -> bool:
+    """True si corremos dentro de `streamlit run` (con o sin contexto de script en este hilo)."""
+    if st_runtime is None:
+        return False
+    try:
+        return st_runtime.exists()
+    except Exception:
+        return False
+
+
+if st is not None:
+    @st.cache_resource(show_spinner=False)
+    def _streamlit_store() -> dict:
+        # Sobrevive a reruns y recargas de módulos de la app
+        return {}
+else:
+    _streamlit_store = None
+
+
+def _store() -> dict:
+    if _streamlit_store is not None and _in_streamlit():
+        return _streamlit_store()
+    return _LOCAL_STORE
+
+
+def fingerprint(key: str, model_name: str, variant: str = "") -> str:
+    """Huella de una entrada: cambia si cambia el modelo asociado a la clave (MODELS) o su variante."""
+    return hashlib.sha1(f"{key}|{model_name}|{variant}".encode("utf-8")).hexdigest()[:16]
+
+
+def get_or_load(key: str, model_name: str, loader, variant: str = ""):
+    """
+    Devuelve el pipeline compartido para `key`; si no existe (o MODELS cambió para esa clave)
+    lo crea con loader() una sola vez por proceso. Cada llamada cuenta como una referencia
+    que el tagger devuelve con release().
+    """
+    fp = fingerprint(key, model_name, variant)
+    with _LOCK:
+        store = _store()
+        entry = store.get(key)
+        if entry and entry["fp"] == fp:
+            entry["refs"] = entry.get("refs", 0) + 1
+            return entry["pipe"]
+        pipe = loader()
+        store[key] = {"fp": fp, "model": model_name, "pipe": pipe, "refs": 1}
+        return pipe
+
+
+def loaded_keys() -> list:
+    return list(_store().keys())
+
+
+def release(key: str, pipe=None):
+    """
+    Devuelve una referencia a `key`; la entrada sale del registro cuando ningún tagger la usa.
+    Con `pipe`, solo cuenta si sigue siendo el pipeline registrado (no uno ya reemplazado).
+    """
+    with _LOCK:
+        store = _store()
+        entry = store.get(key)
+        if entry is None or (pipe is not None and entry["pipe"] is not pipe):
+            return
+        entry["refs"] = entry.get("refs", 1) - 1
+        if entry["refs"] <= 0:
+            store.pop(key, None)
+
+
+def invalidate(models: dict | None = None):
+    """
+    Invalida el registro. Sin argumentos lo vacía; con `models` (p. ej. MODELS) solo
+    descarta las claves que ya no existen o cuyo modelo ha cambiado.
+    """
+    with _LOCK:
+        store = _store()
+        if models is None:
+            store.clear()
+            return
+        for key in list(store.keys()):
+            if store[key].get("model") != models.get(key):
+                store.pop(key, None)
@@ -1,10 +1,23 @@
 import streamlit as st
-from transformers import pipeline
 from collections import defaultdict, Counter
-import torch
 import math
+import os
+import gc
+import time
+import threading
+import inspect
+import importlib.util
 import pandas as pd
 
+from src.filters import ModelRegistry
+from src.filters.NLIScoreCache import NLIScoreCache
+
+# psutil es opcional: solo se usa para detectar presión de memoria
+try:
+    import psutil
+except Exception:
+    psutil = None
+
 
 labels = [
     # ——— POSITIVAS (real-world) ———
@@ -48,6 +61,12 @@ MODELS = {
     "bart": "facebook/bart-large-mnli",
 }
 
+# Revisión (rama/tag/commit del Hub) fijada por modelo; forma parte de la clave de la caché de scores
+MODEL_REVISIONS = {}
+
+# Backends de inferencia en CPU: fp32 (torch), int8 dinámico (torch) u ONNX Runtime (optimum)
+BACKENDS = ("torch", "int8", "onnx")
+
 MODEL_WEIGHTS = {
     "deberta_large": 0.45,
     "deberta_multi": 0.25,
@@ -55,35 +74,245 @@ MODEL_WEIGHTS = {
 }
 
 class MultiModelTaggerLocal:
+    """
+    Ensemble zero-shot con carga perezosa de modelos:
+      - Ningún modelo se carga al construir el objeto; cada uno se carga en su primer uso.
+      - IA_MODELS="deberta_large,bart" limita el ensemble a un subconjunto de MODELS.
+      - Los modelos ociosos (IA_MODEL_IDLE_S) o, si hay poca memoria libre
+        (IA_MIN_FREE_MEM_PCT, requiere psutil), los menos usados se descargan.
+      - IA_BACKENDS="int8" o "bart=int8,deberta_large=onnx" elige el backend de cada
+        modelo (torch por defecto). Si no está disponible se usa torch.
+      - Tokenizers rápidos si son compatibles (IA_FAST_TOKENIZER) y presupuesto de tokens
+        por texto (IA_MAX_TOKENS) que conserva el título y recorta la descripción.
+      - IA_CASCADE=1: un modelo rápido (IA_CASCADE_MODEL) puntúa primero y solo los ítems
+        dudosos (margen/entropía) pasan al ensemble completo.
+    """
+
     def __init__(self, _log_manager=None, hypothesis_template: str = "This article is about {}."):
         self.log_manager = _log_manager
-        self.pipelines = {}
+        self.pipelines = {}          # modelos cargados: key -> pipeline
         self.hypothesis_template = hypothesis_template
 
-        is_cuda = torch.cuda.is_available()
+        wanted = [m.strip() for m in os.getenv("IA_MODELS", "").split(",") if m.strip()]
+        self.active_models = [k for k in MODELS if not wanted or k in wanted]
+        if wanted and not self.active_models and self.log_manager:
+            self.log_manager.log_state(f"🟡 ⚠️ IA_MODELS no coincide con ningún modelo conocido: {wanted}")
+
+        self.idle_s = float(os.getenv("IA_MODEL_IDLE_S", "900"))
+        self.min_free_mem_pct = float(os.getenv("IA_MIN_FREE_MEM_PCT", "10"))
+        self._last_used = {}
+        self._failed = set()
+        self._lock = threading.RLock()
+
+        # Backend por modelo: IA_BACKENDS="int8" (todos) o "clave=backend,..."
+        self.backends = self._parse_backends(os.getenv("IA_BACKENDS", ""))
+
+        # Preparación de textos: tokenizer rápido + presupuesto de tokens de la premisa (0 = sin recorte)
+        self.fast_tokenizer = os.getenv("IA_FAST_TOKENIZER", "1") == "1"
+        self.max_tokens = int(os.getenv("IA_MAX_TOKENS", "256"))
+        self._tokenizers = {}
+        # Tiempos acumulados: preparación (presupuesto), tokenización del pipeline y modelo
+        self.timings = defaultdict(float)
+
+        # Cascada: modelo rápido primero, ensemble solo si la decisión no es clara
+        self.cascade = os.getenv("IA_CASCADE", "0") == "1"
+        self.cascade_model = os.getenv("IA_CASCADE_MODEL", "bart")
+        self.cascade_margin = float(os.getenv("IA_CASCADE_MARGIN", "0.5"))
+        self.cascade_entropy_frac = float(os.getenv("IA_CASCADE_ENTROPY_FRAC", "0.5"))
+
+        # Caché persistente de scores por (texto, etiqueta, plantilla, modelo)
+        self.score_cache = NLIScoreCache() if os.getenv("NLI_CACHE", "1") == "1" else None
+
+        # Si MODELS cambió desde la última carga, descarta del registro lo obsoleto
+        ModelRegistry.invalidate(MODELS)
+
+    # ----------------- Gestión de modelos -----------------
+    @staticmethod
+    def _device() -> int:
+        import torch
+        return 0 if torch.cuda.is_available() else -1
+
+    def _parse_backends(self, spec: str) -> dict:
+        out = {}
+        for part in (p.strip() for p in spec.split(",")):
+            if not part:
+                continue
+            key, _, backend = part.rpartition("=")
+            backend = backend.strip().lower()
+            if backend not in BACKENDS:
+                if self.log_manager:
+                    self.log_manager.log_state(f"🟡 ⚠️ Backend IA desconocido: '{part}' (válidos: {', '.join(BACKENDS)})")
+                continue
+            targets = [key.strip()] if key else list(MODELS)
+            for k in targets:
+                if k in MODELS:
+                    out[k] = backend
+        return out
+
+    def backend_for(self, key: str) -> str:
+        """Backend efectivo de `key` (cae a torch si el pedido no es utilizable aquí)."""
+        backend = self.backends.get(key, "torch")
+        if backend == "onnx" and importlib.util.find_spec("optimum") is None:
+            return "torch"
+        if backend == "int8" and self._device() == 0:
+            return "torch"  # la cuantización dinámica solo aplica en CPU
+        return backend
+
+    def _load_model(self, key: str):
+        from transformers import pipeline
+
+        model_name = MODELS[key]
+        backend = self.backend_for(key)
+        device = self._device()
         if self.log_manager:
-            self.log_manager.log_state("🟠 🔄 Cargando modelos en GPU..." if is_cuda else "🔄 Cargando modelos en CPU...")
+            self.log_manager.log_state(f"🟠 🔄 Cargando modelo '{key}' ({backend}) en {'GPU' if device == 0 else 'CPU'}...")
+        extra = {"revision": MODEL_REVISIONS[key]} if key in MODEL_REVISIONS else {}
+
+        if backend == "onnx":
+            from optimum.onnxruntime import ORTModelForSequenceClassification
 
-        for key, model_name in MODELS.items():
+            # Exporta una vez por modelo y revisión, y reutiliza el .onnx en las siguientes cargas
+            revision = MODEL_REVISIONS.get(key, "main").replace("/", "_")
+            onnx_dir = os.path.join(os.getenv("IA_ONNX_DIR", "output/cache/onnx"), key, revision)
+            if os.path.exists(os.path.join(onnx_dir, "model.onnx")):
+                model = ORTModelForSequenceClassification.from_pretrained(onnx_dir)
+            else:
+                model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True, **extra)
+                model.save_pretrained(onnx_dir)
+            pipe = pipeline("zero-shot-classification", model=model, tokenizer=self._load_tokenizer(key))
+        else:
+            pipe = pipeline(
+                "zero-shot-classification",
+                model=model_name,
+                tokenizer=self._load_tokenizer(key),
+                device=device,
+                **extra
+            )
+            if backend == "int8":
+                import torch
+                pipe.model = torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self._instrument(pipe)
+        if self.log_manager:
+            self.log_manager.remove_last_states(n=1)
+            self.log_manager.log_state(f"🟢 ✅ Modelo '{key}' cargado ({backend}).")
+        return pipe
+
+    def _load_tokenizer(self, key: str):
+        """Tokenizer de `key`: rápido si se puede convertir, si no el lento (sentencepiece)."""
+        tok = self._tokenizers.get(key)
+        if tok is not None:
+            return tok
+        from transformers import AutoTokenizer
+
+        extra = {"revision": MODEL_REVISIONS[key]} if key in MODEL_REVISIONS else {}
+        tok = None
+        if self.fast_tokenizer:
             try:
-                pipe = pipeline(
-                    "zero-shot-classification",
-                    model=model_name,
-                    tokenizer=model_name,
-                    use_fast=False,
-                    device=0 if torch.cuda.is_available() else -1
-                )
-                self.pipelines[key] = pipe
-                if self.log_manager:
-                    self.log_manager.log_state(f"🟢 ✅ Modelo '{key}' cargado.")
+                tok = AutoTokenizer.from_pretrained(MODELS[key], use_fast=True, **extra)
             except Exception as e:
                 if self.log_manager:
-                    self.log_manager.log_state(f"🔴 ❌ Error cargando {key}: {e}")
-
-        num_models = len(MODELS.items()) + 1
+                    self.log_manager.log_state(f"🟡 Tokenizer rápido no disponible para '{key}' ({e}); se usa el lento.")
+        if tok is None:
+            tok = AutoTokenizer.from_pretrained(MODELS[key], use_fast=False, **extra)
+        self._tokenizers[key] = tok
+        return tok
+
+    def _instrument(self, pipe):
+        """Mide aparte el preprocess (tokenización premisa/hipótesis) del pipeline."""
+        orig = getattr(pipe, "preprocess", None)
+        if orig is None or getattr(orig, "_timed", False):
+            return
+        timings = self.timings
+
+        def timed_preprocess(*args, **kwargs):
+            t0 = time.perf_counter()
+            res = orig(*args, **kwargs)
+            timings["tokenize_s"] += time.perf_counter() - t0
+            if not inspect.isgenerator(res):
+                return res
+
+            def _gen():  # ZeroShot es un ChunkPipeline: preprocess produce un par por etiqueta
+                while True:
+                    t1 = time.perf_counter()
+                    try:
+                        chunk = next(res)
+                    except StopIteration:
+                        timings["tokenize_s"] += time.perf_counter() - t1
+                        return
+                    timings["tokenize_s"] += time.perf_counter() - t1
+                    yield chunk
+            return _gen()
+
+        timed_preprocess._timed = True
+        pipe.preprocess = timed_preprocess
+
+    def get_pipeline(self, key: str):
+        """Devuelve el pipeline de `key`, cargándolo si hace falta (None si falla la carga)."""
+        with self._lock:
+            pipe = self.pipelines.get(key)
+            if pipe is None and key not in self._failed:
+                self.unload_idle(keep=key)
+                self._relieve_memory_pressure(keep=key)
+                try:
+                    # compartido por proceso: otros taggers/reruns reutilizan el mismo pipeline
+                    pipe = ModelRegistry.get_or_load(
+                        key, MODELS[key], lambda: self._load_model(key), variant=self.backend_for(key)
+                    )
+                    self.pipelines[key] = pipe
+                except Exception as e:
+                    self._failed.add(key)
+                    if self.log_manager:
+                        self.log_manager.log_state(f"🔴 ❌ Error cargando {key}: {e}")
+            if pipe is not None:
+                self._last_used[key] = time.monotonic()
+            return pipe
+
+    def unload_model(self, key: str):
+        with self._lock:
+            pipe = self.pipelines.pop(key, None)
+            self._last_used.pop(key, None)
+        if pipe is None:
+            return
+        # otros taggers pueden compartir el pipeline: solo se devuelve nuestra referencia
+        ModelRegistry.release(key, pipe)
+        del pipe
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
         if self.log_manager:
-            self.log_manager.remove_last_states(n=num_models)
-            self.log_manager.log_state("🟢 ✅ Modelos cargados correctamente.")
+            self.log_manager.log_state(f"🟡 Modelo '{key}' descargado de memoria.")
+
+    def unload_idle(self, max_idle_s: float | None = None, keep: str | None = None):
+        """Descarga los modelos sin uso durante más de max_idle_s (por defecto IA_MODEL_IDLE_S)."""
+        max_idle_s = self.idle_s if max_idle_s is None else max_idle_s
+        if max_idle_s <= 0:
+            return
+        now = time.monotonic()
+        for key, last in list(self._last_used.items()):
+            if key != keep and now - last > max_idle_s:
+                self.unload_model(key)
+
+    def _memory_pressure(self) -> bool:
+        if psutil is None or self.min_free_mem_pct <= 0:
+            return False
+        try:
+            vm = psutil.virtual_memory()
+            return (vm.available / vm.total) * 100.0 < self.min_free_mem_pct
+        except Exception:
+            return False
+
+    def _relieve_memory_pressure(self, keep: str | None = None):
+        """Con poca memoria libre, descarga los modelos menos usados recientemente (salvo `keep`)."""
+        while self._memory_pressure():
+            candidates = sorted((t, k) for k, t in self._last_used.items() if k != keep)
+            if not candidates:
+                break
+            self.unload_model(candidates[0][1])
 
     @staticmethod
     def _entropy(probs: dict[str, float]) -> float:
@@ -107,11 +336,295 @@ class MultiModelTaggerLocal:
         Z = sum(exps.values()) or 1.0
         return {k: v / Z for k, v in exps.items()}
 
+    # ----------------- Puntuación (modelos) -----------------
+    def _model_id(self, key: str) -> str:
+        """Identidad del modelo para la caché de scores (int8/onnx no comparten scores con fp32)."""
+        backend = self.backend_for(key)
+        base = f"{MODELS[key]}@{MODEL_REVISIONS.get(key, 'main')}"
+        return base if backend == "torch" else f"{base}#{backend}"
+
+    @staticmethod
+    def _text_of(title: str, description: str) -> str:
+        return f"{title}. {description}".strip()
+
+    def _budget_tokenizer(self, key: str):
+        pipe = self.pipelines.get(key)
+        if pipe is not None and getattr(pipe, "tokenizer", None) is not None:
+            return pipe.tokenizer
+        try:
+            return self._load_tokenizer(key)
+        except Exception:
+            return None
+
+    def _prepare(self, key: str, items: list) -> tuple[list[str], list[int]]:
+        """
+        Texto de entrada por ítem para el modelo `key` y su longitud aproximada en tokens.
+        items: textos o pares (title, description). Con IA_MAX_TOKENS > 0 el título se conserva
+        y la descripción se recorta para que la premisa no supere el presupuesto.
+        """
+        t0 = time.perf_counter()
+        pairs = [it if isinstance(it, tuple) else (it, None) for it in items]
+        tok = self._budget_tokenizer(key) if self.max_tokens > 0 else None
+
+        pairs = [(description is not None, (title or "").strip(), (description or "").strip())
+                 for title, description in pairs]
+        if tok is not None:
+            # conteo de tokens por lotes (mucho más rápido con tokenizers rápidos)
+            n_titles = [len(ids) for ids in tok([t + "." for _, t, _ in pairs], add_special_tokens=False)["input_ids"]]
+            n_descs = [len(ids) for ids in tok([d for _, _, d in pairs], add_special_tokens=False)["input_ids"]]
+
+        texts, lengths = [], []
+        for i, (is_pair, title, description) in enumerate(pairs):
+            join = self._text_of if is_pair else (lambda t, _d: t)
+            if tok is None:
+                text = join(title, description)
+                if self.max_tokens > 0 and len(text) > self.max_tokens * 4:
+                    text = text[: self.max_tokens * 4]  # sin tokenizer: ~4 caracteres por token
+                    self.timings["truncated"] += 1
+                texts.append(text)
+                lengths.append(len(text) // 4)
+                continue
+
+            n_title, n_desc = n_titles[i], n_descs[i]
+            if n_title >= self.max_tokens:
+                title = self._cut_tokens(tok, title, self.max_tokens)
+                description, n_title, n_desc = "", self.max_tokens, 0
+            room = self.max_tokens - n_title
+            if n_desc > room:
+                description = self._cut_tokens(tok, description, room)
+                n_desc = room
+                self.timings["truncated"] += 1
+            texts.append(join(title, description))
+            lengths.append(n_title + n_desc)
+
+        self.timings["prepare_s"] += time.perf_counter() - t0
+        return texts, lengths
+
+    @staticmethod
+    def _cut_tokens(tok, text: str, n: int) -> str:
+        """Recorta `text` a sus primeros `n` tokens, cortando en el texto original si el tokenizer da offsets."""
+        if n <= 0:
+            return ""
+        if getattr(tok, "is_fast", False):
+            enc = tok(text, add_special_tokens=False, return_offsets_mapping=True)
+            offsets = enc["offset_mapping"]
+            if len(offsets) <= n:
+                return text
+            return text[: offsets[n - 1][1]].rstrip()
+        ids = tok(text, add_special_tokens=False)["input_ids"]
+        if len(ids) <= n:
+            return text
+        return tok.decode(ids[:n], skip_special_tokens=True).strip()
+
+    def score_many(
+        self,
+        texts: list,
+        candidate_labels: list[str],
+        *,
+        batch_size: int = 8,
+        hypothesis_template: str | None = None,
+        models: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        Pasada multi-label de cada modelo sobre todos los textos, en lotes de `batch_size`.
+        `texts` admite cadenas o pares (title, description); ver _prepare(). Dentro de cada
+        llamada los textos van ordenados por longitud para que cada lote rellene lo mínimo.
+        Las etiquetas ya puntuadas para un texto se leen de la caché (NLI_CACHE); solo las
+        que faltan pasan por el modelo, que ni siquiera se carga si todo está en caché.
+        `models` restringe la pasada a un subconjunto de active_models.
+        Devuelve, por texto, {modelo: [(label, score), ...]} (score desc).
+        """
+        out = [dict() for _ in texts]
+        if not texts:
+            return out
+        template = hypothesis_template or self.hypothesis_template
+        items = texts
+        for key in self.active_models:
+            if models is not None and key not in models:
+                continue
+            texts, lengths = self._prepare(key, items)
+            model_id = self._model_id(key)
+            if self.score_cache is not None:
+                known = self.score_cache.get_many(texts, candidate_labels, template, model_id)
+            else:
+                known = [dict() for _ in texts]
+
+            # agrupa los textos por el conjunto de etiquetas que les falta
+            groups = defaultdict(list)
+            for i, have in enumerate(known):
+                missing = tuple(lbl for lbl in candidate_labels if lbl not in have)
+                if missing:
+                    groups[missing].append(i)
+
+            if groups:
+                pipe = self.get_pipeline(key)
+                if pipe is None:
+                    continue
+                new_rows = []
+                try:
+                    for missing, idxs in groups.items():
+                        idxs = sorted(idxs, key=lambda i: lengths[i])
+                        tok_before = self.timings["tokenize_s"]
+                        t0 = time.perf_counter()
+                        res = pipe(
+                            [texts[i] for i in idxs],
+                            candidate_labels=list(missing),
+                            multi_label=True,
+                            hypothesis_template=template,
+                            batch_size=batch_size,
+                        )
+                        if isinstance(res, dict):
+                            res = [res]
+                        self.timings["model_s"] += (time.perf_counter() - t0) - (self.timings["tokenize_s"] - tok_before)
+                        self.timings["texts"] += len(idxs)
+                        for i, r in zip(idxs, res):
+                            for lbl, scr in zip(r["labels"], r["scores"]):
+                                known[i][lbl] = float(scr)
+                                new_rows.append((texts[i], lbl, float(scr)))
+                except Exception as e:
+                    if self.log_manager:
+                        self.log_manager.log_state(f"🔴 ❌ Error en modelo {key}: {e}")
+                    continue
+                finally:
+                    if self.score_cache is not None:
+                        self.score_cache.put_many(new_rows, template, model_id)
+
+            for i, scores in enumerate(known):
+                out[i][key] = sorted(((lbl, scores[lbl]) for lbl in candidate_labels), key=lambda x: x[1], reverse=True)
+        return out
+
+    # ----------------- Clasificación -----------------
     def classify_with_ensemble(
         self,
         title: str,
         description: str,
         custom_labels: list[str],
+        **decision_kwargs,
+    ):
+        """
+        Devuelve: (label_final | abstain_label, score_final_norm, resultados_por_modelo, debug_dict)
+        Parámetros de decisión: ver decide().
+        """
+        return self.classify_many([(title, description)], custom_labels, batch_size=1, **decision_kwargs)[0]
+
+    def classify_many(
+        self,
+        items: list[tuple[str, str]],
+        custom_labels: list[str],
+        *,
+        batch_size: int = 8,
+        hypothesis_template: str | None = None,
+        **decision_kwargs,
+    ) -> list[tuple]:
+        """
+        Versión por lotes de classify_with_ensemble: items = [(title, description), ...].
+        Cada modelo procesa todos los textos con `batch_size` pares por forward y la decisión
+        se toma por ítem con las mismas reglas. Devuelve una tupla (label, score, per_model, dbg) por ítem.
+        """
+        results = self.classify_levels(
+            items,
+            [(0, custom_labels, decision_kwargs)],
+            batch_size=batch_size,
+            hypothesis_template=hypothesis_template,
+        )
+        return [r[0] for r in results]
+
+    @staticmethod
+    def _restrict(per_model: dict, labels: list[str]) -> dict:
+        """Filas de cada modelo limitadas a `labels` (con multi_label cada par es independiente)."""
+        wanted = set(labels)
+        return {m: [(lbl, scr) for lbl, scr in rows if lbl in wanted] for m, rows in per_model.items()}
+
+    def classify_levels(
+        self,
+        items: list[tuple[str, str]],
+        levels: list[tuple],
+        *,
+        batch_size: int = 8,
+        hypothesis_template: str | None = None,
+    ) -> list[dict]:
+        """
+        Evalúa varios niveles de etiquetas con una sola pasada por modelo.
+        levels = [(level_id, labels, decision_kwargs), ...]. Se puntúa la unión de etiquetas de
+        todos los niveles una vez por ítem y modelo; cada nivel decide sobre su subconjunto de la
+        tabla. Devuelve, por ítem, {level_id: (label, score, per_model, dbg)}.
+        """
+        out = [dict() for _ in items]
+        levels = [(lid, list(dict.fromkeys(labels or [])), kw) for lid, labels, kw in levels]
+        for lid, labels, kw in levels:
+            if not labels:
+                if self.log_manager:
+                    self.log_manager.log_state("🟡 ⚠️ No se proporcionaron etiquetas personalizadas.")
+                for res in out:
+                    res[lid] = (kw.get("abstain_label", "NO_LABEL"), 0.0, {}, {"reason": "no_labels"})
+        levels = [lv for lv in levels if lv[1]]
+        if not items or not levels:
+            return out
+
+        union = list(dict.fromkeys(lbl for _, labels, _ in levels for lbl in labels))
+        inputs = [(t, d) for t, d in items]
+        score_kw = {"batch_size": batch_size, "hypothesis_template": hypothesis_template}
+
+        def _decide(i, lid, labels, kw, per_model, stage=None):
+            title, description = items[i]
+            res = self.decide(title, description, labels, self._restrict(per_model, labels), **kw)
+            if stage:
+                res[3]["stage"] = stage
+            out[i][lid] = res
+
+        fast = self._cascade_fast_model()
+        if fast is None:
+            raw = self.score_many(inputs, union, **score_kw)
+            for i, per_model in enumerate(raw):
+                for lid, labels, kw in levels:
+                    _decide(i, lid, labels, kw, per_model)
+            return out
+
+        # 1) Etapa rápida: un solo modelo; cada nivel con distribución clara se decide ya
+        raw = self.score_many(inputs, union, models=[fast], **score_kw)
+        undecided = defaultdict(list)  # i -> niveles dudosos
+        for i, per_model in enumerate(raw):
+            for lid, labels, kw in levels:
+                rows = self._restrict(per_model, labels).get(fast)
+                if rows and self._is_decisive(rows, len(labels), kw.get("temperature", 1.3)):
+                    # con un solo modelo no hay más votos que el suyo: min_votes del nivel es para el ensemble
+                    _decide(i, lid, labels, {**kw, "min_votes": 1}, per_model, stage="fast")
+                else:
+                    undecided[i].append((lid, labels, kw))
+
+        # 2) Niveles dudosos: resto del ensemble (el modelo rápido ya está puntuado)
+        if undecided:
+            pending = sorted(undecided)
+            rest = [k for k in self.active_models if k != fast]
+            more = self.score_many([inputs[i] for i in pending], union, models=rest, **score_kw)
+            for i, extra in zip(pending, more):
+                per_model = {**raw[i], **extra}
+                for lid, labels, kw in undecided[i]:
+                    _decide(i, lid, labels, kw, per_model, stage="ensemble")
+        return out
+
+    def _cascade_fast_model(self) -> str | None:
+        """Modelo de la etapa rápida, o None si la cascada no aplica."""
+        if not self.cascade or len(self.active_models) < 2:
+            return None
+        if self.cascade_model in self.active_models:
+            return self.cascade_model
+        return self.active_models[0]
+
+    def _is_decisive(self, rows: list, n_labels: int, temperature: float) -> bool:
+        """La etapa rápida decide sola si su distribución categórica es clara (margen alto, entropía baja)."""
+        soft = self._softmax_from_multilabel({lbl: scr for lbl, scr in rows}, temperature=temperature)
+        probs = sorted(soft.values(), reverse=True)
+        margin = probs[0] - (probs[1] if len(probs) > 1 else 0.0)
+        entropy_cap = self.cascade_entropy_frac * math.log(max(2, n_labels))
+        return margin >= self.cascade_margin and self._entropy(soft) <= entropy_cap
+
+    def decide(
+        self,
+        title: str,
+        description: str,
+        candidate_labels: list[str],
+        per_model_raw: dict,
         *,
         # --- fusión/aceptación ---
         threshold: float = 0.55,        # score final mínimo (mezcla multi-label ponderada)
@@ -126,57 +639,36 @@ class MultiModelTaggerLocal:
         low_conf: float = 0.50,         # participación mínima en la tercera regla
         # --- calibración ---
         temperature: float = 1.3,       # para softmax categórico por modelo
-        hypothesis_template: str | None = None,  # para poder sobreescribir ad-hoc
         # --- rescate por etiquetas "duras" + señales en título/descripción ---
         use_hard_label_rules: bool = True,
     ):
         """
+        Aplica las reglas del ensemble a las puntuaciones ya calculadas por score_many().
         Devuelve: (label_final | abstain_label, score_final_norm, resultados_por_modelo, debug_dict)
         """
-        if not custom_labels:
-            if self.log_manager:
-                self.log_manager.log_state("🟡 ⚠️ No se proporcionaron etiquetas personalizadas.")
-            return abstain_label, 0.0, {}, {"reason": "no_labels"}
-
-        text = f"{title}. {description}".strip()
-        candidate_labels = list(dict.fromkeys(custom_labels))
-
-        # 1) Pasada multi-label por cada modelo -> scores independientes por etiqueta
+        # 1) Fusión de las pasadas multi-label de cada modelo
         agg_scores = defaultdict(float)       # para el score final (multi-label, ponderado)
         per_label_votes = Counter()           # votos de top-1 por modelo
         model_results = {}                    # logging
         per_model_scores = {}                 # {model: {label: score}}
 
-        total_weight = sum(MODEL_WEIGHTS.get(k, 0.0) for k in self.pipelines if k in MODEL_WEIGHTS)
+        total_weight = 0.0
 
-        for key, pipe in self.pipelines.items():
-            try:
-                res = pipe(
-                    text,
-                    candidate_labels=candidate_labels,
-                    multi_label=True,
-                    hypothesis_template=hypothesis_template or self.hypothesis_template
-                )
-                labels_res = res["labels"]
-                scores_res = res["scores"]
-                weight = MODEL_WEIGHTS.get(key, 0.0)
-
-                # Guarda crudo
-                model_results[key] = [{"label": lbl, "score": float(scr)} for lbl, scr in zip(labels_res, scores_res)]
-                per_model_scores[key] = {lbl: float(scr) for lbl, scr in zip(labels_res, scores_res)}
-
-                # Voto del top-1 de este modelo
-                if labels_res:
-                    per_label_votes[labels_res[0]] += 1
-
-                # Acumula en fusión ponderada (para score final)
-                for lbl, scr in zip(labels_res, scores_res):
-                    agg_scores[lbl] += weight * float(scr)
+        for key, rows in per_model_raw.items():
+            weight = MODEL_WEIGHTS.get(key, 0.0)
+            total_weight += weight
 
-            except Exception as e:
-                if self.log_manager:
-                    self.log_manager.log_state(f"🔴 ❌ Error en modelo {key}: {e}")
-                continue
+            # Guarda crudo
+            model_results[key] = [{"label": lbl, "score": scr} for lbl, scr in rows]
+            per_model_scores[key] = {lbl: scr for lbl, scr in rows}
+
+            # Voto del top-1 de este modelo
+            if rows:
+                per_label_votes[rows[0][0]] += 1
+
+            # Acumula en fusión ponderada (para score final)
+            for lbl, scr in rows:
+                agg_scores[lbl] += weight * scr
 
         if not agg_scores:
             if self.log_manager:
@@ -0,0 +1,94 @@
+# src/filters/NLIScoreCache.py
+import os
+import sqlite3
+import hashlib
+import threading
+
+# Subir si cambia la forma de calcular las puntuaciones (invalida la caché)
+CACHE_VERSION = 1
+
+
+class NLIScoreCache:
+    """
+    Caché en disco (SQLite) de puntuaciones multi-label por (texto, etiqueta, plantilla, modelo).
+
+    Con multi_label=True cada par (texto, etiqueta) se puntúa de forma independiente,
+    así que reutilizar las etiquetas ya vistas y calcular solo las nuevas da el mismo
+    resultado que una pasada completa. Cambiar umbrales o MODEL_WEIGHTS no afecta a la
+    clave: la decisión se vuelve a tomar sin inferencia.
+
+    Config por entorno:
+      NLI_CACHE       → "0" desactiva la caché (por defecto activa)
+      NLI_CACHE_PATH  → ruta del fichero SQLite
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("NLI_CACHE_PATH", "output/cache/nli_scores.sqlite")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(self.path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS scores (k TEXT PRIMARY KEY, score REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key(text: str, label: str, template: str, model: str) -> str:
+        base = f"v{CACHE_VERSION}\x1f{model}\x1f{template}\x1f{label}\x1f{text}"
+        return hashlib.sha1(base.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: list[str], labels: list[str], template: str, model: str) -> list[dict]:
+        """Devuelve, por texto, {label: score} con las etiquetas que ya estaban en caché."""
+        keys = {}  # un texto repetido en el lote comparte clave: se rellenan todas sus posiciones
+        for i, text in enumerate(texts):
+            for lbl in labels:
+                keys.setdefault(self.key(text, lbl, template, model), []).append((i, lbl))
+        found = [dict() for _ in texts]
+        if not keys:
+            return found
+
+        all_keys = list(keys)
+        with self._lock:
+            db = self._db()
+            for start in range(0, len(all_keys), 500):  # límite de parámetros de SQLite
+                chunk = all_keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for k, score in db.execute(f"SELECT k, score FROM scores WHERE k IN ({marks})", chunk):
+                    for i, lbl in keys[k]:
+                        found[i][lbl] = score
+
+        n_found = sum(len(f) for f in found)
+        self.hits += n_found
+        self.misses += len(texts) * len(labels) - n_found
+        return found
+
+    def put_many(self, rows: list[tuple[str, str, float]], template: str, model: str):
+        """rows = [(texto, etiqueta, score), ...]"""
+        if not rows:
+            return
+        data = [(self.key(t, lbl, template, model), float(s)) for t, lbl, s in rows]
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO scores (k, score) VALUES (?, ?)", data)
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM scores")
+            db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
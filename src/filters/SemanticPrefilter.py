@@ -0,0 +1,162 @@
+# src/filters/SemanticPrefilter.py
+import os
+import bisect
+import random
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+# sentence-transformers es opcional: sin él el prefiltro semántico queda desactivado
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:
+    SentenceTransformer = None
+
+
+class SemanticPrefilter:
+    """
+    Prefiltro barato por embeddings antes del zero-shot NLI (CPU, admite modelos locales).
+
+    - Embebe ítems y descripciones de etiquetas una sola vez (caché SQLite por texto).
+    - Un ítem pasa si su similitud coseno con alguna etiqueta positiva alcanza el suelo.
+    - El suelo se calibra con los ítems que la IA acepta: cuantil (1 - SEMANTIC_RECALL)
+      de sus similitudes menos un margen. Mientras no haya SEMANTIC_CALIB_MIN muestras
+      para ese conjunto de etiquetas, el prefiltro solo mide (no descarta).
+    - Con el suelo activo solo calibra una muestra aleatoria (SEMANTIC_EXPLORE) que pasa a la
+      IA aunque quede por debajo: si se calibrara con lo que ya superó el suelo, la cola baja
+      dejaría de verse y el cuantil subiría sin aviso.
+
+    Config por entorno:
+      SEMANTIC_MODEL       → nombre o ruta local del modelo (sentence-transformers)
+      SEMANTIC_CACHE_PATH  → SQLite de embeddings y muestras de calibración
+      SEMANTIC_FLOOR       → suelo fijo (desactiva la calibración)
+      SEMANTIC_RECALL      → recall objetivo frente a la IA (por defecto 0.98)
+      SEMANTIC_MARGIN      → margen restado al cuantil (por defecto 0.02)
+      SEMANTIC_CALIB_MIN   → muestras mínimas antes de empezar a descartar (por defecto 30)
+      SEMANTIC_EXPLORE     → fracción de ítems que sigue calibrando con el suelo activo (por defecto 0.05)
+    """
+
+    def __init__(self, model_name: str | None = None, cache_path: str | None = None, log_manager=None):
+        self.model_name = model_name or os.getenv("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self.cache_path = cache_path or os.getenv("SEMANTIC_CACHE_PATH", "output/cache/semantic.sqlite")
+        self.log_manager = log_manager
+
+        fixed = os.getenv("SEMANTIC_FLOOR", "").strip()
+        self.fixed_floor = float(fixed) if fixed else None
+        self.recall = float(os.getenv("SEMANTIC_RECALL", "0.98"))
+        self.margin = float(os.getenv("SEMANTIC_MARGIN", "0.02"))
+        self.calib_min = int(os.getenv("SEMANTIC_CALIB_MIN", "30"))
+        self.explore = float(os.getenv("SEMANTIC_EXPLORE", "0.05"))
+        self._rng = random.Random()
+
+        self._model = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._calib = {}  # label_key -> similitudes ordenadas de ítems aceptados por la IA
+
+    @staticmethod
+    def available() -> bool:
+        return SentenceTransformer is not None
+
+    # ----------------- Infraestructura -----------------
+    def _db(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(self.cache_path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS emb (k TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS calib (label_key TEXT NOT NULL, sim REAL NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    def _get_model(self):
+        if self._model is None:
+            if self.log_manager:
+                self.log_manager.log_state(f"🟠 🔄 Cargando modelo de embeddings '{self.model_name}'...")
+            self._model = SentenceTransformer(self.model_name, device="cpu")
+            if self.log_manager:
+                self.log_manager.remove_last_states(n=1)
+                self.log_manager.log_state("🟢 ✅ Modelo de embeddings cargado.")
+        return self._model
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def label_key(self, labels: list[str]) -> str:
+        return hashlib.sha1("\x1f".join([self.model_name] + sorted(labels)).encode("utf-8")).hexdigest()[:16]
+
+    # ----------------- Embeddings -----------------
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embeddings normalizados (uno por fila); solo se calculan los que no están en caché."""
+        keys = [self._key(t) for t in texts]
+        vecs = {}
+        with self._lock:
+            db = self._db()
+            uniq = list(dict.fromkeys(keys))
+            for start in range(0, len(uniq), 500):
+                chunk = uniq[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for k, blob in db.execute(f"SELECT k, vec FROM emb WHERE k IN ({marks})", chunk):
+                    vecs[k] = np.frombuffer(blob, dtype=np.float32)
+
+        missing = [i for i, k in enumerate(keys) if k not in vecs]
+        if missing:
+            todo = list(dict.fromkeys(texts[i] for i in missing))
+            enc = self._get_model().encode(todo, batch_size=32, normalize_embeddings=True, show_progress_bar=False)
+            rows = []
+            for text, v in zip(todo, enc):
+                v = np.asarray(v, dtype=np.float32)
+                vecs[self._key(text)] = v
+                rows.append((self._key(text), v.tobytes()))
+            with self._lock:
+                db = self._db()
+                db.executemany("INSERT OR REPLACE INTO emb (k, vec) VALUES (?, ?)", rows)
+                db.commit()
+
+        return np.vstack([vecs[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+    def similarities(self, texts: list[str], labels: list[str]) -> list[float]:
+        """Máxima similitud coseno de cada texto con el conjunto de etiquetas."""
+        if not texts or not labels:
+            return [0.0] * len(texts)
+        items = self.embed(texts)
+        lbls = self.embed(labels)
+        return (items @ lbls.T).max(axis=1).astype(float).tolist()
+
+    # ----------------- Calibración -----------------
+    def _samples(self, label_key: str) -> list:
+        if label_key not in self._calib:
+            with self._lock:
+                rows = self._db().execute("SELECT sim FROM calib WHERE label_key = ?", (label_key,)).fetchall()
+            self._calib[label_key] = sorted(r[0] for r in rows)
+        return self._calib[label_key]
+
+    def floor(self, label_key: str) -> float | None:
+        """Suelo vigente para el conjunto de etiquetas; None = aún calibrando (no se descarta)."""
+        if self.fixed_floor is not None:
+            return self.fixed_floor
+        samples = self._samples(label_key)
+        if len(samples) < self.calib_min:
+            return None
+        idx = int((1.0 - self.recall) * len(samples))
+        return samples[min(idx, len(samples) - 1)] - self.margin
+
+    def sample(self) -> bool:
+        """True si el ítem entra en la muestra de calibración (pasa a la IA aunque quede bajo el suelo)."""
+        return self.fixed_floor is None and self._rng.random() < self.explore
+
+    def observe(self, label_key: str, sims: list[float]):
+        """Registra las similitudes de ítems de la muestra que la IA aceptó (alimentan el suelo calibrado)."""
+        if not sims:
+            return
+        samples = self._samples(label_key)
+        for s in sims:
+            bisect.insort(samples, float(s))
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT INTO calib (label_key, sim) VALUES (?, ?)", [(label_key, float(s)) for s in sims])
+            db.commit()
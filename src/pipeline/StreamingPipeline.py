@@ -0,0 +1,352 @@
+# src/pipeline/StreamingPipeline.py
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except Exception:  # streamlit no disponible o API distinta
+    add_script_run_ctx = None
+    get_script_run_ctx = None
+
+from src.utils.Methods import Methods
+from src.utils.DomainHealth import DomainHealth
+
+
+_STOP = object()  # centinela de fin de etapa
+
+
+class StreamingPipeline:
+    """
+    Pipeline por etapas con colas acotadas (backpressure):
+
+        ingesta (engine.on_dirty) → enriquecimiento (red) → heurísticos → IA → NDJSON
+
+    - Cada etapa corre en su(s) propio(s) hilo(s); si una etapa posterior va lenta,
+      las colas se llenan y la anterior se bloquea (la búsqueda incluida).
+    - El enriquecimiento respeta un hueco mínimo por dominio (min_gap) y retrocede
+      si el dominio parece bloqueado.
+    - Las decisiones se registran en el FilterEngine igual que en el modo por lotes
+      (final_results, contadores, descartes), de modo que el estado/export no cambian.
+    - Todo acceso al estado del motor (raw_items, índices, dirty_ids, cola de enriquecimiento,
+      decisiones) va bajo engine.lock, el mismo cerrojo que toma add_or_update_result; la red
+      y el pacing por dominio quedan fuera. paused() es ese cerrojo.
+    - El NDJSON recibe una línea por cada versión aceptada de un ítem (upsert por norm_key);
+      al cerrar se reescribe con exactamente final_results (sin versiones viejas ni descartes).
+
+    Nota: engine.raw_items se mantiene completo porque la deduplicación lo necesita;
+    lo que deja de crecer es el trabajo pendiente entre fases.
+    """
+
+    def __init__(self, engine, filter_engine, item_type: str, exporter=None,
+                 dir_path: str | None = None, timestamp_str: str | None = None,
+                 log_manager=None):
+        self.engine = engine
+        self.filter_engine = filter_engine
+        self.item_type = item_type
+        self.log_manager = log_manager
+
+        self.queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))
+        self.enrich_workers = int(os.getenv("PIPELINE_ENRICH_WORKERS", "4"))
+        self.min_gap = float(os.getenv("PIPELINE_MIN_GAP", "1.1"))
+        self.backoff_factor = 6
+        # La IA se agrupa en lotes: hasta N ítems o lo que llegue en T ms
+        self.ai_batch = max(1, int(os.getenv("PIPELINE_AI_BATCH", str(getattr(filter_engine, "ai_chunk_items", 64)))))
+        self.ai_wait = float(os.getenv("PIPELINE_AI_WAIT_MS", "200")) / 1000.0
+
+        self.q_enrich = queue.Queue(maxsize=self.queue_size)
+        self.q_heur = queue.Queue(maxsize=self.queue_size)
+        self.q_ai = queue.Queue(maxsize=self.queue_size)
+        self.q_out = queue.Queue(maxsize=self.queue_size)
+
+        self._queued = set()            # IDs en cola de entrada (evita duplicados)
+        self._queued_lock = threading.Lock()
+        self._local = threading.local() # marca hilos internos del pipeline
+        # motores sin cerrojo propio: basta con que las etapas se serialicen entre sí
+        self._lock = getattr(engine, "lock", None) or threading.RLock()
+
+        # pacing por dominio
+        self._dom_locks = defaultdict(threading.Lock)
+        self._next_ok = defaultdict(float)
+
+        self._written = set()            # (norm_key, huella) ya volcadas al NDJSON
+        self._stream = None
+        if exporter is not None:
+            self._stream = exporter.open_enriched_stream(item_type, dir_path=dir_path, timestamp_str=timestamp_str)
+
+        self._threads = []
+        self.stats = defaultdict(int)
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+    # ----------------- Logging helper -----------------
+    def _log(self, msg: str):
+        if self.log_manager:
+            self.log_manager.log_state(msg)
+        if os.getenv("DEBUG_LOGS", "0") == "1":
+            print(msg, flush=True)
+
+    def _bump(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    # ----------------- Ciclo de vida -----------------
+    def start(self):
+        if self._started:
+            return self
+        self._started = True
+
+        # Los IDs nuevos/modificados llegan en cuanto el motor los registra (dirty_ids + aviso)
+        if hasattr(self.engine, "on_dirty"):
+            self.engine.on_dirty = self.feed_pending
+        # lo que ya estuviera pendiente (p. ej. al reanudar)
+        self.feed_pending()
+
+        self._spawn_stage("enrich", self._enrich_one, self.q_enrich, self.q_heur, self.enrich_workers)
+        self._spawn_stage("heur", self._heuristics_one, self.q_heur, self.q_ai, 1)
+        self._spawn_thread("ai", self._ai_loop)
+        self._spawn_stage("out", self._write_one, self.q_out, None, 1)
+        self._log(f"🟢 Pipeline en streaming iniciado ({self.item_type}).")
+        return self
+
+    def close(self):
+        """Vacía las etapas en orden, persiste descartes y cierra el NDJSON. Devuelve la ruta escrita."""
+        if not self._started:
+            return None
+        # Las etapas pueden volver a ensuciar ítems (re-dedup): se drena hasta que no quede nada
+        while True:
+            self.feed_pending()
+            for q in (self.q_enrich, self.q_heur, self.q_ai, self.q_out):
+                q.join()
+            with self._lock:
+                if not getattr(self.engine, "dirty_ids", None):
+                    break
+        self.q_enrich.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._started = False
+
+        if hasattr(self.engine, "on_dirty"):
+            self.engine.on_dirty = None
+
+        health = getattr(self.engine, "domain_health", None)
+        if health is not None:
+            health.save()
+        self.filter_engine.flush_discards()
+        self.filter_engine.mostrar_resultados()
+        path = None
+        if self._stream is not None:
+            # el NDJSON en vivo arrastra versiones viejas y descartes: se compacta a final_results
+            with self._lock:
+                self._stream.rewrite(list(self.engine.final_results.values()))
+            path = self._stream.close()
+        self._log(f"🟢 Pipeline finalizado: {dict(self.stats)}")
+        return path
+
+    def paused(self):
+        """Context manager: detiene las etapas entre ítems (para snapshots de estado)."""
+        return self._lock
+
+    # ----------------- Entrada -----------------
+    def submit(self, key):
+        """
+        Encola un ID nuevo/modificado. Desde la ingesta bloquea si la cola está llena (backpressure);
+        desde las propias etapas no puede esperar a su cola de entrada, así que si está llena el ID
+        vuelve a engine.dirty_ids y lo recoge el siguiente feed_pending.
+        """
+        with self._queued_lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+        if not getattr(self._local, "internal", False):
+            self.q_enrich.put(key)
+        else:
+            try:
+                self.q_enrich.put_nowait(key)
+            except queue.Full:
+                with self._queued_lock:
+                    self._queued.discard(key)
+                with self._lock:
+                    self.engine.dirty_ids.add(key)
+                return
+        self._bump("ingested")
+
+    def feed_pending(self):
+        """Encola los IDs marcados en engine.dirty_ids (aviso on_dirty de la ingesta y re-dedup de las etapas)."""
+        if not getattr(self.engine, "dirty_ids", None):
+            return
+        with self._lock:
+            keys = [k for k in self.engine.dirty_ids if k in self.engine.raw_items]
+            self.engine.dirty_ids.clear()
+        for key in keys:
+            self.submit(key)
+
+    # ----------------- Infraestructura de etapas -----------------
+    def _spawn_stage(self, name, fn, in_q, out_q, n_workers):
+        remaining = [n_workers]
+        lock = threading.Lock()
+
+        def _run():
+            self._local.internal = True
+            while True:
+                key = in_q.get()
+                if key is _STOP:
+                    with lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if not last:
+                        in_q.put(_STOP)  # que lo vean los demás workers
+                    elif out_q is not None:
+                        out_q.put(_STOP)
+                    in_q.task_done()
+                    return
+                try:
+                    result = fn(key)
+                    if out_q is not None and result is not None:
+                        out_q.put(result)
+                except Exception as e:
+                    self._bump(f"{name}_errors")
+                    self._log(f"🔴 Pipeline[{name}] error con {key}: {e}")
+                finally:
+                    in_q.task_done()
+
+        for i in range(n_workers):
+            self._spawn_thread(f"{name}-{i}", _run)
+
+    def _spawn_thread(self, name, target):
+        t = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+        if add_script_run_ctx and get_script_run_ctx:
+            try:
+                add_script_run_ctx(t, get_script_run_ctx())
+            except Exception:
+                pass
+        t.start()
+        self._threads.append(t)
+
+    # ----------------- Etapas -----------------
+    def _domain_gap(self, dom: str) -> float:
+        health = getattr(self.engine, "domain_health", None)
+        return health.gap(dom, self.min_gap) if health is not None else self.min_gap
+
+    def _wait_domain(self, dom: str):
+        """Reserva el siguiente hueco libre del dominio y duerme hasta él."""
+        with self._dom_locks[dom]:
+            now = time.time()
+            slot = max(now, self._next_ok[dom])
+            self._next_ok[dom] = slot + self._domain_gap(dom) + random.uniform(0, 0.4)
+        wait = slot - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _enrich_one(self, key):
+        with self._queued_lock:
+            self._queued.discard(key)
+
+        needs = getattr(self.engine, "needs_enrichment", None)
+        with self._lock:
+            if not needs or not needs(key):
+                return key
+            item = self.engine.raw_items.get(key) or {}
+            url = (item.get("URL") or "").strip()
+            dom = Methods._domain_of(Methods.normalize_url(url), (item.get("Source") or [""])[0])
+
+        # caché de metadatos: sin red ni espera por dominio
+        cached = getattr(self.engine, "_cached_description", None)
+        res = cached(url) if cached else None
+        health = getattr(self.engine, "domain_health", None)
+        if res is not None:
+            self._bump("enrich_cached")
+        elif health is not None and health.should_skip(dom):
+            # dominio aparcado: sigue por heurísticas/IA con lo que ya tenga
+            self._bump("enrich_parked")
+            return key
+        else:
+            self._wait_domain(dom)
+            # red fuera del cerrojo; solo el volcado al ítem va dentro
+            fetch = getattr(self.engine, "_fetch_description", None)
+            res = (fetch(url, False) if fetch else self.engine._get_desc_extractor().extract(url)) or {}
+            if DomainHealth.is_block(res):
+                with self._dom_locks[dom]:
+                    self._next_ok[dom] = time.time() + self._domain_gap(dom) * self.backoff_factor
+                self._bump("enrich_blocked")
+        with self._lock:
+            if self.engine._apply_enrichment(key, url, res):
+                self._bump("enriched")
+            elif getattr(self.engine, "enrich_queue", None) is not None:
+                self.engine.enrich_queue.defer(key)  # queda para enrich_until_done con backoff
+            self.engine.dirty_ids.discard(key)  # este ítem ya sigue hacia heurísticos
+            redup = getattr(self.engine, "redup_pending", None)
+            merged = bool(redup and redup())
+            gone = key not in self.engine.raw_items
+        if merged:
+            self._bump("redup_merged")
+            # los masters que absorbieron duplicados quedan en dirty_ids: se reencolan
+            self.feed_pending()
+        return None if gone else key  # fusionado en otro master: sigue el master
+
+    def _heuristics_one(self, key):
+        with self._lock:
+            status, ctx = self.filter_engine.run_heuristics(self.engine, key, self.item_type)
+        self._bump(f"heur_{status}")
+        if status == "pending_ai":
+            return ctx  # la IA reutiliza el ctx de los heurísticos
+        if status == "keep":
+            return ("keep", key)
+        return None
+
+    def _ai_loop(self):
+        """Etapa IA: agrupa lo que llega a q_ai (hasta ai_batch ítems o ai_wait s) y lo clasifica en lote."""
+        self._local.internal = True
+        done = False
+        while not done:
+            batch = [self.q_ai.get()]
+            deadline = time.monotonic() + self.ai_wait
+            while len(batch) < self.ai_batch and batch[-1] is not _STOP:
+                try:
+                    batch.append(self.q_ai.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                done = True
+            entries = [e for e in batch if e is not _STOP]
+            try:
+                for key in self._ai_batch(entries):
+                    self.q_out.put(key)
+            except Exception as e:
+                self._bump("ai_errors")
+                self._log(f"🔴 Pipeline[ai] error con lote de {len(entries)}: {e}")
+            finally:
+                for _ in batch:
+                    self.q_ai.task_done()
+        self.q_out.put(_STOP)
+
+    def _ai_batch(self, entries) -> list:
+        # aceptados sin IA: pasan directos al writer
+        keys = [e[1] for e in entries if isinstance(e, tuple)]
+        ctxs = [e for e in entries if not isinstance(e, tuple)]
+        if ctxs:
+            kept = self.filter_engine.classify_pending(self.engine, ctxs, lock=self._lock)
+            self._bump("ai_keep", len(kept))
+            self._bump("ai_drop", len(ctxs) - len(kept))
+            keys.extend(kept)
+        return keys
+
+    def _write_one(self, key):
+        with self._lock:
+            item = self.engine.raw_items.get(key)  # None si se fusionó en otro master
+            if item is None or item.get("Decision") != "keep":
+                return None
+            # una línea por versión: si el ítem vuelve con otro contenido se añade otra (upsert);
+            # close() deja el fichero igual a final_results
+            version = (item.get("_FilterNormKey") or key, item.get("_FilterFP"))
+            if version in self._written:
+                return None
+            self._written.add(version)
+            if self._stream is not None:
+                self._stream.write(item)  # serializa bajo el cerrojo: el ítem puede mutar en otra etapa
+                self._bump("written")
+        return None
@@ -0,0 +1,367 @@
+# src/state/SqliteStateStore.py
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+
+class _LazyDict(dict):
+    """
+    dict que carga cada clave desde SQLite al primer acceso (loaders: clave -> callable).
+    Las operaciones sobre el conjunto (iterar, items, len...) lo materializan entero.
+    json.dumps NO: su ruta en C lee el dict subyacente y vería {} → usar materialize() antes.
+    """
+
+    def __init__(self, data=None, loaders=None):
+        super().__init__(data or {})
+        self._loaders = dict(loaders or {})
+
+    def _load(self, key):
+        fn = self._loaders.pop(key, None)
+        if fn is not None:
+            super().__setitem__(key, fn())
+
+    def _load_all(self):
+        for key in list(self._loaders):
+            self._load(key)
+
+    def __getitem__(self, key):
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._load(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._loaders or super().__contains__(key)
+
+    def __setitem__(self, key, value):
+        self._loaders.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self._loaders.pop(key, None) is not None and not super().__contains__(key):
+            return
+        super().__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key, *default):
+        self._load(key)
+        return super().pop(key, *default)
+
+    def __bool__(self):
+        return bool(self._loaders) or super().__len__() > 0
+
+    def __len__(self):
+        self._load_all()
+        return super().__len__()
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def copy(self):
+        self._load_all()
+        return dict(self)
+
+    def __repr__(self):
+        self._load_all()
+        return super().__repr__()
+
+
+def materialize(value):
+    """
+    Carga (en el sitio) todas las partes perezosas de un estado leído de SQLite para poder
+    escribirlo en JSON/WAL. Basta con bajar por los _LazyDict (y por el primer nivel de un dict
+    normal, p. ej. una copia del estado): sus valores cargados ya son dicts normales.
+    """
+    if isinstance(value, dict):
+        if isinstance(value, _LazyDict):
+            value._load_all()
+        for child in dict.values(value):
+            if isinstance(child, _LazyDict):
+                materialize(child)
+    return value
+
+
+class SqliteStateStore:
+    """
+    Estado de búsqueda en SQLite (STATE_BACKEND=sqlite): mismo dict que el JSON, repartido en tablas.
+
+      meta              → claves escalares / pequeñas (status, params, progress, ...) en JSON
+      items             → (scope, id) → ítem JSON: "results" y los dicts de engine_state
+                          ("engine:raw_items", "engine:final_results", "engine:idx_by_url", ...)
+      seen_ids          → (scope, id): analiced_ids y las listas '*_ids' del motor, como conjuntos
+      cursors           → cursores por proveedor
+      filter_stats      → contadores del FilterEngine
+      keyword_progress  → remaining_keywords en orden
+
+    Cada checkpoint es una transacción con solo lo que cambió (huella por ítem en memoria y en la
+    columna fp). load() devuelve el estado con results / analiced_ids / engine_state perezosos:
+    cada parte se lee de la base al pedirla.
+    """
+
+    # Claves de primer nivel con tabla propia; el resto va a meta
+    _TOP_ITEMS = {"results": "results"}
+    _TOP_IDS = {"analiced_ids": "analiced_ids"}
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._fps = None       # scope -> {id: fp} de items
+        self._ids = None       # scope -> set(ids)
+        self._keywords = None  # remaining_keywords tal y como están en la tabla
+
+    # ----------------- Conexión -----------------
+    def _db(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(self.path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);"
+                "CREATE TABLE IF NOT EXISTS items (scope TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL,"
+                " fp BLOB NOT NULL, PRIMARY KEY (scope, id));"
+                "CREATE TABLE IF NOT EXISTS seen_ids (scope TEXT NOT NULL, id TEXT NOT NULL, PRIMARY KEY (scope, id));"
+                "CREATE TABLE IF NOT EXISTS cursors (name TEXT PRIMARY KEY, v TEXT);"
+                "CREATE TABLE IF NOT EXISTS filter_stats (name TEXT PRIMARY KEY, v TEXT);"
+                "CREATE TABLE IF NOT EXISTS keyword_progress (pos INTEGER PRIMARY KEY, keyword TEXT NOT NULL);"
+            )
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            self._fps = self._ids = self._keywords = None
+
+    def remove(self):
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def backup_to(self, dest_path: str):
+        """Copia consistente de la base (API de backup de SQLite)."""
+        with self._lock:
+            dest = sqlite3.connect(str(dest_path))
+            try:
+                self._db().backup(dest)
+            finally:
+                dest.close()
+
+    # ----------------- Serialización -----------------
+    @staticmethod
+    def _dump(value) -> str:
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _fp(data: str) -> bytes:
+        return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def _is_id_list(key: str, value) -> bool:
+        return key.endswith("_ids") and isinstance(value, list) and all(isinstance(x, str) for x in value)
+
+    def _ensure_images(self, db):
+        if self._fps is None:
+            self._fps, self._ids = {}, {}
+            for scope, iid, fp in db.execute("SELECT scope, id, fp FROM items"):
+                self._fps.setdefault(scope, {})[iid] = fp
+            for scope, iid in db.execute("SELECT scope, id FROM seen_ids"):
+                self._ids.setdefault(scope, set()).add(iid)
+            self._keywords = [k for (k,) in db.execute("SELECT keyword FROM keyword_progress ORDER BY pos")]
+
+    # ----------------- Escritura por tabla -----------------
+    def _sync_items(self, db, scope: str, mapping: dict | None):
+        old = self._fps.get(scope, {})
+        new = {}
+        upserts = []
+        for iid, item in (mapping or {}).items():
+            iid = str(iid)
+            data = self._dump(item)
+            fp = self._fp(data)
+            new[iid] = fp
+            if old.get(iid) != fp:
+                upserts.append((scope, iid, data, fp))
+        gone = [(scope, iid) for iid in old if iid not in new]
+        if gone:
+            db.executemany("DELETE FROM items WHERE scope = ? AND id = ?", gone)
+        if upserts:
+            # UPSERT (no REPLACE): conserva el rowid y con él el orden de inserción al recargar
+            db.executemany("INSERT INTO items (scope, id, data, fp) VALUES (?, ?, ?, ?)"
+                           " ON CONFLICT (scope, id) DO UPDATE SET data = excluded.data, fp = excluded.fp", upserts)
+        self._fps[scope] = new
+
+    def _sync_ids(self, db, scope: str, ids):
+        old = self._ids.get(scope, set())
+        new = set(ids or [])
+        if old - new:
+            db.executemany("DELETE FROM seen_ids WHERE scope = ? AND id = ?", [(scope, i) for i in old - new])
+        added = [i for i in (ids or []) if i not in old]
+        if added:
+            db.executemany("INSERT OR IGNORE INTO seen_ids (scope, id) VALUES (?, ?)", [(scope, i) for i in added])
+        self._ids[scope] = new
+
+    def _sync_keywords(self, db, keywords):
+        keywords = list(keywords or [])
+        old = self._keywords or []
+        if keywords == old:
+            return
+        n = len(old) - len(keywords)
+        if n > 0 and old[n:] == keywords:
+            # caso habitual: se consumen keywords por delante
+            db.execute("DELETE FROM keyword_progress WHERE pos IN"
+                       " (SELECT pos FROM keyword_progress ORDER BY pos LIMIT ?)", (n,))
+        else:
+            db.execute("DELETE FROM keyword_progress")
+            db.executemany("INSERT INTO keyword_progress (pos, keyword) VALUES (?, ?)", list(enumerate(keywords)))
+        self._keywords = keywords
+
+    def _sync_table(self, db, table: str, mapping: dict | None):
+        db.execute(f"DELETE FROM {table}")
+        if mapping:
+            db.executemany(f"INSERT INTO {table} (name, v) VALUES (?, ?)",
+                           [(str(k), self._dump(v)) for k, v in mapping.items()])
+
+    def _sync_engine(self, db, engine_state: dict | None):
+        row = db.execute("SELECT v FROM meta WHERE k = 'engine_keys'").fetchone()
+        prev = json.loads(row[0]) if row and row[0] else {}
+        kinds = None
+        if engine_state is not None:
+            kinds = {}
+            for key, value in engine_state.items():
+                scope = f"engine:{key}"
+                if isinstance(value, dict):
+                    kinds[key] = "items"
+                    self._sync_items(db, scope, value)
+                elif self._is_id_list(key, value):
+                    kinds[key] = "ids"
+                    self._sync_ids(db, scope, value)
+                else:
+                    kinds[key] = "meta"
+                    db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", (scope, self._dump(value)))
+        # claves que desaparecen o cambian de tipo: fuera sus filas anteriores
+        for key, kind in prev.items():
+            if kinds is not None and kinds.get(key) == kind:
+                continue
+            scope = f"engine:{key}"
+            if kind == "items":
+                self._sync_items(db, scope, None)
+            elif kind == "ids":
+                self._sync_ids(db, scope, None)
+            else:
+                db.execute("DELETE FROM meta WHERE k = ?", (scope,))
+        db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('engine_keys', ?)",
+                   (self._dump(kinds) if kinds is not None else None,))
+
+    def _write(self, db, patch: dict):
+        for key, value in patch.items():
+            if key in self._TOP_ITEMS:
+                self._sync_items(db, self._TOP_ITEMS[key], value)
+            elif key in self._TOP_IDS:
+                self._sync_ids(db, self._TOP_IDS[key], value)
+            elif key == "remaining_keywords":
+                self._sync_keywords(db, value)
+            elif key == "cursors":
+                self._sync_table(db, "cursors", value)
+            elif key == "filter_stats":
+                self._sync_table(db, "filter_stats", value)
+            elif key == "engine_state":
+                self._sync_engine(db, value)
+            else:
+                db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", (f"state:{key}", self._dump(value)))
+
+    # ----------------- API -----------------
+    def replace(self, state: dict):
+        """Estado completo (init/save): las claves ausentes se eliminan."""
+        with self._lock:
+            db = self._db()
+            with db:
+                db.execute("DELETE FROM meta WHERE k LIKE 'state:%'")
+                self._ensure_images(db)
+                full = {"results": {}, "analiced_ids": [], "remaining_keywords": [], "cursors": {},
+                        "filter_stats": {}, "engine_state": None}
+                full.update(state)
+                self._write(db, full)
+
+    def patch(self, patch: dict):
+        """Checkpoint: una transacción con lo que cambió de las claves recibidas."""
+        with self._lock:
+            db = self._db()
+            with db:
+                self._ensure_images(db)
+                self._write(db, patch)
+
+    def _load_items(self, scope: str) -> dict:
+        with self._lock:
+            return {iid: json.loads(data) for iid, data in
+                    self._db().execute("SELECT id, data FROM items WHERE scope = ? ORDER BY rowid", (scope,))}
+
+    def _load_ids(self, scope: str) -> list:
+        with self._lock:
+            return [iid for (iid,) in
+                    self._db().execute("SELECT id FROM seen_ids WHERE scope = ? ORDER BY rowid", (scope,))]
+
+    def _load_table(self, table: str) -> dict:
+        with self._lock:
+            return {k: json.loads(v) for k, v in self._db().execute(f"SELECT name, v FROM {table}")}
+
+    def load(self) -> dict | None:
+        """Estado con las partes grandes perezosas (None si la base está vacía)."""
+        with self._lock:
+            db = self._db()
+            rows = dict(db.execute("SELECT k, v FROM meta"))
+            if not rows:
+                return None
+            keywords = [k for (k,) in db.execute("SELECT keyword FROM keyword_progress ORDER BY pos")]
+
+        state = _LazyDict(
+            {k[len("state:"):]: json.loads(v) for k, v in rows.items() if k.startswith("state:")},
+            loaders={
+                "results": lambda: self._load_items("results"),
+                "analiced_ids": lambda: self._load_ids("analiced_ids"),
+            },
+        )
+        state["remaining_keywords"] = keywords
+        state["cursors"] = self._load_table("cursors")
+        state["filter_stats"] = self._load_table("filter_stats")
+
+        kinds = json.loads(rows["engine_keys"]) if rows.get("engine_keys") else None
+        if kinds is None:
+            state["engine_state"] = None
+        else:
+            loaders = {}
+            for key, kind in kinds.items():
+                scope = f"engine:{key}"
+                if kind == "items":
+                    loaders[key] = (lambda s=scope: self._load_items(s))
+                elif kind == "ids":
+                    loaders[key] = (lambda s=scope: self._load_ids(s))
+                else:
+                    loaders[key] = (lambda v=rows.get(scope): json.loads(v) if v is not None else None)
+            state["engine_state"] = _LazyDict(loaders=loaders)
+        return state
@@ -6,6 +6,9 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict
 
+from src.state.StateWal import StateWal
+from src.state.SqliteStateStore import SqliteStateStore, materialize
+
 try:
     from zoneinfo import ZoneInfo
 except Exception:
@@ -22,10 +25,19 @@ class StateManager:
     - Permite "ligar" un basename (sin extensión) por categoría.
     - Todas las escrituras (init/save/patch/mark_*) van SIEMPRE a '<STATE_DIR>/<category>/<basename>.json'.
     - En "retomar", se liga el basename exacto del archivo subido (sin su .json) y se sobreescribe ahí.
+
+    STATE_BACKEND=json (por defecto) reescribe el JSON completo en cada checkpoint.
+    STATE_BACKEND=wal escribe snapshots compactos y, entre ellos, solo los deltas de cada
+    patch_state en '<basename>.wal.jsonl' (ver StateWal). load_state reproduce snapshot + log;
+    mark_completed / mark_error compactan para que el .json quede autocontenido.
+    STATE_BACKEND=sqlite guarda en '<basename>.sqlite' (ver SqliteStateStore): cada checkpoint es
+    una transacción con lo que cambió y load_state lee results / engine_state de forma perezosa.
     """
     SCHEMA_VERSION = 3
 
     _BOUND_BASENAME_BY_CATEGORY: Dict[str, str] = {}  # category -> basename (sin extensión)
+    _WALS: Dict[str, StateWal] = {}  # path del .json -> log de deltas (STATE_BACKEND=wal)
+    _STORES: Dict[str, SqliteStateStore] = {}  # path del .sqlite -> store abierto
 
     # ------------ fechas ------------
     @classmethod
@@ -38,6 +50,45 @@ class StateManager:
             return datetime.now(ZoneInfo("Europe/Madrid")).strftime("%d-%m-%Y_%H-%M")
         return datetime.now().strftime("%d-%m-%Y_%H-%M")
 
+    # ------------ backend ------------
+    @classmethod
+    def _backend(cls) -> str:
+        return os.getenv("STATE_BACKEND", "json").strip().lower()
+
+    @classmethod
+    def _wal(cls, path) -> StateWal:
+        key = str(path)
+        wal = cls._WALS.get(key)
+        if wal is None:
+            wal = StateWal(key, writer=lambda p, d: cls._atomic_write(p, d, indent=None))
+            cls._WALS[key] = wal
+        return wal
+
+    @classmethod
+    def _suffix(cls) -> str:
+        return ".sqlite" if cls._backend() == "sqlite" else ".json"
+
+    @classmethod
+    def _store(cls, path) -> SqliteStateStore:
+        key = str(path)
+        store = cls._STORES.get(key)
+        if store is None:
+            store = SqliteStateStore(key)
+            cls._STORES[key] = store
+        return store
+
+    @classmethod
+    def _write_full(cls, path, state: dict):
+        if cls._backend() == "sqlite":
+            cls._store(path).replace(state)
+            return
+        state = materialize(state)  # un estado leído de .sqlite puede traer partes sin cargar
+        if cls._backend() == "wal":
+            cls._wal(path).reset(state, fresh=True)
+        else:
+            cls._atomic_write(str(path), state)
+            cls._wal(path).remove()  # un log anterior ya no corresponde a este snapshot
+
     # ------------ utilidades de path ------------
     @classmethod
     def _safe_basename(cls, name_wo_ext: str) -> str:
@@ -47,16 +98,28 @@ class StateManager:
         return base or f"state_{cls._now_ts()}"
 
     @classmethod
-    def bind_state_basename(cls, category: str, basename_without_ext: str, seed_dict: Optional[dict] = None) -> Path:
+    def bind_state_basename(cls, category: str, basename_without_ext: str, seed_dict: Optional[dict] = None,
+                            seed_path: Optional[str] = None) -> Path:
         """
-        Liga un basename (sin extensión) a la categoría y, opcionalmente, escribe un estado inicial (seed_dict).
+        Liga un basename (sin extensión) a la categoría y, opcionalmente, escribe un estado inicial
+        (seed_dict, o el fichero seed_path: .sqlite se copia tal cual si el backend es sqlite).
         """
         cat = (category or "").lower()
         safe = cls._safe_basename(basename_without_ext)
         cls._BOUND_BASENAME_BY_CATEGORY[cat] = safe
         path = cls._resolve_state_path(category=cat)
+        if seed_path is not None and str(seed_path) != str(path):
+            if cls._backend() == "sqlite" and str(seed_path).endswith(".sqlite"):
+                cls._STORES.pop(str(path), SqliteStateStore(str(path))).remove()
+                cls._store(seed_path).backup_to(str(path))
+                return path
+            seed_dict = cls.read_state_file(seed_path)
         if seed_dict is not None:
-            cls._atomic_write(str(path), seed_dict)
+            if cls._backend() == "sqlite":
+                cls._STORES.pop(str(path), SqliteStateStore(str(path))).remove()
+            cls._WALS.pop(str(path), None)
+            seed = {k: v for k, v in seed_dict.items() if k != "wal_seq"}
+            cls._write_full(path, seed)
         return path
 
     @classmethod
@@ -65,7 +128,7 @@ class StateManager:
         base = cls._BOUND_BASENAME_BY_CATEGORY.get(cat)
         if not base:
             return None
-        p = STATE_DIR / cat / f"{base}.json"
+        p = STATE_DIR / cat / f"{base}{cls._suffix()}"
         p.parent.mkdir(parents=True, exist_ok=True)
         return p
 
@@ -80,7 +143,7 @@ class StateManager:
     def _resolve_state_path(cls, category: str, timestamp_str: Optional[str] = None) -> Path:
         """
         Resuelve el path de estado:
-        - Si hay basename ligado -> '<STATE_DIR>/<category>/<basename>.json'
+        - Si hay basename ligado -> '<STATE_DIR>/<category>/<basename>.json' (.sqlite con STATE_BACKEND=sqlite)
         - Si no hay ligadura -> usa 'state_<category>_<timestamp_str or now>.json'
         """
         cat = (category or "").lower()
@@ -93,14 +156,14 @@ class StateManager:
 
     # ------------ escritura atómica ------------
     @classmethod
-    def _atomic_write(cls, file_path: str, data_dict: dict):
+    def _atomic_write(cls, file_path: str, data_dict: dict, indent: int | None = 4):
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         fd, tmp_path = tempfile.mkstemp(
             dir=os.path.dirname(file_path), prefix=".tmp_state_", suffix=".json"
         )
         try:
             with os.fdopen(fd, "w", encoding="utf-8") as f:
-                json.dump(data_dict, f, indent=4, ensure_ascii=False)
+                json.dump(data_dict, f, indent=indent, ensure_ascii=False)
             os.replace(tmp_path, file_path)
         finally:
             if os.path.exists(tmp_path):
@@ -135,7 +198,7 @@ class StateManager:
             "last_saved_at": cls._now_iso(),
         }
         path = cls._resolve_state_path(category, timestamp_str=timestamp_str)
-        cls._atomic_write(str(path), state)
+        cls._write_full(path, state)
         return state
 
     @classmethod
@@ -184,22 +247,43 @@ class StateManager:
         if extras:
             state["extras"] = extras
 
-        cls._atomic_write(str(path), state)
+        cls._write_full(path, state)
         return state
 
     @classmethod
     def patch_state(cls, category: str, timestamp_str: str | None = None, filter_stats: dict | None = None, **patch):
         path = cls._resolve_state_path(category, timestamp_str=timestamp_str)
+        if cls._backend() == "sqlite":
+            if filter_stats is not None:
+                patch["filter_stats"] = filter_stats
+            patch["last_saved_at"] = cls._now_iso()
+            store = cls._store(path)
+            store.patch(patch)
+            return store.load()
+        if cls._backend() == "wal":
+            if filter_stats is not None:
+                patch["filter_stats"] = filter_stats
+            patch["last_saved_at"] = cls._now_iso()
+            wal = cls._wal(path)
+            state = wal.append(patch)
+            if patch.get("status") in ("COMPLETED", "ERROR"):
+                wal.compact()
+            return state
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                state = json.load(f)
+            wal = cls._wal(path)
+            if os.path.exists(wal.wal_path):
+                state = dict(wal.load() or {})
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
         except Exception:
             state = {}
+        state.pop("wal_seq", None)
         if filter_stats is not None:
             state["filter_stats"] = filter_stats
         state.update(patch)
         state["last_saved_at"] = cls._now_iso()
-        cls._atomic_write(str(path), state)
+        cls._write_full(path, state)
         return state
 
     @classmethod
@@ -208,31 +292,79 @@ class StateManager:
         Carga desde el fichero ligado. Si no hay ligadura, NO busca nada (comportamiento estricto).
         """
         path = cls.current_bound_path(category)
-        if not path or not path.exists():
+        if not path:
+            return None
+        if cls._backend() == "sqlite":
+            if not path.exists():
+                return None
+            state = cls._store(path).load()
+            if state is None:
+                return None
+            return cls._normalize(state)
+        wal = cls._wal(path)
+        if os.path.exists(wal.wal_path):
+            # snapshot + deltas (también si el backend actual es json: no se pierde lo ya registrado)
+            state = wal.load()
+            if state is None:
+                return None
+            state = dict(state)
+        elif not path.exists():
             return None
-        with open(path, "r", encoding="utf-8") as f:
-            state = json.load(f)
-
-        # Normalizaciones mínimas
-        state.setdefault("version", 1)
-        state.setdefault("status", "RUNNING")
-        state.setdefault("params", {})
-        state.setdefault("current_keyword", None)
-        state.setdefault("cursors", {})
-        state.setdefault("analiced_ids", [])
-        state.setdefault("results", {})
-        state.setdefault("filter_stats", {})
-        state.setdefault("engine_state", None)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            state.pop("wal_seq", None)
+        return cls._normalize(state)
+
+    @classmethod
+    def _normalize(cls, state: dict) -> dict:
+        """Normalizaciones mínimas de un estado cargado (sin leer las partes perezosas de sqlite)."""
+        defaults = {
+            "version": 1, "status": "RUNNING", "params": {}, "current_keyword": None, "cursors": {},
+            "analiced_ids": [], "results": {}, "filter_stats": {}, "engine_state": None,
+        }
+        for key, value in defaults.items():
+            if key not in state:
+                state[key] = value
         if "progress" not in state:
             total = len(state.get("remaining_keywords", []))
             state["progress"] = {"total_keywords": total, "processed_keywords": 0}
-        state.setdefault("last_error", None)
-        state.setdefault("last_saved_at", cls._now_iso())
+        for key, value in (("last_error", None), ("last_saved_at", cls._now_iso())):
+            if key not in state:
+                state[key] = value
         return state
 
+    @classmethod
+    def read_state_file(cls, file_path: str) -> dict | None:
+        """Lee un estado suelto (p. ej. subido por la persona usuaria): .sqlite perezoso o .json."""
+        if str(file_path).endswith(".sqlite"):
+            state = cls._store(file_path).load()
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            state.pop("wal_seq", None)
+        return cls._normalize(state) if state is not None else None
+
+    @classmethod
+    def release_state_file(cls, file_path: str, delete: bool = False):
+        """Cierra el store abierto por read_state_file (y opcionalmente borra el fichero)."""
+        store = cls._STORES.pop(str(file_path), None)
+        if store is not None:
+            store.close()
+        if delete:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(str(file_path) + suffix):
+                    os.remove(str(file_path) + suffix)
+
     @classmethod
     def clear_state(cls, category: str):
         path = cls.current_bound_path(category)
+        if path and cls._backend() == "sqlite":
+            cls._STORES.pop(str(path), SqliteStateStore(str(path))).remove()
+            return
+        if path:
+            cls._wal(path).remove()
+            cls._WALS.pop(str(path), None)
         if path and path.exists():
             os.remove(path)
 
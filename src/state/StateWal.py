@@ -0,0 +1,224 @@
+# src/state/StateWal.py
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+
+class StateWal:
+    """
+    Log de deltas (append-only) junto al snapshot JSON de un estado.
+
+    - '<basename>.json' es el snapshot compacto; '<basename>.wal.jsonl' guarda una línea por
+      checkpoint con las operaciones desde el anterior: {"seq", "at", "ops": [...]}.
+    - El estado se aplana en rutas: claves de primer nivel y sus hijos (en engine_state hasta el
+      ítem: ["engine_state", "raw_items", <id>]). Solo se escriben las rutas cuyo contenido cambió:
+        ["set", ruta, valor] / ["del", ruta]
+        ["ext", ruta, [...]]   lista de strings que crece por el final
+        ["trim", ruta, n]      lista de strings que pierde n elementos por delante (remaining_keywords)
+        ["sadd"/"srem", ruta, [...]]  listas '*_ids' tratadas como conjuntos
+    - Cada STATE_WAL_COMPACT_EVERY checkpoints (o si el log pasa de STATE_WAL_MAX_MB) se reescribe
+      el snapshot con "wal_seq" y se vacía el log; al cargar se ignoran las líneas ya incluidas,
+      así que una caída entre ambos pasos no duplica nada. Una última línea truncada se descarta.
+
+    Coste: lo que se ahorra es escritura a disco, no CPU. Cada append serializa a JSON y hashea
+    todas las hojas de las claves del patch (cada ítem de raw_items, results...), porque los ítems
+    se mutan en el sitio y no hay otra forma fiable de saber cuáles cambiaron. Con un engine_state
+    de N ítems el checkpoint sigue siendo O(N) en CPU; solo las rutas cambiadas llegan al log.
+    """
+
+    # Profundidad a la que se expanden los dicts (por defecto 2: ["results", <id>])
+    _DEPTH = {"engine_state": 3}
+
+    def __init__(self, json_path: str, writer):
+        self.json_path = str(json_path)
+        base = self.json_path[:-5] if self.json_path.endswith(".json") else self.json_path
+        self.wal_path = base + ".wal.jsonl"
+        self._write_snapshot = writer  # (path, dict) -> None, escritura atómica
+        self.compact_every = max(1, int(os.getenv("STATE_WAL_COMPACT_EVERY", "50")))
+        self.max_bytes = float(os.getenv("STATE_WAL_MAX_MB", "64")) * 1024 * 1024
+        self.state = None     # dict de primer nivel (referencias, sin copiar)
+        self.image = None     # clave de primer nivel -> {ruta: huella}
+        self.seq = 0
+        self.pending = 0      # checkpoints en el log desde la última compactación
+
+    # ----------------- Huellas -----------------
+    @staticmethod
+    def _dump(value) -> str:
+        return json.dumps(value, ensure_ascii=False, default=str)
+
+    @classmethod
+    def _flatten(cls, key: str, value) -> dict:
+        """{ruta(tupla): valor} de una clave de primer nivel."""
+        depth = cls._DEPTH.get(key, 2)
+        out = {}
+        stack = [((key,), value)]
+        while stack:
+            path, v = stack.pop()
+            if isinstance(v, dict) and v and len(path) < depth:
+                for k, child in v.items():
+                    stack.append((path + (str(k),), child))
+            else:
+                out[path] = v
+        return out
+
+    @staticmethod
+    def _is_str_list(v) -> bool:
+        return isinstance(v, list) and all(isinstance(x, str) for x in v)
+
+    @classmethod
+    def _fingerprint(cls, path: tuple, v):
+        """Huella comparable de una hoja: el propio contenido en listas de strings, hash del JSON en el resto."""
+        if cls._is_str_list(v):
+            if path[-1].endswith("_ids") and len(set(v)) == len(v):
+                return ("set", frozenset(v))
+            return ("list", tuple(v))
+        return ("h", hashlib.blake2b(cls._dump(v).encode("utf-8"), digest_size=16).digest())
+
+    def _image_of(self, key: str, value) -> dict:
+        return {p: self._fingerprint(p, v) for p, v in self._flatten(key, value).items()}
+
+    # ----------------- Diff -----------------
+    def _diff_key(self, key: str, value, ops: list) -> dict:
+        old = self.image.get(key, {})
+        new_img = {}
+        flat = self._flatten(key, value)
+        for path in old:
+            if path not in flat:
+                ops.append(["del", list(path)])
+        for path, v in flat.items():
+            fp = self._fingerprint(path, v)
+            new_img[path] = fp
+            prev = old.get(path)
+            if prev == fp:
+                continue
+            if prev is not None and prev[0] == fp[0] == "set":
+                added, removed = fp[1] - prev[1], prev[1] - fp[1]
+                if removed:
+                    ops.append(["srem", list(path), sorted(removed)])
+                if added:
+                    ops.append(["sadd", list(path), [x for x in v if x in added]])
+                continue
+            if prev is not None and prev[0] == fp[0] == "list":
+                a, b = prev[1], fp[1]
+                if len(b) > len(a) and b[:len(a)] == a:
+                    ops.append(["ext", list(path), list(b[len(a):])])
+                    continue
+                if len(b) < len(a) and a[len(a) - len(b):] == b:
+                    ops.append(["trim", list(path), len(a) - len(b)])
+                    continue
+            ops.append(["set", list(path), v])
+        return new_img
+
+    # ----------------- Replay -----------------
+    @staticmethod
+    def _apply(state: dict, op: list):
+        kind, path = op[0], op[1]
+        node = state
+        for k in path[:-1]:
+            nxt = node.get(k) if isinstance(node, dict) else None
+            if not isinstance(nxt, dict):
+                if kind in ("del", "srem", "trim"):
+                    return
+                nxt = {}
+                node[k] = nxt
+            node = nxt
+        last = path[-1]
+        if kind == "set":
+            node[last] = op[2]
+        elif kind == "del":
+            node.pop(last, None)
+        elif kind == "ext":
+            node[last] = list(node.get(last) or []) + op[2]
+        elif kind == "trim":
+            node[last] = list(node.get(last) or [])[op[2]:]
+        elif kind == "sadd":
+            cur = list(node.get(last) or [])
+            seen = set(cur)
+            node[last] = cur + [x for x in op[2] if x not in seen]
+        elif kind == "srem":
+            gone = set(op[2])
+            node[last] = [x for x in (node.get(last) or []) if x not in gone]
+
+    def load(self) -> dict | None:
+        """Snapshot + líneas del log posteriores a su wal_seq."""
+        try:
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = None
+        base_seq = int((state or {}).pop("wal_seq", 0) or 0)
+        seq, pending = base_seq, 0
+        if os.path.exists(self.wal_path):
+            good = 0  # offset tras la última línea válida
+            with open(self.wal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        break  # última línea a medio escribir
+                    good += len(line)
+                    if rec.get("seq", 0) <= base_seq:
+                        continue
+                    state = {} if state is None else state
+                    for op in rec.get("ops") or []:
+                        self._apply(state, op)
+                    seq, pending = rec["seq"], pending + 1
+            if good < os.path.getsize(self.wal_path):
+                with open(self.wal_path, "r+b") as f:
+                    f.truncate(good)  # los siguientes checkpoints no se pegan al trozo roto
+        self.seq, self.pending = seq, pending
+        self.state = state
+        self.image = {k: self._image_of(k, v) for k, v in state.items()} if state is not None else None
+        return state
+
+    # ----------------- Escritura -----------------
+    def reset(self, state: dict, fresh: bool = False):
+        """Snapshot completo (init/save/compactación) y log vacío. fresh=True descarta antes el log previo."""
+        if fresh:
+            self.remove()
+        self.state = state
+        self._write_snapshot(self.json_path, dict(state, wal_seq=self.seq))
+        with open(self.wal_path, "w", encoding="utf-8"):
+            pass
+        self.pending = 0
+        self.image = {k: self._image_of(k, v) for k, v in state.items()}
+
+    def compact(self):
+        if self.state is not None:
+            self.reset(self.state)
+
+    def append(self, patch: dict) -> dict:
+        """Aplica patch (claves de primer nivel) y añade al log solo lo que cambió."""
+        if self.image is None:
+            self.load()
+            if self.state is None:
+                self.state = {}
+                self.image = {}
+        ops = []
+        for key, value in patch.items():
+            self.image[key] = self._diff_key(key, value, ops)
+            self.state[key] = value
+        if ops:
+            self.seq += 1
+            rec = {"seq": self.seq, "at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"), "ops": ops}
+            with open(self.wal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending += 1
+        if self.pending >= self.compact_every or self._wal_size() > self.max_bytes:
+            self.compact()
+        return self.state
+
+    def _wal_size(self) -> int:
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def remove(self):
+        if os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self.state = self.image = None
+        self.seq = self.pending = 0
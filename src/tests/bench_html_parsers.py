@@ -0,0 +1,88 @@
+from __future__ import annotations
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+# Añadir el directorio raíz del proyecto al sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils import HtmlParsing
+from src.utils.DescriptionExtractor import DescriptionExtractor
+
+# ==============================================================
+# Benchmark de backends HTML (HtmlParsing) sobre páginas guardadas
+#   - ms/página de page_meta (y de table_rows con --tables)
+#   - speedup frente a bs4 (html.parser)
+#   - concordancia de la descripción elegida por el extractor frente a bs4
+# Uso:
+#   python src/tests/bench_html_parsers.py --dir output/html_corpus --backends selectolax,lxml,tokenizer,bs4
+# ==============================================================
+
+
+def _load_corpus(directory: str) -> List[str]:
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "**", "*.htm*"), recursive=True)):
+        with open(path, "rb") as f:
+            pages.append(f.read().decode("utf-8", errors="replace"))
+    return pages
+
+
+def _run(backend: str, pages: List[str], repeat: int, tables: bool) -> Dict[str, Any]:
+    picker = DescriptionExtractor()
+    fn = HtmlParsing.table_rows if tables else HtmlParsing.page_meta
+    out = [fn(html, backend=backend) for html in pages]  # calentamiento + resultados
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            fn(html, backend=backend)
+    elapsed = time.perf_counter() - t0
+
+    if tables:
+        picked = [[[c.strip() for c in row] for row in rows] for rows in out]
+    else:
+        picked = [(picker._pick(info) or {}).get("desc", "") for info in out]
+    return {"ms_per_page": 1000 * elapsed / (repeat * len(pages)), "picked": picked}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara backends HTML (selectolax/lxml/tokenizer/bs4).")
+    ap.add_argument("--dir", required=True, help="carpeta con páginas .html/.htm guardadas")
+    ap.add_argument("--backends", default=",".join(HtmlParsing.BACKENDS), help="backends a comparar (bs4 es la referencia)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--tables", action="store_true", help="medir table_rows (scraping MITRE) en vez de page_meta")
+    args = ap.parse_args()
+
+    pages = _load_corpus(args.dir)
+    if not pages:
+        print(f"❌ No hay páginas .html/.htm en {args.dir}")
+        sys.exit(1)
+
+    available = HtmlParsing.available_backends()
+    backends = [b.strip() for b in args.backends.split(",") if b.strip() in available]
+    if "bs4" in available and "bs4" not in backends:
+        backends.append("bs4")
+    missing = [b.strip() for b in args.backends.split(",") if b.strip() and b.strip() not in available]
+    if missing:
+        print(f"🟡 No instalados: {', '.join(missing)}")
+
+    op = "table_rows" if args.tables else "page_meta"
+    print(f"\n=== {op} — {len(pages)} páginas × {args.repeat} repeticiones ===")
+    results = {b: _run(b, pages, args.repeat, args.tables) for b in backends}
+    ref = results.get("bs4")
+    for backend in backends:
+        res = results[backend]
+        line = f"{backend:>10}  {res['ms_per_page']:.2f} ms/página"
+        if ref is not None and backend != "bs4":
+            speedup = ref["ms_per_page"] / res["ms_per_page"] if res["ms_per_page"] else 0.0
+            agree = sum(a == b for a, b in zip(ref["picked"], res["picked"])) / len(pages)
+            line += f"  speedup={speedup:.1f}×  coincidencia={agree * 100:.0f}%"
+        print(line)
+    print(f"\nBackend por defecto (HTML_PARSER={os.getenv('HTML_PARSER', 'auto')}): {HtmlParsing.resolve_backend()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+# Añadir el directorio raíz del proyecto al sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.filters.MultiModelTaggerLocal import MultiModelTaggerLocal, MODELS, BACKENDS, labels
+from src.tests.test_heuristic import CASES
+
+# ==============================================================
+# Benchmark de backends CPU del ensemble zero-shot
+#   - latencia (1 ítem por llamada) y throughput (lotes)
+#   - concordancia con fp32: |Δscore| máx/medio y top-1 coincidente
+# Uso:
+#   python src/tests/bench_nli_backends.py --models bart --backends torch,int8,onnx
+# ==============================================================
+
+
+def _tagger(key: str, backend: str) -> MultiModelTaggerLocal:
+    tagger = MultiModelTaggerLocal()
+    tagger.active_models = [key]
+    tagger.backends = {key: backend}
+    tagger.score_cache = None  # medir inferencia real
+    return tagger
+
+
+def _run(tagger: MultiModelTaggerLocal, key: str, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    # Calentamiento (carga + primera pasada)
+    t0 = time.perf_counter()
+    tagger.score_many(texts[:1], labels, batch_size=1)
+    load_s = time.perf_counter() - t0
+
+    lat = []
+    for text in texts:
+        t0 = time.perf_counter()
+        tagger.score_many([text], labels, batch_size=1)
+        lat.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    rows = tagger.score_many(texts, labels, batch_size=batch_size)
+    batch_s = time.perf_counter() - t0
+
+    lat.sort()
+    return {
+        "backend": tagger.backend_for(key),
+        "load_s": load_s,
+        "lat_p50_ms": 1000 * lat[len(lat) // 2],
+        "lat_p95_ms": 1000 * lat[min(len(lat) - 1, int(len(lat) * 0.95))],
+        "items_per_s": len(texts) / batch_s if batch_s else 0.0,
+        "scores": [dict(r.get(key, [])) for r in rows],
+    }
+
+
+def _agreement(ref: List[dict], other: List[dict]) -> Dict[str, float]:
+    diffs, top1 = [], 0
+    for a, b in zip(ref, other):
+        if not a or not b:
+            continue
+        diffs.extend(abs(a[lbl] - b.get(lbl, 0.0)) for lbl in a)
+        top1 += max(a, key=a.get) == max(b, key=b.get)
+    n = len([1 for a, b in zip(ref, other) if a and b]) or 1
+    return {
+        "max_abs_diff": max(diffs) if diffs else 0.0,
+        "mean_abs_diff": sum(diffs) / len(diffs) if diffs else 0.0,
+        "top1_agree": top1 / n,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara backends CPU (torch/int8/onnx) del ensemble zero-shot.")
+    ap.add_argument("--models", default=",".join(MODELS), help="claves de MODELS separadas por comas")
+    ap.add_argument("--backends", default=",".join(BACKENDS), help="backends a comparar (torch es la referencia)")
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--tol", type=float, default=0.05, help="|Δscore| máximo tolerado frente a fp32")
+    args = ap.parse_args()
+
+    texts = [f"{c['title']}. {c['desc']}".strip() for c in CASES]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip() in BACKENDS]
+    if "torch" not in backends:
+        backends.insert(0, "torch")
+
+    ok = True
+    for key in [k.strip() for k in args.models.split(",") if k.strip() in MODELS]:
+        print(f"\n=== {key} ({MODELS[key]}) — {len(texts)} casos × {len(labels)} etiquetas ===")
+        ref = None
+        for backend in backends:
+            res = _run(_tagger(key, backend), key, texts, args.batch_size)
+            line = (f"{backend:>6} → {res['backend']:<6} carga={res['load_s']:.1f}s  "
+                    f"p50={res['lat_p50_ms']:.0f}ms  p95={res['lat_p95_ms']:.0f}ms  "
+                    f"throughput={res['items_per_s']:.2f} ítems/s")
+            if backend == "torch":
+                ref = res["scores"]
+            else:
+                agr = _agreement(ref, res["scores"])
+                passed = agr["max_abs_diff"] <= args.tol
+                ok = ok and passed
+                line += (f"  |Δ|máx={agr['max_abs_diff']:.3f}  |Δ|medio={agr['mean_abs_diff']:.4f}  "
+                         f"top1={agr['top1_agree'] * 100:.0f}%  {'✅' if passed else '❌'}")
+            print(line)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
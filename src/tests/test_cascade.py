@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("numpy")
+
+from src.filters.FilterEngine import FilterEngine
+from src.filters.MultiModelTaggerLocal import MultiModelTaggerLocal
+
+LABELS = ["Factory/plant shutdown (production halted)", "Unrelated/marketing/product news"]
+
+# Distribución clara y coincidente en los tres modelos, con score entre mid_conf y hi_conf:
+# con min_margin alto en el nivel solo la regla mid_conf (votos) puede aceptar
+ROWS = [(LABELS[0], 0.78), (LABELS[1], 0.02)]
+
+
+def _tagger(monkeypatch, cascade: bool) -> MultiModelTaggerLocal:
+    monkeypatch.setenv("IA_CASCADE", "1" if cascade else "0")
+    monkeypatch.setenv("NLI_CACHE", "0")
+    tagger = MultiModelTaggerLocal()
+    monkeypatch.setattr(
+        tagger, "score_many",
+        lambda items, labels, models=None, **kw: [
+            {m: list(ROWS) for m in (models or tagger.active_models)} for _ in items
+        ],
+    )
+    return tagger
+
+
+def test_etapa_rapida_decide_igual_que_el_ensemble(monkeypatch):
+    kw = FilterEngine._level_params({"labels": LABELS, "min_margin": 0.99})
+    assert kw["min_votes"] > 1
+    items = [("Carmaker halts assembly line", "Production stopped for two days")]
+    levels = [("1", LABELS, kw)]
+
+    fast = _tagger(monkeypatch, cascade=True).classify_levels(items, levels)[0]["1"]
+    full = _tagger(monkeypatch, cascade=False).classify_levels(items, levels)[0]["1"]
+
+    assert fast[3]["stage"] == "fast"
+    assert fast[0] == full[0] == LABELS[0]
+    assert full[3]["accepted"] is True
+    assert fast[3]["accepted"] is True
@@ -0,0 +1,49 @@
+import gzip
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils.DiscardLog import DiscardLog
+
+
+def _recs(start: int, n: int) -> list:
+    return [{"NormKey": f"k{i}", "ItemType": "news" if i % 2 else "papers", "n": i} for i in range(start, start + n)]
+
+
+def test_rotacion_en_segmentos_gzip(tmp_path):
+    log = DiscardLog(str(tmp_path / "descartes.jsonl"), max_bytes=200, compress=True)
+    for i in range(0, 30, 5):
+        log.append(_recs(i, 5))
+
+    segs = log.segments()
+    rotated = [s for s in segs if s.endswith(".jsonl.gz")]
+    assert rotated and segs[-1] in rotated + [log.path]
+    with gzip.open(rotated[0], "rt", encoding="utf-8") as f:
+        assert json.loads(f.readline())["n"] == 0
+    assert [r["n"] for r in log.iter_records()] == list(range(30))
+
+
+def test_paginas_y_conteo_entre_segmentos(tmp_path):
+    # histórico en formato antiguo (.json con lista) + rotados sin comprimir + activo
+    with open(tmp_path / "descartes.json", "w", encoding="utf-8") as f:
+        json.dump(_recs(0, 3), f)
+    log = DiscardLog(str(tmp_path / "descartes.json"), max_bytes=150, compress=False)
+    assert log.path.endswith(".jsonl")
+    for i in range(3, 23, 4):
+        log.append(_recs(i, 4))
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"NormKey": "roto"')  # línea truncada: se ignora
+
+    assert len(log.segments()) > 2
+    assert log.count() == 23
+    assert log.count(where={"ItemType": "news"}) == 11
+
+    first = log.read_page(0, page_size=10)
+    last = log.read_page(2, page_size=10)
+    assert [r["n"] for r in first["items"]] == list(range(10)) and first["has_more"]
+    assert [r["n"] for r in last["items"]] == [20, 21, 22] and not last["has_more"]
+
+    news = log.read_page(1, page_size=4, where={"ItemType": ["news"]}, predicate=lambda r: r["n"] > 2)
+    assert [r["n"] for r in news["items"]] == [11, 13, 15, 17]
@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils.DomainHealth import DomainHealth
+
+OK = {"desc": "x", "status": 200, "ctype": "text/html"}
+BLOCKED = {"desc": "", "status": 403, "ctype": "text/html"}
+EMPTY = {"desc": "", "status": 200, "ctype": "text/html"}
+
+
+def _health(tmp_path, monkeypatch) -> DomainHealth:
+    monkeypatch.setenv("DOMAIN_SKIP_AFTER", "3")
+    monkeypatch.setenv("DOMAIN_SKIP_HOURS", "1")
+    monkeypatch.setenv("DOMAIN_MAX_CONCURRENCY", "4")
+    return DomainHealth(str(tmp_path / "health.json"))
+
+
+def test_clasificacion():
+    assert DomainHealth.classify(OK) == "ok"
+    assert DomainHealth.classify(BLOCKED) == "blocked"
+    assert DomainHealth.classify(EMPTY) == "empty"
+    assert DomainHealth.classify({"status": 404, "ctype": "text/html"}) == "http_error"
+    assert DomainHealth.classify({"status": 200, "ctype": "application/pdf"}) == "non_html"
+    assert DomainHealth.classify({"status": None, "error": "timeout"}) == "error"
+
+
+def test_backoff_del_gap(tmp_path, monkeypatch):
+    h = _health(tmp_path, monkeypatch)
+    assert h.gap("a.test", 1.5) == 1.5
+    h.record("a.test", BLOCKED)
+    h.record("a.test", BLOCKED)
+    assert h.gap("a.test", 1.5) == 6.0           # ×2 por bloqueo
+    h.record("a.test", OK)
+    assert h.gap("a.test", 1.5) == 1.5 * 4 * 0.8  # ×0.8 por acierto
+    for _ in range(10):
+        h.record("b.test", {"status": None, "error": "x"})
+    assert h.domains["b.test"]["mult"] == DomainHealth.MAX_MULT
+
+
+def test_aparcar_y_reincidencia(tmp_path, monkeypatch):
+    h = _health(tmp_path, monkeypatch)
+    for _ in range(2):
+        h.record("c.test", EMPTY)
+    assert not h.should_skip("c.test")
+    h.record("c.test", EMPTY)
+    assert h.should_skip("c.test")
+    first = h.domains["c.test"]["skip_until"] - time.time()
+    assert 3500 < first <= 3600
+
+    # al expirar, un fallo más lo aparca el doble de tiempo
+    h.domains["c.test"]["skip_until"] = time.time() - 1
+    assert not h.should_skip("c.test")
+    h.record("c.test", EMPTY)
+    second = h.domains["c.test"]["skip_until"] - time.time()
+    assert 7100 < second <= 7200 and h.domains["c.test"]["skips"] == 2
+
+
+def test_slots_y_persistencia(tmp_path, monkeypatch):
+    h = _health(tmp_path, monkeypatch)
+    for _ in range(DomainHealth.MIN_SAMPLES - 1):
+        h.record("d.test", OK)
+    assert h.slots("d.test") == 1  # pocas muestras
+    h.record("d.test", OK)
+    assert h.slots("d.test") == 4
+    h.save()
+
+    again = _health(tmp_path, monkeypatch)
+    assert again.success_rate("d.test") == 1.0
+    assert again.slots("d.test") == 4
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils.EnrichmentQueue import EnrichmentQueue
+
+
+def test_prioridad_y_diferidos():
+    q = EnrichmentQueue(max_attempts=3, retry_base_s=60)
+    q.push("viejo", prio=-1)
+    q.push("nuevo", prio=-5)
+    assert q.pop() == "nuevo"
+    q.defer("nuevo")  # intento fallido: vuelve dentro de 60 s
+    assert q.eligible() == 1 and len(q) == 2
+    assert q.pop() == "viejo"
+    q.done("viejo")
+    assert q.pop() is None and q.eligible() == 0
+    assert q.pop(now=time.time() + 61) == "nuevo"
+
+
+def test_fallidos_caducan_y_se_olvidan(monkeypatch):
+    monkeypatch.setenv("ENRICH_FAILED_TTL_H", "1")
+    q = EnrichmentQueue(max_attempts=1, retry_base_s=0)
+    q.push("a")
+    q.pop()
+    q.defer("a")
+    assert "a" in q.failed and "a" not in q
+    q.push("a")
+    assert "a" not in q  # aún dentro del TTL
+
+    q.failed["a"][1] -= 3601
+    q.push("a")
+    assert "a" in q and "a" not in q.failed
+
+    q.pop()
+    q.defer("a")
+    q.forget("a")
+    assert not q.failed
+    q.push("a")
+    assert "a" in q
+
+
+def test_snapshot_poda_fallidos_caducados():
+    q = EnrichmentQueue(max_attempts=1)
+    q.failed = {"viejo": [4, time.time() - 10 * 86400], "reciente": [4, time.time()]}
+    q.push("x", prio=2.0)
+    snap = q.to_snapshot()
+    assert set(snap["failed"]) == {"reciente"}
+
+    again = EnrichmentQueue()
+    again.load_snapshot({"items": snap["items"], "failed": {"antiguo": 4}})  # formato anterior
+    assert "x" in again and again.failed["antiguo"][0] == 4
+
+
+def test_eligible_no_cuenta_en_vuelo_ni_copias_viejas():
+    q = EnrichmentQueue(retry_base_s=60)
+    q.push("a", prio=-1)
+    q.push("b")
+    q.push("c")
+    q.requeue("c")  # reprograma: la copia vieja del heap no cuenta dos veces
+    assert q.eligible() == 3
+    assert q.pop() == "a"
+    assert q.eligible() == 2 and len(q) == 3  # en vuelo: sigue en la cola, pero no es extraíble
+    q.requeue("a")
+    assert q.eligible() == 3
+    assert q.pop() == "a"
+    q.defer("a")
+    assert q.eligible() == 2
+    assert q.eligible(now=time.time() + 61) == 3  # el diferido vencido se promueve al heap listo
+    q.done("b")
+    assert q.eligible() == 2
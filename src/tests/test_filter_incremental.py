@@ -0,0 +1,136 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+pytest.importorskip("streamlit")
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.engines.SearchEngineNews import NewsSearchEngine
+from src.engines.SearchEnginePaper import PaperSearchEngine
+from src.filters.FilterEngine import FilterEngine
+from src.utils.Methods import Methods
+
+
+def _paper(**extra) -> dict:
+    base = {
+        "Title": "Ransomware attack on automotive supplier halts production",
+        "Summary": "Attack on a tier-1 supplier stopped assembly lines.",
+        "Year": 2024, "Source": ["Semantic Scholar"], "DOI": "",
+    }
+    base.update(extra)
+    return base
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    # solo la puerta de año: el test trata de claves y huellas, no de los heurísticos
+    monkeypatch.setenv("FILTER_GATE_ORDER", "year")
+    for var in ("INCIDENT_REJECTS_PATH", "IA_REJECTS_PATH", "AUTO_REJECTS_PATH"):
+        monkeypatch.setenv(var, str(tmp_path / f"{var}.jsonl"))
+    engine = PaperSearchEngine()
+    fe = FilterEngine()
+    engine.filter_engine = fe
+    return engine, fe
+
+
+def test_rekey_por_doi_reevalua_el_item(engines):
+    engine, fe = engines
+    engine.add_or_update_result(_paper())
+    fe.filter_and_classify_items(engine, "papers")
+    title_key = Methods.normalize_title(_paper()["Title"])
+    assert list(engine.final_results) == [title_key]
+
+    # la misma publicación llega con DOI: se re-clava por DOI sin cambiar título/resumen/año
+    engine.add_or_update_result(_paper(DOI="10.1234/ABC.5", Source=["OpenAlex"]))
+    fe.filter_and_classify_items(engine, "papers")
+
+    assert list(engine.final_results) == ["10.1234/abc.5"]
+    assert fe.total_items == 1  # decisiones vigentes, no evaluaciones acumuladas
+
+
+def test_sin_cambios_no_se_reevalua(engines):
+    engine, fe = engines
+    engine.add_or_update_result(_paper(DOI="10.1/x"))
+    fe.filter_and_classify_items(engine, "papers")
+    calls = fe.gate_stats["year"]["calls"]
+
+    engine.add_or_update_result(_paper(DOI="10.1/x", Source=["OpenAlex"]))  # solo otra fuente
+    engine.dirty_ids.add("10.1/x")
+    fe.filter_and_classify_items(engine, "papers")
+
+    assert fe.gate_stats["year"]["calls"] == calls
+    assert fe.total_items == 1
+
+
+class _AcceptAll:
+    def __init__(self):
+        self.calls = 0
+
+    def classify_levels(self, items, levels, batch_size=None):
+        self.calls += len(items)
+        dbg = {"accepted": True, "votes": 2, "margin": 0.5, "entropy": 0.1, "stage": "full"}
+        return [{lid: ("incident", 0.9, {}, dbg) for lid, _, _ in levels} for _ in items]
+
+
+def test_ia_diferida_no_repite_heuristicos(engines):
+    engine, fe = engines
+    fe._gate_order = ["year", "ai"]
+    engine.apply_filter_ia = True
+    engine.values_levels_ia = {"1": {"labels": ["incident"]}}
+    fe._analyzer = tagger = _AcceptAll()
+
+    engine.add_or_update_result(_paper(DOI="10.1/x"))
+    fe.filter_and_classify_items(engine, "papers", run_ai=False)
+    calls = fe.gate_stats["year"]["calls"]
+    assert engine.dirty_ids == {"10.1/x"} and tagger.calls == 0
+
+    fe.filter_and_classify_items(engine, "papers", run_ai=False)  # sigue pendiente: sin repetir puertas
+    assert fe.gate_stats["year"]["calls"] == calls
+
+    fe.filter_and_classify_items(engine, "papers", run_ai=True)
+    assert fe.gate_stats["year"]["calls"] == calls and tagger.calls == 1
+    item = engine.raw_items["10.1/x"]
+    assert item["_FilterGate"] == "final" and "_FilterHeurFP" not in item
+    assert list(engine.final_results) == ["10.1/x"]
+
+
+def test_fusion_solo_hereda_contenido_y_reindexa_resumen(tmp_path, monkeypatch):
+    monkeypatch.setenv("ENRICH_CACHE", "0")
+    monkeypatch.setenv("DOMAIN_HEALTH", "0")
+    engine = NewsSearchEngine()
+    keep = {"ID": "keep", "Title": "Brake recall", "Summary": "", "URL": "", "Source": ["a"], "Year": 2024}
+    dup = {"ID": "dup", "Title": "Brake recall update", "Summary": "Maker recalls cars over brake software flaw.",
+           "URL": "https://x.example/recall", "Source": ["b"], "Year": 2024,
+           "_HeurFP": "viejo", "_IncFP": "viejo", "Heur_Score": 3, "Incident": "Sí", "Label_1": "incident",
+           "Score_1": 0.9, "SemSim_1": 0.8}
+    engine.raw_items = {"keep": keep, "dup": dup}
+    engine._summary_index()  # índice ya construido: la fusión debe mantenerlo
+    engine._merge_masters("keep", "dup")
+
+    assert keep["Summary"] == dup["Summary"] and keep["URL"] == dup["URL"] and keep["Source"] == ["a", "b"]
+    assert not [k for k in keep if k.startswith(("_Heur", "_Inc", "Heur_", "Incident", "Label_", "Score_", "SemSim_"))]
+    sim = engine._summary_simhash(keep)
+    assert all("keep" in engine._idx_by_summary_band[bk] for bk in Methods.simhash_bands(sim, bands=engine.summary_bands))
+
+
+def test_orden_guardado_no_pisa_filter_gate_order(tmp_path, monkeypatch):
+    for var in ("INCIDENT_REJECTS_PATH", "IA_REJECTS_PATH", "AUTO_REJECTS_PATH"):
+        monkeypatch.setenv(var, str(tmp_path / f"{var}.jsonl"))
+    saved = {"gate_order": ["incident", "automotive", "keyword_prefilter", "already_analysed", "year", "ai"]}
+
+    monkeypatch.setenv("FILTER_GATE_ORDER", "year,incident,ai")
+    fe = FilterEngine()
+    fe.load_stats_from_dict(saved)
+    assert fe._gate_order == ["year", "incident", "ai"]
+
+    monkeypatch.delenv("FILTER_GATE_ORDER")
+    fe = FilterEngine()
+    fe.load_stats_from_dict(saved)  # semilla válida: se reanuda, pero con el prefiltro antes del heurístico
+    assert fe._gate_order == ["incident", "keyword_prefilter", "automotive", "already_analysed", "year", "ai"]
+    fe.load_stats_from_dict({"gate_order": ["year", "ai"]})  # otra configuración de puertas: se ignora
+    assert len(fe._gate_order) == 6
@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils import HtmlParsing
+
+PAGE = """<!DOCTYPE html>
+<html lang="es"><head>
+<meta charset="utf-8">
+<link rel="canonical" href=" https://news.test/articulo ">
+<meta property="og:description" content="Ransomware en una planta &amp; paro de producción">
+<meta name="description" content="Descripción meta">
+<meta name="twitter:description" content="Descripción twitter">
+</head><body>
+<nav><a href="/">Inicio</a></nav>
+<p>Primer <b>párrafo</b> del artículo.</p>
+<p>Segundo párrafo.</p>
+</body></html>"""
+
+TABLE = """<html><body><table>
+<tr><th>Name</th><th>Description</th></tr>
+<tr><td>CVE-2024-0001</td><td> ECU firmware <i>overflow</i> </td></tr>
+<tr><td>CVE-2024-0002</td><td>Telematics &lt;unit&gt; bypass</td></tr>
+</table></body></html>"""
+
+# celdas sin </td>: las cierra el fin de fila o de tabla...
+UNCLOSED_END = """<table><tr><td>CVE-2024-0001</td><td>ECU overflow</tr>
+<tr><td>CVE-2024-0002</td><td>Telematics bypass</table>"""
+# ...o la siguiente celda (bs4 + html.parser las anida aquí; lxml/selectolax siguen HTML5)
+UNCLOSED_NEXT = """<table><tr><td>CVE-2024-0001<td>ECU overflow</td></tr>
+<tr><td>CVE-2024-0002<td>Telematics bypass</td></tr></table>"""
+UNCLOSED_ROWS = [["CVE-2024-0001", "ECU overflow"], ["CVE-2024-0002", "Telematics bypass"]]
+
+BACKENDS = HtmlParsing.available_backends()
+
+
+def _norm_meta(info: dict) -> dict:
+    return {
+        "lang": info["lang"],
+        "canonical": (info["canonical"] or "").strip(),
+        "metas": {k: v.strip() for k, v in info["metas"].items()},
+        "p": " ".join((info["p"] or "").split()),
+    }
+
+
+def test_tokenizer_siempre_disponible():
+    assert "tokenizer" in BACKENDS
+    assert HtmlParsing.resolve_backend("no-existe") == BACKENDS[0]
+
+
+def test_tokenizer_page_meta():
+    info = _norm_meta(HtmlParsing.page_meta(PAGE, backend="tokenizer"))
+    assert info == {
+        "lang": "es",
+        "canonical": "https://news.test/articulo",
+        "metas": {
+            "og:description": "Ransomware en una planta & paro de producción",
+            "meta:description": "Descripción meta",
+            "twitter:description": "Descripción twitter",
+        },
+        "p": "Primer párrafo del artículo.",
+    }
+
+
+@pytest.mark.parametrize("backend", [b for b in BACKENDS if b != "tokenizer"])
+def test_backends_coinciden_en_page_meta(backend):
+    ref = _norm_meta(HtmlParsing.page_meta(PAGE, backend="tokenizer"))
+    assert _norm_meta(HtmlParsing.page_meta(PAGE, backend=backend)) == ref
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_coinciden_en_table_rows(backend):
+    rows = [[c.strip() for c in row] for row in HtmlParsing.table_rows(TABLE, backend=backend)]
+    assert [r for r in rows if r] == [
+        ["CVE-2024-0001", "ECU firmware overflow"],
+        ["CVE-2024-0002", "Telematics <unit> bypass"],
+    ]
+
+
+
+def test_tokenizer_cierra_celdas_al_acabar_fila_como_bs4():
+    pytest.importorskip("bs4")
+    rows = HtmlParsing.table_rows(UNCLOSED_END, backend="tokenizer")
+    assert rows == HtmlParsing.table_rows(UNCLOSED_END, backend="bs4") == UNCLOSED_ROWS
+
+
+@pytest.mark.parametrize("backend", [b for b in BACKENDS if b != "bs4"])
+def test_celda_nueva_cierra_la_anterior(backend):
+    assert HtmlParsing.table_rows(UNCLOSED_NEXT, backend=backend) == UNCLOSED_ROWS
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+requests = pytest.importorskip("requests")
+
+from src.utils.HttpCache import HttpCache
+
+
+def _response(status: int, body: bytes = b"", headers: dict | None = None, url: str = "https://api.test/v1"):
+    r = requests.Response()
+    r.status_code = status
+    r._content = body
+    r.headers = requests.structures.CaseInsensitiveDict(headers or {})
+    r.encoding = "utf-8"
+    r.url = url
+    return r
+
+
+class _Session:
+    """Sesión falsa: devuelve las respuestas en orden y guarda las cabeceras enviadas."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.sent.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+def test_304_se_devuelve_como_200(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    body = b'{"articles": [1, 2, 3]}'
+    session = _Session([
+        _response(200, body, {"ETag": '"abc"', "Content-Type": "application/json"}),
+        _response(304),
+    ])
+
+    first = cache.get(session, "https://api.test/v1", params={"q": "ransomware"})
+    second = cache.get(session, "https://api.test/v1", params={"q": "ransomware"})
+
+    assert session.sent[1]["If-None-Match"] == '"abc"'
+    assert second.status_code == 200 and second.from_cache is True
+    assert second.content == first.content and second.json() == {"articles": [1, 2, 3]}
+    assert second.headers["Content-Type"] == "application/json"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_clave_sin_credenciales(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.sqlite"))
+    base = {"q": "ransomware", "page": 2}
+    key = cache._key("https://api.test/v1", base)
+
+    assert cache._key("https://api.test/v1", {**base, "apiKey": "s3cr3t"}) == key
+    assert cache._key("https://api.test/v1", {**base, "token": "otro"}) == key
+    assert cache._key("https://api.test/v1", {**base, "page": 3}) != key
+
+    # una respuesta sin validadores no se guarda
+    session = _Session([_response(200, b"x"), _response(200, b"y")])
+    cache.get(session, "https://api.test/v1", params=base)
+    cache.get(session, "https://api.test/v1", params=base)
+    assert "If-None-Match" not in session.sent[1] and "If-Modified-Since" not in session.sent[1]
+
+
+def test_sqlite_no_guarda_credenciales(tmp_path):
+    path = tmp_path / "http.sqlite"
+    cache = HttpCache(str(path))
+    url = "https://api.test/v1?q=ransomware&apiKey=s3cr3t&page=2"
+    session = _Session([_response(200, b"{}", {"ETag": '"e1"'}, url=url)])
+    cache.get(session, "https://api.test/v1", params={"q": "ransomware", "apiKey": "s3cr3t", "page": 2})
+    cache._conn.close()
+
+    raw = path.read_bytes()
+    for extra in ("-wal", "-shm"):
+        if (tmp_path / f"http.sqlite{extra}").exists():
+            raw += (tmp_path / f"http.sqlite{extra}").read_bytes()
+    assert b"s3cr3t" not in raw
+
+    conn = sqlite3.connect(str(path))
+    (stored,) = conn.execute("SELECT url FROM http").fetchone()
+    conn.close()
+    assert stored == "https://api.test/v1?q=ransomware&page=2"
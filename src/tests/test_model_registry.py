@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.filters import ModelRegistry
+
+
+def test_release_respeta_otros_taggers():
+    ModelRegistry.invalidate()
+    a = ModelRegistry.get_or_load("k", "modelo", lambda: object())
+    b = ModelRegistry.get_or_load("k", "modelo", lambda: object())
+    assert a is b
+
+    ModelRegistry.release("k", a)  # un tagger descarga: el otro lo sigue usando
+    assert "k" in ModelRegistry.loaded_keys()
+    ModelRegistry.release("k", a)
+    assert "k" not in ModelRegistry.loaded_keys()
+
+
+def test_release_de_pipeline_reemplazado_no_cuenta():
+    ModelRegistry.invalidate()
+    old = ModelRegistry.get_or_load("k", "modelo", lambda: object())
+    new = ModelRegistry.get_or_load("k", "modelo", lambda: object(), variant="int8")
+    assert old is not new
+
+    ModelRegistry.release("k", old)
+    assert "k" in ModelRegistry.loaded_keys()
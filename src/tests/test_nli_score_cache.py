@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.filters.NLIScoreCache import NLIScoreCache
+
+
+def test_get_many_rellena_textos_repetidos(tmp_path):
+    cache = NLIScoreCache(str(tmp_path / "nli.sqlite"))
+    cache.put_many([("a", "x", 0.9), ("a", "y", 0.1), ("b", "x", 0.5)], "tpl", "m")
+
+    found = cache.get_many(["a", "b", "a"], ["x", "y"], "tpl", "m")
+
+    assert found[0] == {"x": 0.9, "y": 0.1}
+    assert found[1] == {"x": 0.5}
+    assert found[2] == found[0]
+    assert cache.hits == 5 and cache.misses == 1
+    cache.close()
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+pytest.importorskip("streamlit")
+pytest.importorskip("numpy")
+
+from src.filters.FilterEngine import FilterEngine
+from src.filters.SemanticPrefilter import SemanticPrefilter
+
+LEVELS = {"1": {"labels": ["incident"]}}
+
+
+class _AcceptAll:
+    def classify_levels(self, items, levels, batch_size=None):
+        dbg = {"accepted": True, "votes": 2, "margin": 0.5, "entropy": 0.1, "stage": "full"}
+        return [{lid: ("incident", 0.9, {}, dbg) for lid, _, _ in levels} for _ in items]
+
+
+class _Engine:
+    apply_filter_ia = True
+    values_levels_ia = LEVELS
+
+
+def _setup(tmp_path, monkeypatch, explore: str, sim: float, lock=None):
+    monkeypatch.setenv("SEMANTIC_CALIB_MIN", "5")
+    monkeypatch.setenv("SEMANTIC_EXPLORE", explore)
+    for var in ("INCIDENT_REJECTS_PATH", "IA_REJECTS_PATH", "AUTO_REJECTS_PATH"):
+        monkeypatch.setenv(var, str(tmp_path / f"{var}.jsonl"))
+    fe = FilterEngine()
+    fe._analyzer = _AcceptAll()
+    prefilter = SemanticPrefilter(cache_path=str(tmp_path / "semantic.sqlite"))
+
+    def similarities(texts, labels):
+        # el embedding no debe correr con el cerrojo del motor tomado
+        assert lock is None or not lock._is_owned()
+        return [sim] * len(texts)
+
+    prefilter.similarities = similarities
+    key = prefilter.label_key(["incident"])
+    prefilter.observe(key, [0.60, 0.62, 0.65, 0.70, 0.72, 0.75])
+    fe._semantic = prefilter
+    return fe, prefilter, key
+
+
+def _entries(fe, n: int) -> list:
+    out = []
+    for i in range(n):
+        item = {"Title": f"Item {i}", "Summary": "", "Year": 2024}
+        ctx = fe._new_ctx(item, "news", fe._item_fingerprint(item))
+        item["_FilterHeurFP"] = ctx["fp"]
+        out.append((item, ctx))
+    return out
+
+
+def test_sin_exploracion_descarta_bajo_el_suelo_y_no_recalibra(tmp_path, monkeypatch):
+    fe, prefilter, key = _setup(tmp_path, monkeypatch, explore="0", sim=0.2)
+    floor = prefilter.floor(key)
+    survivors = fe._run_ai_batch(_Engine(), _entries(fe, 10))
+    assert survivors == []
+    assert prefilter.floor(key) == floor
+
+
+def test_muestra_de_exploracion_llega_a_la_ia_y_baja_el_suelo(tmp_path, monkeypatch):
+    lock = threading.RLock()
+    fe, prefilter, key = _setup(tmp_path, monkeypatch, explore="1", sim=0.2, lock=lock)
+    floor = prefilter.floor(key)
+    survivors = fe._run_ai_batch(_Engine(), _entries(fe, 10), lock=lock)
+    assert len(survivors) == 10  # bajo el suelo, pero en la muestra: los ve la IA
+    assert prefilter.floor(key) < floor  # la cola baja aceptada por la IA entra en la calibración
@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.state import StateManager as state_module
+from src.state.SqliteStateStore import materialize
+from src.state.StateManager import StateManager
+
+ENGINE_STATE = {
+    "raw_items": {
+        "a1": {"Title": "Ransomware at plant", "URL": "https://x.test/a", "Year": 2024},
+        "b2": {"Title": "Dealer breach", "URL": "https://y.test/b", "Year": 2025},
+    },
+    "final_results": {"ransomware at plant": {"Title": "Ransomware at plant"}},
+    "idx_by_url": {"https://x.test/a": "a1", "https://y.test/b": "b2"},
+    "ia_analyzed_ids": ["ransomware at plant"],
+    "next_id": 3,
+}
+RESULTS = {"a1": {"Title": "Ransomware at plant"}}
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_module, "STATE_DIR", tmp_path)
+    yield tmp_path
+    for path in list(StateManager._STORES):
+        StateManager.release_state_file(path)
+    StateManager._WALS.clear()
+    StateManager.unbind()
+
+
+def _save(category: str):
+    StateManager.save_state(
+        category, remaining_keywords=["k2", "k3"], results=RESULTS, engine_state=ENGINE_STATE,
+        analiced_ids=["a1"], status="RUNNING", filter_stats={"total_items": 2},
+    )
+
+
+def _check(state: dict):
+    state = materialize(state)
+    assert state["engine_state"] == ENGINE_STATE
+    assert state["results"] == RESULTS
+    assert state["analiced_ids"] == ["a1"]
+    assert state["remaining_keywords"] == ["k2", "k3"]
+    assert state["filter_stats"] == {"total_items": 2}
+
+
+@pytest.mark.parametrize("backend", ["json", "wal"])
+def test_sqlite_a_json_y_vuelta(state_dir, monkeypatch, backend):
+    monkeypatch.setenv("STATE_BACKEND", "sqlite")
+    sq_path = StateManager.bind_state_basename("news", "origen")
+    _save("news")
+    StateManager.release_state_file(str(sq_path))
+
+    # Sembrar el backend JSON/WAL desde el .sqlite subido (estado perezoso)
+    monkeypatch.setenv("STATE_BACKEND", backend)
+    js_path = StateManager.bind_state_basename("news", "copia", seed_path=str(sq_path))
+    StateManager.release_state_file(str(sq_path))
+    StateManager._WALS.clear()
+    _check(StateManager.load_state("news"))
+
+    # ...y de vuelta a sqlite desde el JSON
+    monkeypatch.setenv("STATE_BACKEND", "sqlite")
+    StateManager.bind_state_basename("news", "vuelta", seed_path=str(js_path))
+    _check(StateManager.load_state("news"))
+
+
+def test_materialize_carga_partes_perezosas(state_dir, monkeypatch):
+    monkeypatch.setenv("STATE_BACKEND", "sqlite")
+    StateManager.bind_state_basename("news", "perezoso")
+    _save("news")
+    state = StateManager.load_state("news")
+    seed = {k: v for k, v in state.items()}
+    assert dict.__len__(seed["engine_state"]) == 0  # aún sin cargar
+    assert json.dumps(seed["engine_state"]) == "{}"  # la ruta en C de json no pasa por los loaders
+    materialize(seed)
+    assert json.loads(json.dumps(seed))["engine_state"] == ENGINE_STATE
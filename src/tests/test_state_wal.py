@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.state import StateManager as state_module
+from src.state.StateManager import StateManager
+from src.state.StateWal import StateWal
+
+
+def _writer(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _wal(tmp_path) -> StateWal:
+    return StateWal(str(tmp_path / "estado.json"), writer=_writer)
+
+
+def _reload(tmp_path) -> dict:
+    return _wal(tmp_path).load()
+
+
+def _ops(wal: StateWal) -> list:
+    with open(wal.wal_path, encoding="utf-8") as f:
+        return [op for line in f for op in json.loads(line)["ops"]]
+
+
+BASE = {
+    "status": "RUNNING",
+    "remaining_keywords": ["k1", "k2", "k3"],
+    "analiced_ids": ["a", "b"],
+    "results": {"a": {"Title": "A"}},
+    "engine_state": {"raw_items": {"a": {"Title": "A"}}, "dirty_ids": [], "next_id": 1},
+}
+
+
+def test_operaciones_se_reproducen(tmp_path):
+    wal = _wal(tmp_path)
+    wal.reset(json.loads(json.dumps(BASE)))
+
+    wal.append({"remaining_keywords": ["k2", "k3"]})                      # trim
+    wal.append({"analiced_ids": ["a", "c"]})                              # srem + sadd
+    wal.append({"results": {"a": {"Title": "A2"}, "b": {"Title": "B"}}})  # set
+    wal.append({"results": {"b": {"Title": "B"}}})                        # del
+    wal.append({"engine_state": {"raw_items": {"a": {"Title": "A"}}, "dirty_ids": ["a"], "next_id": 2}})
+    wal.append({"status": "PAUSED", "extras": {"log": ["x"]}})
+    wal.append({"extras": {"log": ["x", "y"]}})                           # ext
+
+    kinds = {op[0] for op in _ops(wal)}
+    assert {"set", "del", "ext", "trim", "sadd", "srem"} <= kinds
+    assert _reload(tmp_path) == wal.state
+
+
+def test_dicts_que_se_vacian_y_se_llenan(tmp_path):
+    wal = _wal(tmp_path)
+    wal.reset({"results": {"a": {"Title": "A"}}, "cursors": {}})
+    wal.append({"results": {}, "cursors": {"gnews": {"page": 2}}})
+    assert _reload(tmp_path) == {"results": {}, "cursors": {"gnews": {"page": 2}}}
+
+    wal.append({"results": {"z": {"Title": "Z"}}, "cursors": {}})
+    assert _reload(tmp_path) == {"results": {"z": {"Title": "Z"}}, "cursors": {}}
+
+
+def test_linea_truncada_se_descarta(tmp_path):
+    wal = _wal(tmp_path)
+    wal.reset({"status": "RUNNING", "results": {}})
+    wal.append({"results": {"a": {"Title": "A"}}})
+    with open(wal.wal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 99, "ops": [["set", ["stat')  # caída a mitad de escritura
+
+    again = _wal(tmp_path)
+    assert again.load() == {"status": "RUNNING", "results": {"a": {"Title": "A"}}}
+    again.append({"status": "COMPLETED"})
+    assert _reload(tmp_path) == {"status": "COMPLETED", "results": {"a": {"Title": "A"}}}
+
+
+def test_compacta_cada_n_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATE_WAL_COMPACT_EVERY", "50")
+    wal = _wal(tmp_path)
+    wal.reset({"results": {}})
+    for i in range(49):
+        wal.append({"results": {str(j): j for j in range(i + 1)}})
+    assert wal.pending == 49 and os.path.getsize(wal.wal_path) > 0
+
+    wal.append({"results": {str(j): j for j in range(50)}})
+    assert wal.pending == 0 and os.path.getsize(wal.wal_path) == 0
+    with open(wal.json_path, encoding="utf-8") as f:
+        assert json.load(f)["wal_seq"] == 50
+    assert _reload(tmp_path) == {"results": {str(j): j for j in range(50)}}
+
+
+def test_backend_json_lee_log_pendiente(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_module, "STATE_DIR", tmp_path)
+    StateManager._WALS.clear()
+    try:
+        monkeypatch.setenv("STATE_BACKEND", "wal")
+        StateManager.bind_state_basename("news", "mixto")
+        StateManager.init_state("news", ["k1", "k2"])
+        StateManager.patch_state("news", remaining_keywords=["k2"], results={"a": {"Title": "A"}})
+
+        # Se reanuda con el backend por defecto: el log no aplicado no se pierde
+        monkeypatch.setenv("STATE_BACKEND", "json")
+        StateManager._WALS.clear()
+        state = StateManager.load_state("news")
+        assert state["remaining_keywords"] == ["k2"]
+        assert state["results"] == {"a": {"Title": "A"}}
+
+        StateManager.patch_state("news", status="COMPLETED")
+        path = StateManager.current_bound_path("news")
+        assert not os.path.exists(str(path)[:-5] + ".wal.jsonl")
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["status"] == "COMPLETED" and saved["results"] == {"a": {"Title": "A"}}
+    finally:
+        StateManager._WALS.clear()
+        StateManager.unbind()
@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import string
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+pytest.importorskip("streamlit")
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+from src.engines.SearchEngineNews import NewsSearchEngine
+from src.filters.FilterEngine import FilterEngine
+from src.pipeline.StreamingPipeline import StreamingPipeline
+
+
+N_STORIES = 120
+
+
+def _words(i: int, n: int) -> list:
+    """Palabras inventadas y distintas por historia (los titulares no deben parecerse entre historias)."""
+    rnd = random.Random(i)
+    return ["".join(rnd.choice(string.ascii_lowercase) for _ in range(7)) for _ in range(n)]
+
+
+def _desc(i: int) -> str:
+    return " ".join(_words(i, 40)) + "."
+
+
+def _news(i: int, variant: int) -> dict:
+    # dos titulares de la misma historia, sin resumen: solo el resumen enriquecido los une
+    w = _words(i, 8)
+    titles = [" ".join(w[:6]).capitalize(), " ".join(w[2:8]).capitalize()]
+    return {
+        "Title": titles[variant], "Summary": "", "Year": 2024, "Date": "10-03-2024",
+        "URL": f"https://site{variant}-{i}.example/story-{i}", "Source": [f"feed{variant}"],
+        "Language": None, "NeedsEnrichment": True,
+    }
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("FILTER_GATE_ORDER", "year")
+    monkeypatch.setenv("ENRICH_CACHE", "0")
+    monkeypatch.setenv("DOMAIN_HEALTH", "0")
+    monkeypatch.setenv("PIPELINE_MIN_GAP", "0")  # cada historia va a su propio dominio: sin esperas de pacing
+    monkeypatch.setenv("PIPELINE_QUEUE_SIZE", "8")  # colas pequeñas: fuerza backpressure y reencolados
+    for var in ("INCIDENT_REJECTS_PATH", "IA_REJECTS_PATH", "AUTO_REJECTS_PATH"):
+        monkeypatch.setenv(var, str(tmp_path / f"{var}.jsonl"))
+    engine = NewsSearchEngine()
+    fe = FilterEngine()
+    engine.filter_engine = fe
+
+    def fake_fetch(url, check_cache=True):
+        time.sleep(0.001)  # cede el GIL mientras la ingesta sigue en el hilo principal
+        return {"desc": _desc(int(url.rsplit("-", 1)[1])), "lang": "en", "canonical": None}
+
+    engine._fetch_description = fake_fetch
+    return engine, fe
+
+
+def test_ingesta_concurrente_con_etapas(setup):
+    engine, fe = setup
+    pipeline = StreamingPipeline(engine, fe, "news").start()
+
+    # snapshots desde otro hilo mientras se ingiere, como hace main_app entre keywords
+    stop = threading.Event()
+    snapshots = []
+
+    def snapshotter():
+        while not stop.is_set():
+            with pipeline.paused():
+                snapshots.append(len(engine.get_state_snapshot()["raw_items"]))
+            time.sleep(0.002)
+
+    t = threading.Thread(target=snapshotter)
+    t.start()
+    for i in range(N_STORIES):
+        engine.add_or_update_result(_news(i, 0))
+    for i in range(N_STORIES):
+        engine.add_or_update_result(_news(i, 1))
+    pipeline.close()
+    stop.set()
+    t.join()
+
+    assert not [k for k in pipeline.stats if k.endswith("_errors")], dict(pipeline.stats)
+    assert snapshots
+    assert not engine.dirty_ids
+    # cada master vigente tiene su decisión y final_results apunta solo a masters vivos
+    for key, item in engine.raw_items.items():
+        assert item.get("Summary"), key
+        assert item.get("_FilterGate") == "final", key
+    live = {id(it) for it in engine.raw_items.values()}
+    assert all(id(it) in live for it in engine.final_results.values())
+    assert len(engine.final_results) == len(engine.raw_items)
+    assert fe.total_items == len(engine.raw_items)
+
+
+class _FakeTagger:
+    """classify_levels de mentira: acepta las historias pares y anota el tamaño de cada lote."""
+
+    def __init__(self):
+        self.batches = []
+
+    def classify_levels(self, items, levels, batch_size=None):
+        self.batches.append(len(items))
+        time.sleep(0.005)  # inferencia fuera del cerrojo: la ingesta debe seguir mientras tanto
+        out = []
+        for title, _summary in items:
+            ok = random.Random(title.split()[2]).random() < 0.5
+            dbg = {"accepted": ok, "votes": 2, "margin": 0.5, "entropy": 0.1, "stage": "full"}
+            out.append({lid: ("incident" if ok else "other", 0.9, {}, dbg) for lid, _, _ in levels})
+        return out
+
+
+class _FakeStream:
+    def __init__(self):
+        self.written = []
+        self.final = None
+
+    def write(self, item):
+        self.written.append(item["ID"])
+
+    def rewrite(self, items):
+        self.final = [it["ID"] for it in items]
+
+    def close(self):
+        return None
+
+
+class _FakeExporter:
+    def __init__(self):
+        self.stream = _FakeStream()
+
+    def open_enriched_stream(self, item_type, dir_path=None, timestamp_str=None):
+        return self.stream
+
+
+def test_ia_por_lotes_y_ndjson_igual_a_final_results(setup, monkeypatch):
+    monkeypatch.setenv("PIPELINE_AI_BATCH", "16")
+    monkeypatch.setenv("PIPELINE_AI_WAIT_MS", "50")
+    engine, fe = setup
+    fe._gate_order = ["year", "ai"]
+    engine.apply_filter_ia = True
+    engine.values_levels_ia = {"1": {"labels": ["incident", "other"], "bad_labels": ["other"]}}
+    fe._analyzer = tagger = _FakeTagger()
+    exporter = _FakeExporter()
+
+    pipeline = StreamingPipeline(engine, fe, "news", exporter=exporter).start()
+    for variant in (0, 1):
+        for i in range(N_STORIES):
+            engine.add_or_update_result(_news(i, variant))
+    pipeline.close()
+
+    assert not [k for k in pipeline.stats if k.endswith("_errors")], dict(pipeline.stats)
+    assert max(tagger.batches) > 1, tagger.batches
+    # cada master se clasifica una vez por contenido: no más inferencias que evaluaciones de puertas
+    assert sum(tagger.batches) <= fe.gate_stats["year"]["calls"]
+    for key, item in engine.raw_items.items():
+        assert item.get("_FilterGate") in ("final", "ai_zeroshot"), key
+        assert "_FilterHeurFP" not in item
+    kept = sorted(it["ID"] for it in engine.final_results.values())
+    assert exporter.stream.written and sorted(exporter.stream.final) == kept
+    assert len(set(exporter.stream.written)) == len(exporter.stream.written)  # nada cambió tras aceptarse
+
+
+def test_ndjson_refleja_reaceptados_y_descartes(setup, tmp_path):
+    pytest.importorskip("pandas")
+    from src.utils.ExcelResultsExporter import ExcelResultsExporter
+
+    engine, fe = setup
+    pipeline = StreamingPipeline(engine, fe, "news", exporter=ExcelResultsExporter(),
+                                 dir_path=str(tmp_path), timestamp_str="t").start()
+    for i in range(3):
+        engine.add_or_update_result(_news(i, 0))
+    for q in (pipeline.q_enrich, pipeline.q_heur, pipeline.q_ai, pipeline.q_out):
+        q.join()
+    assert pipeline.stats["written"] == 3
+
+    with pipeline.paused():
+        ids = sorted(engine.raw_items)
+        engine.raw_items[ids[0]]["Summary"] = "Nuevo resumen tras revisar la fuente."  # re-aceptado
+        engine.raw_items[ids[1]]["Year"] = 2010                                       # descartado
+        engine.dirty_ids.update(ids[:2])
+    pipeline.feed_pending()
+    path = pipeline.close()
+
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert pipeline.stats["written"] == 4  # la versión nueva se añadió en vivo
+    assert len(lines) == len(engine.final_results) == 2
+    assert ids[1] not in engine.raw_items or engine.raw_items[ids[1]]["Decision"] != "keep"
+    assert any("Nuevo resumen" in json.dumps(rec, ensure_ascii=False) for rec in lines)
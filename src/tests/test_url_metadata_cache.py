@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.utils.UrlMetadataCache import UrlMetadataCache
+
+
+def _age(cache: UrlMetadataCache, url: str, seconds: float):
+    db = cache._db()
+    db.execute("UPDATE url_meta SET fetched_at = ? WHERE url = ?", (time.time() - seconds, cache._key(url)))
+    db.commit()
+
+
+def test_ttl_positivo_y_negativo(tmp_path):
+    cache = UrlMetadataCache(str(tmp_path / "meta.sqlite"), ttl_s=3600, neg_ttl_s=60)
+    ok_url, bad_url = "https://news.test/a?utm_source=x", "https://news.test/bloqueada"
+    cache.put(ok_url, {"desc": "Descripción", "lang": "es", "canonical": None, "etag": '"v1"'})
+    cache.put(bad_url, {"desc": "", "lang": None})
+
+    assert cache.get(ok_url)["desc"] == "Descripción"
+    assert cache.get(bad_url) == {"desc": "", "lang": None, "canonical": None}
+
+    # el negativo caduca mucho antes que el positivo
+    _age(cache, ok_url, 120)
+    _age(cache, bad_url, 120)
+    assert cache.get(ok_url) is not None
+    assert cache.get(bad_url) is None
+
+    _age(cache, ok_url, 7200)
+    assert cache.get(ok_url) is None
+    stale = cache.lookup(ok_url)  # caducado, pero con validadores para un GET condicional
+    assert stale["fresh"] is False and stale["etag"] == '"v1"'
+
+    assert cache.purge_expired() == 2
+    assert cache.lookup(ok_url) is None
@@ -1,8 +1,33 @@
 import os
+import time
+
+from src.utils import HtmlParsing
+
 
 class DescriptionExtractor:
+    """
+    Extrae descripción, idioma y URL canónica de una página.
+
+    Modo streaming (por defecto, EXTRACT_STREAMING=1): lee la respuesta por trozos y para en
+    </head> (o al llegar a EXTRACT_HEAD_MAX_BYTES). Solo si el <head> no trae descripción sigue
+    leyendo hasta el primer <p> (tope EXTRACT_BODY_MAX_BYTES). EXTRACT_STREAMING=0 descarga la
+    página completa.
+
+    El HTML se analiza con HtmlParsing (HTML_PARSER: selectolax/lxml si están instalados,
+    si no el tokenizer de la stdlib; bs4 queda como respaldo). Los cortes de </head> y </p>
+    se detectan sobre los bytes, sin parsear cada trozo.
+
+    Además de {"desc","lang","canonical"}, el resultado lleva "status", "ctype" y "elapsed"
+    (y "error" si hubo excepción) para la salud por dominio, y los validadores "etag" /
+    "last_modified". Con validators={"etag","last_modified"} se hace GET condicional: un 304
+    devuelve status=304 sin descripción (quien llama reutiliza lo que tenía guardado).
+    """
+
     def __init__(self, session=None):
         self.session = session
+        self.streaming = os.getenv("EXTRACT_STREAMING", "1") == "1"
+        self.head_max_bytes = int(os.getenv("EXTRACT_HEAD_MAX_BYTES", str(128 * 1024)))
+        self.body_max_bytes = int(os.getenv("EXTRACT_BODY_MAX_BYTES", str(512 * 1024)))
 
     def _is_text_html(self, r):
         ctype = (r.headers.get("Content-Type") or "").lower()
@@ -18,50 +43,147 @@ class DescriptionExtractor:
             return ""
         return txt[:400] if len(txt) >= 40 else ""
 
-    def extract(self, url: str, timeout: int = 10):
-        from bs4 import BeautifulSoup
+    @staticmethod
+    def _norm_lang(lang):
+        if lang:
+            lang = lang.strip().lower().split("-")[0]
+        return lang or None
+
+    @staticmethod
+    def _headers(validators: dict | None) -> dict:
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    @staticmethod
+    def _note_response(meta: dict, r):
+        meta["status"], meta["ctype"] = r.status_code, r.headers.get("Content-Type")
+        meta["etag"], meta["last_modified"] = r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+    def extract(self, url: str, timeout: int = 10, validators: dict | None = None):
+        meta = {"status": None, "ctype": None}
+        t0 = time.perf_counter()
+        fn = self._extract_streaming if self.streaming else self._extract_full
+        res = fn(url, timeout=timeout, meta=meta, validators=validators)
+        res.update(meta)
+        res["elapsed"] = round(time.perf_counter() - t0, 3)
+        return res
+
+    @staticmethod
+    def _decode(data: bytes, encoding: str | None) -> str:
+        try:
+            return data.decode(encoding or "utf-8", errors="replace")
+        except LookupError:  # charset desconocido en la cabecera
+            return data.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _find_any(data: bytes, needles: tuple) -> int:
+        hits = [i for i in (data.find(n) for n in needles) if i >= 0]
+        return min(hits) if hits else -1
+
+    def _pick(self, info: dict, debug: bool = False):
+        """Resultado a partir de HtmlParsing.page_meta: metas por prioridad y, si no, el primer <p>."""
+        lang = self._norm_lang(info.get("lang"))
+        canonical = info.get("canonical") or None
+        for key in HtmlParsing.META_KEYS:
+            d = self._good_desc(info["metas"].get(key, ""))
+            if d:
+                if debug:
+                    print(f"  ✓ desc via {key} len={len(d)}", flush=True)
+                return {"desc": d, "lang": lang, "canonical": canonical}
+        d = self._good_desc(info.get("p") or "")
+        if d:
+            if debug:
+                print(f"  ✓ desc via <p> len={len(d)}", flush=True)
+            return {"desc": d, "lang": lang, "canonical": canonical}
+        return None
+
+    def _extract_streaming(self, url: str, timeout: int = 10, meta: dict | None = None, validators: dict | None = None):
+        meta = {} if meta is None else meta
+        debug = os.getenv("DEBUG_LOGS", "0") == "1"
+        try:
+            if debug:
+                print(f"🌐 Fetch (head) {url}", flush=True)
+            r = self.session.get(url, timeout=timeout, headers=self._headers(validators), stream=True)
+            self._note_response(meta, r)
+            try:
+                if r.status_code == 304:
+                    if debug:
+                        print("  ↺ 304 Not Modified", flush=True)
+                    return {"desc": "", "lang": None, "canonical": None}
+                if r.status_code >= 400 or not self._is_text_html(r):
+                    if debug:
+                        print(f"  ✖ status={r.status_code} ctype={r.headers.get('Content-Type')}", flush=True)
+                    return {"desc": "", "lang": None, "canonical": None}
+
+                buf = bytearray()
+                head_end = None  # offset de </head> (o <body>) en buf
+                scan = 0         # desde dónde buscar marcadores (con solape entre trozos)
+                res = None
+                for chunk in r.iter_content(chunk_size=8192):
+                    if not chunk:
+                        continue
+                    buf += chunk
+                    low = bytes(buf[scan:]).lower()
+                    if head_end is None:
+                        i = self._find_any(low, (b"</head", b"<body"))
+                        if i < 0:
+                            scan = max(0, len(buf) - 8)
+                            if len(buf) >= self.head_max_bytes:
+                                break  # <head> desmesurado: no seguimos descargando
+                            continue
+                        # <head> completo: basta con una descripción válida; si no, hasta el primer </p>
+                        head_end = scan + i
+                        res = self._pick(HtmlParsing.page_meta(self._decode(bytes(buf[:head_end]), r.encoding)), debug)
+                        if res:
+                            break
+                        scan = head_end
+                        low = bytes(buf[scan:]).lower()
+                    if low.find(b"</p") >= 0 or len(buf) >= self.head_max_bytes + self.body_max_bytes:
+                        break
+                    scan = max(head_end, len(buf) - 4)
+                if debug:
+                    print(f"  ↪ leídos {len(buf)} bytes", flush=True)
+            finally:
+                r.close()
+
+            if res is None and buf:
+                res = self._pick(HtmlParsing.page_meta(self._decode(bytes(buf), r.encoding)), debug)
+            if res:
+                return res
+        except Exception as e:
+            meta["error"] = type(e).__name__
+            if debug:
+                print(f"  ⚠️ extractor error: {e}", flush=True)
+        if debug:
+            print("  ↪ no description found", flush=True)
+        return {"desc": "", "lang": None, "canonical": None}
+
+    def _extract_full(self, url: str, timeout: int = 10, meta: dict | None = None, validators: dict | None = None):
+        meta = {} if meta is None else meta
         debug = os.getenv("DEBUG_LOGS", "0") == "1"
         try:
             if debug:
                 print(f"🌐 Fetch {url}", flush=True)
-            r = self.session.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+            r = self.session.get(url, timeout=timeout, headers=self._headers(validators))
+            self._note_response(meta, r)
+            if r.status_code == 304:
+                if debug:
+                    print("  ↺ 304 Not Modified", flush=True)
+                return {"desc": "", "lang": None, "canonical": None}
             if r.status_code >= 400 or not self._is_text_html(r):
                 if debug:
                     print(f"  ✖ status={r.status_code} ctype={r.headers.get('Content-Type')}", flush=True)
                 return {"desc": "", "lang": None, "canonical": None}
-            soup = BeautifulSoup(r.text, "html.parser")
-
-            # language
-            html_tag = soup.find("html")
-            lang = (html_tag.get("lang") or html_tag.get("xml:lang")) if html_tag else None
-            if lang:
-                lang = lang.strip().lower().split("-")[0]
-
-            # canonical
-            lc = soup.find("link", rel=lambda v: v and "canonical" in v.lower())
-            canonical = (lc.get("href") or "").strip() if lc else None
-
-            for selector, attr, tagname in [
-                ('meta[property="og:description"]', "content", "og:description"),
-                ('meta[name="description"]', "content", "meta:description"),
-                ('meta[name="twitter:description"]', "content", "twitter:description"),
-            ]:
-                tag = soup.select_one(selector)
-                if tag and tag.get(attr):
-                    d = self._good_desc(tag.get(attr))
-                    if d:
-                        if debug:
-                            print(f"  ✓ desc via {tagname} len={len(d)}", flush=True)
-                        return {"desc": d, "lang": lang, "canonical": canonical}
-
-            p = soup.find("p")
-            if p:
-                d = self._good_desc(p.get_text(" "))
-                if d:
-                    if debug:
-                        print(f"  ✓ desc via <p> len={len(d)}", flush=True)
-                    return {"desc": d, "lang": lang, "canonical": canonical}
+            res = self._pick(HtmlParsing.page_meta(r.text), debug)
+            if res:
+                return res
         except Exception as e:
+            meta["error"] = type(e).__name__
             if debug:
                 print(f"  ⚠️ extractor error: {e}", flush=True)
         if debug:
@@ -0,0 +1,143 @@
+# src/utils/DiscardLog.py
+import os
+import gzip
+import json
+import glob
+import shutil
+import threading
+from datetime import datetime
+
+
+class DiscardLog:
+    """
+    Registro append-only (JSONL) de ítems descartados por los filtros.
+
+    - append(): escribe solo los registros nuevos (coste ∝ tamaño del lote, no del histórico).
+    - Rotación opcional por tamaño: el fichero activo pasa a `<base>.<ts>.jsonl[.gz]`.
+    - Lectura paginada y filtrada sobre segmentos rotados + activo, incluyendo el
+      fichero JSON heredado (lista) si existe junto al nuevo.
+
+    Config por entorno:
+      DISCARD_LOG_MAX_MB  → tamaño máx. del fichero activo antes de rotar (0 = sin rotación)
+      DISCARD_LOG_GZIP    → "1" comprime los segmentos rotados (por defecto)
+    """
+
+    def __init__(self, path: str, max_bytes: int | None = None, compress: bool | None = None):
+        # Compatibilidad: rutas antiguas ".json" pasan a ".jsonl" (el .json queda como histórico)
+        if path.endswith(".json"):
+            path = path + "l"
+        self.path = path
+        self.legacy_path = path[:-1] if path.endswith(".jsonl") else None
+
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("DISCARD_LOG_MAX_MB", "0")) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.compress = (os.getenv("DISCARD_LOG_GZIP", "1") == "1") if compress is None else compress
+        self._lock = threading.Lock()
+
+    # ----------------- Escritura -----------------
+    def append(self, records: list) -> int:
+        """Añade los registros al final del fichero activo. Devuelve cuántos se escribieron."""
+        if not records:
+            return 0
+        dirpath = os.path.dirname(self.path)
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+
+        payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(payload)
+            if self.max_bytes and os.path.getsize(self.path) >= self.max_bytes:
+                self._rotate()
+        return len(records)
+
+    def _rotate(self):
+        """Mueve el fichero activo a un segmento con timestamp (y lo comprime si procede)."""
+        base = self.path[:-len(".jsonl")] if self.path.endswith(".jsonl") else self.path
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        seg = f"{base}.{ts}.jsonl"
+        os.replace(self.path, seg)
+        if self.compress:
+            with open(seg, "rb") as src, gzip.open(seg + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(seg)
+
+    # ----------------- Lectura -----------------
+    def segments(self) -> list:
+        """Ficheros a leer en orden cronológico: heredado (.json), rotados y activo."""
+        base = self.path[:-len(".jsonl")] if self.path.endswith(".jsonl") else self.path
+        rotated = sorted(glob.glob(glob.escape(base) + ".*.jsonl") + glob.glob(glob.escape(base) + ".*.jsonl.gz"))
+        files = []
+        if self.legacy_path and os.path.exists(self.legacy_path):
+            files.append(self.legacy_path)
+        files.extend(rotated)
+        if os.path.exists(self.path):
+            files.append(self.path)
+        return files
+
+    @staticmethod
+    def _iter_file(path: str):
+        if path.endswith(".json"):
+            # formato heredado: lista JSON completa
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                return
+            if isinstance(data, list):
+                yield from data
+            return
+
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # línea truncada (p. ej. corte durante la escritura)
+
+    @staticmethod
+    def _match(rec: dict, where: dict | None, predicate=None) -> bool:
+        if where:
+            for k, v in where.items():
+                got = rec.get(k)
+                if isinstance(v, (list, tuple, set)):
+                    if got not in v:
+                        return False
+                elif got != v:
+                    return False
+        if predicate is not None and not predicate(rec):
+            return False
+        return True
+
+    def iter_records(self, where: dict | None = None, predicate=None):
+        """
+        Itera registros (streaming, sin cargar todo en memoria).
+        - where: igualdad por campo, p. ej. {"ItemType": "news", "IA_Level": ["1", "2"]}
+        - predicate: función opcional rec -> bool
+        """
+        for path in self.segments():
+            for rec in self._iter_file(path):
+                if isinstance(rec, dict) and self._match(rec, where, predicate):
+                    yield rec
+
+    def read_page(self, page: int = 0, page_size: int = 100, where: dict | None = None, predicate=None) -> dict:
+        """Devuelve una página de registros filtrados: {"items","page","page_size","has_more"}."""
+        start = max(0, page) * page_size
+        items, seen = [], 0
+        has_more = False
+        for rec in self.iter_records(where=where, predicate=predicate):
+            if seen >= start + page_size:
+                has_more = True
+                break
+            if seen >= start:
+                items.append(rec)
+            seen += 1
+        return {"items": items, "page": page, "page_size": page_size, "has_more": has_more}
+
+    def count(self, where: dict | None = None, predicate=None) -> int:
+        return sum(1 for _ in self.iter_records(where=where, predicate=predicate))
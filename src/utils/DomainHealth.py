@@ -0,0 +1,155 @@
+# src/utils/DomainHealth.py
+import os
+import json
+import time
+import tempfile
+import threading
+
+
+class DomainHealth:
+    """
+    Salud persistente por dominio para el enriquecimiento (JSON, escritura atómica).
+
+    Por dominio guarda intentos, resultados (ok / vacío / bloqueado / error / no-HTML / HTTP≥400),
+    códigos de estado, content-types y latencia media (EWMA). A partir de ahí:
+      - gap(dom, base): pausa entre hits = base × multiplicador (×2 por bloqueo, ×0.8 por acierto).
+      - slots(dom): peticiones simultáneas permitidas (DOMAIN_MAX_CONCURRENCY solo si va bien).
+      - should_skip(dom): tras DOMAIN_SKIP_AFTER fallos seguidos el dominio se aparca
+        DOMAIN_SKIP_HOURS (doble en cada reincidencia, máx. 7 días); al expirar, un intento de prueba.
+
+    Config por entorno:
+      DOMAIN_HEALTH_PATH      → fichero JSON (por defecto output/cache/domain_health.json)
+      DOMAIN_SKIP_AFTER       → fallos consecutivos para aparcar (por defecto 6)
+      DOMAIN_SKIP_HOURS       → horas de la primera suspensión (por defecto 24)
+      DOMAIN_MAX_CONCURRENCY  → peticiones simultáneas para dominios sanos (por defecto 2)
+    """
+
+    BLOCK_STATUSES = (401, 403, 429, 451, 503)
+    MAX_MULT = 32.0
+    MIN_SAMPLES = 5
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("DOMAIN_HEALTH_PATH", "output/cache/domain_health.json")
+        self.skip_after = int(os.getenv("DOMAIN_SKIP_AFTER", "6"))
+        self.skip_s = float(os.getenv("DOMAIN_SKIP_HOURS", "24")) * 3600
+        self.max_slots = max(1, int(os.getenv("DOMAIN_MAX_CONCURRENCY", "2")))
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.domains = self._load()
+
+    # ----------------- Persistencia -----------------
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self.domains, ensure_ascii=False, indent=1, sort_keys=True)
+            self._dirty = False
+        dirpath = os.path.dirname(self.path) or "."
+        os.makedirs(dirpath, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix=".tmp_health_", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    # ----------------- Clasificación -----------------
+    @classmethod
+    def classify(cls, res: dict) -> str:
+        """ok | empty | blocked | error | non_html | http_error a partir del dict del extractor."""
+        res = res or {}
+        if res.get("desc"):
+            return "ok"
+        if "status" not in res:  # extractor sin metadatos HTTP: heurística antigua
+            return "blocked" if res.get("lang") is None else "empty"
+        if res.get("error"):
+            return "error"
+        status = res.get("status")
+        if status is None:
+            return "error"
+        if status in cls.BLOCK_STATUSES:
+            return "blocked"
+        if status >= 400:
+            return "http_error"
+        if "text/html" not in (res.get("ctype") or "").lower():
+            return "non_html"
+        return "empty"
+
+    @classmethod
+    def is_block(cls, res: dict) -> bool:
+        return cls.classify(res) in ("blocked", "error")
+
+    # ----------------- Registro -----------------
+    def _entry(self, dom: str) -> dict:
+        e = self.domains.get(dom)
+        if e is None:
+            e = {"n": 0, "ok": 0, "fails_in_row": 0, "mult": 1.0, "lat_ms": None,
+                 "skip_until": 0.0, "skips": 0, "kinds": {}, "status": {}, "ctype": {}}
+            self.domains[dom] = e
+        return e
+
+    def record(self, dom: str, res: dict):
+        if not dom:
+            return
+        kind = self.classify(res)
+        now = time.time()
+        with self._lock:
+            e = self._entry(dom)
+            e["n"] += 1
+            e["kinds"][kind] = e["kinds"].get(kind, 0) + 1
+            status = str((res or {}).get("status"))
+            e["status"][status] = e["status"].get(status, 0) + 1
+            ctype = ((res or {}).get("ctype") or "").split(";", 1)[0].strip().lower() or "-"
+            e["ctype"][ctype] = e["ctype"].get(ctype, 0) + 1
+            elapsed = (res or {}).get("elapsed")
+            if elapsed is not None:
+                ms = 1000.0 * elapsed
+                e["lat_ms"] = ms if e["lat_ms"] is None else round(0.7 * e["lat_ms"] + 0.3 * ms, 1)
+
+            if kind == "ok":
+                e["ok"] += 1
+                e["fails_in_row"] = 0
+                e["mult"] = max(1.0, e["mult"] * 0.8)
+            else:
+                e["fails_in_row"] += 1
+                if kind in ("blocked", "error"):
+                    e["mult"] = min(self.MAX_MULT, e["mult"] * 2)
+                # sin reset de fails_in_row: al expirar, un fallo más vuelve a aparcarlo (y el doble)
+                if e["fails_in_row"] >= self.skip_after and e["skip_until"] <= now:
+                    e["skips"] += 1
+                    e["skip_until"] = now + min(7 * 86400, self.skip_s * 2 ** (e["skips"] - 1))
+            e["last"] = now
+            self._dirty = True
+        return kind
+
+    # ----------------- Políticas -----------------
+    def should_skip(self, dom: str) -> bool:
+        e = self.domains.get(dom)
+        return bool(e) and e.get("skip_until", 0.0) > time.time()
+
+    def gap(self, dom: str, base: float) -> float:
+        e = self.domains.get(dom)
+        return base * (e["mult"] if e else 1.0)
+
+    def slots(self, dom: str) -> int:
+        e = self.domains.get(dom)
+        if not e or e["n"] < self.MIN_SAMPLES or e["mult"] > 1.0:
+            return 1
+        return self.max_slots if e["ok"] / e["n"] >= 0.8 else 1
+
+    def success_rate(self, dom: str) -> float | None:
+        e = self.domains.get(dom)
+        return (e["ok"] / e["n"]) if e and e["n"] else None
@@ -0,0 +1,158 @@
+# src/utils/EnrichmentQueue.py
+import os
+import time
+import heapq
+
+
+class EnrichmentQueue:
+    """
+    Cola persistente de ítems pendientes de enriquecer (sin rescan de raw_items).
+
+    - Dos heaps: `_delayed` por instante elegible y `_ready` por prioridad (más reciente primero).
+      pop() promociona lo que ya venció y extrae en O(log n).
+    - Cada entrada guarda intentos, siguiente instante elegible y prioridad. defer() reintenta con
+      backoff exponencial (ENRICH_RETRY_BASE_S × 2^intentos) y tras ENRICH_MAX_ATTEMPTS la da por fallida.
+    - Las fallidas no se vuelven a encolar durante ENRICH_FAILED_TTL_H (72 h); después caducan y
+      push() las admite de nuevo. forget() las olvida antes (p. ej. al fusionar masters).
+    - Las entradas extraídas siguen en `entries` hasta done()/defer()/requeue(): si el proceso muere
+      a mitad de tanda, el snapshot las conserva y se reanudan.
+    - Borrado perezoso: cada push lleva un `seq`; las copias antiguas en los heaps se ignoran.
+      `_in_ready` guarda los IDs con copia vigente en `_ready`, así eligible() no recorre la cola.
+    """
+
+    def __init__(self, max_attempts: int | None = None, retry_base_s: float | None = None):
+        self.max_attempts = max_attempts or int(os.getenv("ENRICH_MAX_ATTEMPTS", "4"))
+        self.retry_base_s = retry_base_s if retry_base_s is not None else float(os.getenv("ENRICH_RETRY_BASE_S", "600"))
+        self.failed_ttl_s = float(os.getenv("ENRICH_FAILED_TTL_H", "72")) * 3600
+        self.entries = {}   # mid -> [attempts, next_at, prio, seq]
+        self.failed = {}    # mid -> [intentos agotados, instante del último fallo]
+        self._ready = []    # (prio, seq, mid)
+        self._delayed = []  # (next_at, seq, mid)
+        self._in_ready = set()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, mid):
+        return mid in self.entries
+
+    # ----------------- Altas / bajas -----------------
+    def _schedule(self, mid, attempts: int, next_at: float, prio: float):
+        self._seq += 1
+        self.entries[mid] = [attempts, next_at, prio, self._seq]
+        if next_at <= time.time():
+            heapq.heappush(self._ready, (prio, self._seq, mid))
+            self._in_ready.add(mid)
+        else:
+            heapq.heappush(self._delayed, (next_at, self._seq, mid))
+            self._in_ready.discard(mid)
+
+    def _failed_recently(self, mid, now: float | None = None) -> bool:
+        f = self.failed.get(mid)
+        if f is None:
+            return False
+        if (time.time() if now is None else now) - f[1] <= self.failed_ttl_s:
+            return True
+        del self.failed[mid]  # caducada: vuelve a tener todos sus intentos
+        return False
+
+    def push(self, mid, prio: float = 0.0):
+        """Encola un ítem nuevo (no hace nada si ya está o si agotó sus intentos hace poco)."""
+        if mid in self.entries or self._failed_recently(mid):
+            return
+        self._schedule(mid, 0, 0.0, prio)
+
+    def done(self, mid):
+        self.entries.pop(mid, None)
+        self._in_ready.discard(mid)
+
+    def forget(self, mid):
+        """Quita el ítem de la cola y olvida sus fallos (el ID desaparece o cambia su URL)."""
+        self.done(mid)
+        self.failed.pop(mid, None)
+
+    def prune_failed(self, now: float | None = None) -> int:
+        """Descarta los fallos caducados. Devuelve cuántos."""
+        now = time.time() if now is None else now
+        old = [mid for mid, (_, at) in self.failed.items() if now - at > self.failed_ttl_s]
+        for mid in old:
+            del self.failed[mid]
+        return len(old)
+
+    def requeue(self, mid):
+        """Devuelve a la cola un ítem extraído pero no intentado (sin penalización)."""
+        e = self.entries.get(mid)
+        if e is not None:
+            self._schedule(mid, e[0], e[1], e[2])
+
+    def defer(self, mid, delay: float | None = None, attempt: bool = True):
+        """
+        Reprograma un ítem. attempt=True cuenta como intento fallido (backoff exponencial y
+        posible baja definitiva); delay fija la espera explícitamente (p. ej. dominio aparcado).
+        """
+        e = self.entries.get(mid)
+        if e is None:
+            return
+        attempts = e[0] + (1 if attempt else 0)
+        if attempt and attempts >= self.max_attempts:
+            self.done(mid)
+            self.failed[mid] = [attempts, time.time()]
+            return
+        if delay is None:
+            delay = self.retry_base_s * (2 ** max(0, attempts - 1))
+        self._schedule(mid, attempts, time.time() + delay, e[2])
+
+    # ----------------- Extracción -----------------
+    def _valid(self, seq, mid) -> bool:
+        e = self.entries.get(mid)
+        return e is not None and e[3] == seq
+
+    def _promote(self, now: float):
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, mid = heapq.heappop(self._delayed)
+            if self._valid(seq, mid):
+                heapq.heappush(self._ready, (self.entries[mid][2], seq, mid))
+                self._in_ready.add(mid)
+
+    def pop(self, now: float | None = None):
+        """Siguiente ítem elegible por prioridad, o None si no hay ninguno vencido."""
+        self._promote(time.time() if now is None else now)
+        while self._ready:
+            _, seq, mid = heapq.heappop(self._ready)
+            if self._valid(seq, mid):
+                self.entries[mid][3] = -1  # en vuelo: fuera de los heaps hasta done/defer/requeue
+                self._in_ready.discard(mid)
+                return mid
+        return None
+
+    def eligible(self, now: float | None = None) -> int:
+        """Nº de entradas que ya pueden extraerse (ni diferidas ni en vuelo). O(log n) amortizado."""
+        self._promote(time.time() if now is None else now)
+        return len(self._in_ready)
+
+    def next_eligible(self) -> float | None:
+        """Instante del próximo ítem diferido (None si no hay)."""
+        while self._delayed and not self._valid(self._delayed[0][1], self._delayed[0][2]):
+            heapq.heappop(self._delayed)
+        return self._delayed[0][0] if self._delayed else None
+
+    # ----------------- Snapshot -----------------
+    def to_snapshot(self) -> dict:
+        self.prune_failed()
+        return {
+            "items": [[mid, e[0], e[1], e[2]] for mid, e in self.entries.items()],
+            "failed": dict(self.failed),
+        }
+
+    def load_snapshot(self, snap: dict | None):
+        self.entries, self._ready, self._delayed = {}, [], []
+        self._in_ready = set()
+        snap = snap or {}
+        now = time.time()
+        self.failed = {}
+        for mid, f in (snap.get("failed") or {}).items():
+            # snapshots antiguos: solo el nº de intentos → el TTL empieza a contar ahora
+            self.failed[mid] = [int(f), now] if isinstance(f, (int, float)) else [int(f[0]), float(f[1])]
+        for mid, attempts, next_at, prio in snap.get("items") or []:
+            self._schedule(mid, int(attempts), float(next_at), float(prio))
@@ -5,6 +5,7 @@ import io
 import json
 import re
 import hashlib
+import threading
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -37,6 +38,57 @@ def _ensure_results_dir(dir_path: Optional[str] = None) -> str:
     return abs_dir
 
 
+class EnrichedNdjsonStream:
+    """
+    Escritor NDJSON incremental: un registro enriquecido por línea según van llegando
+    los ítems aceptados (pipeline en streaming). Seguro entre hilos.
+    Mientras corre es un log (un ítem puede aparecer varias veces o acabar descartado);
+    rewrite() lo deja con exactamente los resultados finales.
+    """
+
+    def __init__(self, exporter: "ExcelResultsExporter", category: str, path: str):
+        self.exporter = exporter
+        self.category = category
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def write(self, item: Dict[str, Any]) -> None:
+        export_ts_iso = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        rec = self.exporter._to_enriched_record(item, category=self.category, export_ts_iso=export_ts_iso)
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            self.count += 1
+
+    def rewrite(self, items) -> None:
+        """Sustituye el contenido por estos ítems (escritura atómica vía fichero temporal)."""
+        export_ts_iso = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        tmp = self.path + ".tmp"
+        n = 0
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for item in items:
+                rec = self.exporter._to_enriched_record(item, category=self.category, export_ts_iso=export_ts_iso)
+                fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                n += 1
+        with self._lock:
+            if self._fh and not self._fh.closed:
+                self._fh.close()
+            os.replace(tmp, self.path)
+            self._fh = open(self.path, "a", encoding="utf-8")
+            self.count = n
+
+    def close(self) -> Optional[str]:
+        with self._lock:
+            if self._fh and not self._fh.closed:
+                self._fh.close()
+        if self.count == 0:
+            return None
+        return self.exporter._abs(self.path)
+
+
 @dataclass
 class ExcelResultsExporter:
     """Exporta resultados a Excel/JSON con el esquema requerido + tarjeta de decisión."""
@@ -653,6 +705,21 @@ class ExcelResultsExporter:
             self._assert_written(path)
             return self._abs(path)
 
+    def open_enriched_stream(
+        self,
+        category: str,
+        dir_path: Optional[str] = None,
+        timestamp_str: Optional[str] = None,
+    ) -> EnrichedNdjsonStream:
+        """
+        Abre un NDJSON enriquecido para escritura incremental (un ítem cada vez).
+        Mismo esquema por línea que save_json_enriched_to_disk(ndjson=True).
+        """
+        target_dir = _ensure_results_dir(dir_path)
+        ts = timestamp_str or self._now_madrid_str()
+        path = os.path.join(target_dir, f"results_enriched_{category}_{ts}.stream.jsonl")
+        return EnrichedNdjsonStream(self, category, path)
+
     def save_multi_json_enriched_to_disk(
         self,
         results_by_category: Dict[str, Dict[str, Dict[str, Any]]],
@@ -0,0 +1,272 @@
+# src/utils/HtmlParsing.py
+import os
+from html.parser import HTMLParser
+
+# Parsers en C opcionales: si no están instalados se usa el tokenizer de la stdlib
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except Exception:
+    LexborHTMLParser = None
+
+try:
+    from lxml import html as lxml_html
+except Exception:
+    lxml_html = None
+
+try:
+    from bs4 import BeautifulSoup
+except Exception:
+    BeautifulSoup = None
+
+
+# Orden de preferencia en modo auto (HTML_PARSER=auto)
+BACKENDS = ("selectolax", "lxml", "tokenizer", "bs4")
+
+META_KEYS = ("og:description", "meta:description", "twitter:description")
+
+
+# ----------------------------------------------------------------------
+# Tokenizer (stdlib): sin árbol, solo lo que usa el extractor / MITRE
+# ----------------------------------------------------------------------
+class _HeadParser(HTMLParser):
+    """
+    Parser (stdlib) de lo que usa el extractor: <html lang>, <link rel=canonical>,
+    <meta> de descripción y el texto del primer <p>.
+    """
+
+    _META_KEYS = {
+        ("property", "og:description"): "og:description",
+        ("name", "description"): "meta:description",
+        ("name", "twitter:description"): "twitter:description",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lang = None
+        self.canonical = None
+        self.metas = {}          # "og:description" | ... -> content
+        self.p_text = None       # texto del primer <p> (None = aún no cerrado)
+        self._p_depth = 0
+        self._p_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        a = {k.lower(): (v or "") for k, v in attrs}
+        if tag == "html":
+            self.lang = self.lang or (a.get("lang") or a.get("xml:lang") or None)
+        elif tag == "link" and self.canonical is None:
+            if "canonical" in a.get("rel", "").lower():
+                self.canonical = a.get("href", "").strip()
+        elif tag == "meta":
+            for attr in ("property", "name"):
+                key = self._META_KEYS.get((attr, a.get(attr, "").strip().lower()))
+                if key and key not in self.metas and a.get("content"):
+                    self.metas[key] = a["content"]
+        elif tag == "p" and self.p_text is None:
+            self._p_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "p" and self._p_depth:
+            self._p_depth -= 1
+            if not self._p_depth:
+                self.p_text = " ".join(self._p_parts)
+
+    def handle_data(self, data):
+        if self._p_depth and self.p_text is None:
+            self._p_parts.append(data)
+
+
+class _RowParser(HTMLParser):
+    """Filas de <table>: lista de textos de sus <td>."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._tables = 0
+        self._row = None
+        self._cell = None
+
+    def _flush_cell(self):
+        # <td> sin cerrar: lo cierra el siguiente <td>, el fin de fila o el fin de tabla (como en HTML5)
+        if self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._tables += 1
+        elif tag == "tr" and self._tables:
+            self._flush_cell()
+            self._row = []
+            self.rows.append(self._row)
+        elif tag == "td" and self._row is not None:
+            self._flush_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "tr"):
+            self._flush_cell()
+        elif tag == "table" and self._tables:
+            self._flush_cell()
+            self._tables -= 1
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def _tokenizer_meta(html: str) -> dict:
+    p = _HeadParser()
+    p.feed(html)
+    p.close()
+    first_p = p.p_text if p.p_text is not None else (" ".join(p._p_parts) or None)
+    return {"lang": p.lang, "canonical": p.canonical or None, "metas": p.metas, "p": first_p}
+
+
+def _tokenizer_rows(html: str) -> list:
+    p = _RowParser()
+    p.feed(html)
+    p.close()
+    return p.rows
+
+
+# ----------------------------------------------------------------------
+# selectolax (lexbor, C)
+# ----------------------------------------------------------------------
+_CSS_METAS = (
+    ('meta[property="og:description"]', "og:description"),
+    ('meta[name="description"]', "meta:description"),
+    ('meta[name="twitter:description"]', "twitter:description"),
+)
+
+
+def _selectolax_meta(html: str) -> dict:
+    tree = LexborHTMLParser(html)
+    root = tree.css_first("html")
+    attrs = root.attributes if root is not None else {}
+    canonical = None
+    for node in tree.css("link[rel]"):
+        if "canonical" in (node.attributes.get("rel") or "").lower():
+            canonical = (node.attributes.get("href") or "").strip() or None
+            break
+    metas = {}
+    for css, key in _CSS_METAS:
+        node = tree.css_first(css)
+        content = node.attributes.get("content") if node is not None else None
+        if content:
+            metas[key] = content
+    p = tree.css_first("p")
+    return {
+        "lang": attrs.get("lang") or attrs.get("xml:lang") or None,
+        "canonical": canonical,
+        "metas": metas,
+        "p": p.text(separator=" ") if p is not None else None,
+    }
+
+
+def _selectolax_rows(html: str) -> list:
+    tree = LexborHTMLParser(html)
+    return [[td.text() for td in tr.css("td")] for tr in tree.css("table tr")]
+
+
+# ----------------------------------------------------------------------
+# lxml (libxml2, C)
+# ----------------------------------------------------------------------
+_XPATH_METAS = (
+    ('//meta[@property="og:description"]/@content', "og:description"),
+    ('//meta[@name="description"]/@content', "meta:description"),
+    ('//meta[@name="twitter:description"]/@content', "twitter:description"),
+)
+
+
+def _lxml_meta(html: str) -> dict:
+    doc = lxml_html.document_fromstring(html)
+    canonical = None
+    for node in doc.iter("link"):
+        if "canonical" in (node.get("rel") or "").lower():
+            canonical = (node.get("href") or "").strip() or None
+            break
+    metas = {}
+    for xpath, key in _XPATH_METAS:
+        found = [c for c in doc.xpath(xpath) if c]
+        if found:
+            metas[key] = str(found[0])
+    p = next(doc.iter("p"), None)
+    return {
+        "lang": doc.get("lang") or doc.get("xml:lang") or None,
+        "canonical": canonical,
+        "metas": metas,
+        "p": p.text_content() if p is not None else None,
+    }
+
+
+def _lxml_rows(html: str) -> list:
+    doc = lxml_html.document_fromstring(html)
+    return [[td.text_content() for td in tr.xpath("./td")] for tr in doc.xpath("//table//tr")]
+
+
+# ----------------------------------------------------------------------
+# BeautifulSoup + html.parser (comportamiento original)
+# ----------------------------------------------------------------------
+def _bs4_meta(html: str) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+    html_tag = soup.find("html")
+    lang = (html_tag.get("lang") or html_tag.get("xml:lang")) if html_tag else None
+    lc = soup.find("link", rel=lambda v: v and "canonical" in v.lower())
+    canonical = (lc.get("href") or "").strip() if lc else None
+    metas = {}
+    for css, key in _CSS_METAS:
+        tag = soup.select_one(css)
+        if tag and tag.get("content"):
+            metas[key] = tag.get("content")
+    p = soup.find("p")
+    return {"lang": lang, "canonical": canonical or None, "metas": metas, "p": p.get_text(" ") if p else None}
+
+
+def _bs4_rows(html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    return [[td.get_text() for td in tr.find_all("td")] for tr in soup.select("table tr")]
+
+
+_IMPL = {
+    "selectolax": (_selectolax_meta, _selectolax_rows, lambda: LexborHTMLParser is not None),
+    "lxml": (_lxml_meta, _lxml_rows, lambda: lxml_html is not None),
+    "tokenizer": (_tokenizer_meta, _tokenizer_rows, lambda: True),
+    "bs4": (_bs4_meta, _bs4_rows, lambda: BeautifulSoup is not None),
+}
+
+
+def available_backends() -> list[str]:
+    return [name for name in BACKENDS if _IMPL[name][2]()]
+
+
+def resolve_backend(name: str | None = None) -> str:
+    """Backend efectivo: HTML_PARSER (auto|selectolax|lxml|tokenizer|bs4); si no está instalado, el primero disponible."""
+    name = (name or os.getenv("HTML_PARSER", "auto")).strip().lower()
+    if name in _IMPL and _IMPL[name][2]():
+        return name
+    return available_backends()[0]
+
+
+def _run(op: int, html: str, backend: str | None):
+    name = resolve_backend(backend)
+    try:
+        return _IMPL[name][op](html or "")
+    except Exception:
+        # entrada que el parser rápido no traga: se repite con el de siempre
+        fallback = "bs4" if _IMPL["bs4"][2]() else "tokenizer"
+        if fallback == name:
+            raise
+        return _IMPL[fallback][op](html or "")
+
+
+def page_meta(html: str, backend: str | None = None) -> dict:
+    """
+    {"lang", "canonical", "metas": {"og:description"|"meta:description"|"twitter:description": str},
+     "p": texto del primer <p> o None}
+    """
+    return _run(0, html, backend)
+
+
+def table_rows(html: str, backend: str | None = None) -> list:
+    """Filas de `table tr` como listas con el texto de cada <td> (sin strip)."""
+    return _run(1, html, backend)
@@ -0,0 +1,147 @@
+# src/utils/HttpCache.py
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class HttpCache:
+    """
+    GET condicional (ETag / Last-Modified) con cuerpos comprimidos en SQLite.
+
+    - Solo se guardan respuestas 200 que traen validadores (ETag o Last-Modified).
+    - En la siguiente petición a la misma URL+params se envían If-None-Match / If-Modified-Since;
+      si el servidor contesta 304 se devuelve un Response 200 reconstruido desde la caché
+      (atributo from_cache=True), así que el código de las APIs no cambia.
+    - Las credenciales (api_key, apiKey, token...) no forman parte de la clave ni se guardan en la URL.
+
+    Config por entorno:
+      HTTP_CACHE_PATH          → SQLite (por defecto output/cache/http.sqlite)
+      HTTP_CACHE_MAX_BYTES     → tamaño máximo de cuerpo cacheado (por defecto 5 MiB)
+      HTTP_CACHE_MAX_AGE_DAYS  → antigüedad máxima de una entrada para revalidar (por defecto 30)
+    """
+
+    _SECRET_PARAMS = {"api_key", "apikey", "token", "key", "access_token"}
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("HTTP_CACHE_PATH", "output/cache/http.sqlite")
+        self.max_bytes = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(5 * 1024 * 1024)))
+        self.max_age_s = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "30")) * 86400
+        self.hits = 0      # 304 servidos desde caché
+        self.misses = 0    # peticiones completas
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(self.path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS http ("
+                " k TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+                " headers TEXT, encoding TEXT, body BLOB NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _key(self, url: str, params) -> str:
+        items = []
+        if isinstance(params, dict):
+            items = sorted((str(k), str(v)) for k, v in params.items() if str(k).lower() not in self._SECRET_PARAMS)
+        elif params:
+            items = [("", str(params))]
+        return hashlib.sha1(json.dumps([url, items], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _redact(cls, url: str | None) -> str | None:
+        """URL sin los parámetros de credenciales (la de la respuesta trae la query completa)."""
+        if not url:
+            return url
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in cls._SECRET_PARAMS]
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def _lookup(self, key: str):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT url, etag, last_modified, headers, encoding, body, stored_at FROM http WHERE k = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[6] > self.max_age_s:
+            return None
+        return row
+
+    def _store(self, key: str, resp):
+        body = resp.content or b""
+        if len(body) > self.max_bytes:
+            return
+        keep = {h: resp.headers[h] for h in ("Content-Type", "ETag", "Last-Modified") if resp.headers.get(h)}
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO http (k, url, etag, last_modified, headers, encoding, body, stored_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, self._redact(resp.url), resp.headers.get("ETag"), resp.headers.get("Last-Modified"),
+                 json.dumps(keep), resp.encoding, zlib.compress(body, 6), time.time()),
+            )
+            db.commit()
+
+    def _touch(self, key: str):
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE http SET stored_at = ? WHERE k = ?", (time.time(), key))
+            db.commit()
+
+    @staticmethod
+    def _replay(row, resp_304):
+        """Response 200 reconstruido con el cuerpo cacheado (para que el llamante no note el 304)."""
+        url, _, _, headers, encoding, body, _ = row
+        r = requests.Response()
+        r.status_code = 200
+        r.reason = "OK (not modified)"
+        r._content = zlib.decompress(body)
+        r.headers = CaseInsensitiveDict(json.loads(headers or "{}"))
+        r.encoding = encoding
+        r.url = getattr(resp_304, "url", None) or url
+        r.request = getattr(resp_304, "request", None)
+        r.elapsed = getattr(resp_304, "elapsed", r.elapsed)
+        r.from_cache = True
+        return r
+
+    def get(self, session, url: str, params=None, headers=None, **kwargs):
+        """session.get() con validadores; 304 → Response reconstruido desde la caché."""
+        key = self._key(url, params)
+        try:
+            row = self._lookup(key)
+        except sqlite3.Error:
+            row = None
+        hdrs = dict(headers or {})
+        if row is not None:
+            if row[1]:
+                hdrs["If-None-Match"] = row[1]
+            if row[2]:
+                hdrs["If-Modified-Since"] = row[2]
+
+        resp = session.get(url, params=params, headers=hdrs or None, **kwargs)
+
+        try:
+            if resp.status_code == 304 and row is not None:
+                self.hits += 1
+                self._touch(key)
+                return self._replay(row, resp)
+            self.misses += 1
+            if resp.status_code == 200 and (resp.headers.get("ETag") or resp.headers.get("Last-Modified")):
+                self._store(key, resp)
+        except sqlite3.Error:
+            pass
+        return resp
@@ -0,0 +1,110 @@
+# src/utils/UrlMetadataCache.py
+import os
+import time
+import sqlite3
+import threading
+
+from src.utils.Methods import Methods
+
+
+class UrlMetadataCache:
+    """
+    Caché persistente (SQLite) de resultados de DescriptionExtractor por URL normalizada.
+
+    - Positivos (hay descripción): se reutilizan durante ENRICH_CACHE_TTL_DAYS (30 días).
+    - Negativos (sin descripción / bloqueado): durante ENRICH_NEG_TTL_H (12 h), para no
+      volver a pedir la misma URL fallida en cada keyword o ejecución.
+
+    get() devuelve el dict del extractor ({"desc","lang","canonical"}) o None si no hay
+    entrada vigente. lookup() devuelve también entradas caducadas con sus validadores
+    (etag / last_modified) para revalidar con un GET condicional.
+    """
+
+    def __init__(self, path: str | None = None, ttl_s: float | None = None, neg_ttl_s: float | None = None):
+        self.path = path or os.getenv("ENRICH_CACHE_PATH", "output/cache/url_metadata.sqlite")
+        self.ttl_s = ttl_s if ttl_s is not None else float(os.getenv("ENRICH_CACHE_TTL_DAYS", "30")) * 86400
+        self.neg_ttl_s = neg_ttl_s if neg_ttl_s is not None else float(os.getenv("ENRICH_NEG_TTL_H", "12")) * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            dirpath = os.path.dirname(self.path)
+            if dirpath:
+                os.makedirs(dirpath, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS url_meta ("
+                " url TEXT PRIMARY KEY, desc TEXT, lang TEXT, canonical TEXT,"
+                " ok INTEGER NOT NULL, fetched_at REAL NOT NULL, etag TEXT, last_modified TEXT)"
+            )
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(url_meta)")}
+            for col in ("etag", "last_modified"):
+                if col not in cols:  # cachés creadas antes de guardar validadores
+                    conn.execute(f"ALTER TABLE url_meta ADD COLUMN {col} TEXT")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return Methods.normalize_url(url) or (url or "").strip()
+
+    def lookup(self, url: str) -> dict | None:
+        """Entrada guardada (vigente o no): desc/lang/canonical + etag/last_modified + fresh."""
+        key = self._key(url)
+        if not key:
+            return None
+        with self._lock:
+            row = self._db().execute(
+                "SELECT desc, lang, canonical, ok, fetched_at, etag, last_modified FROM url_meta WHERE url = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        desc, lang, canonical, ok, fetched_at, etag, last_modified = row
+        ttl = self.ttl_s if ok else self.neg_ttl_s
+        return {
+            "desc": desc or "", "lang": lang, "canonical": canonical,
+            "etag": etag, "last_modified": last_modified,
+            "fresh": time.time() - fetched_at <= ttl,
+        }
+
+    def get(self, url: str) -> dict | None:
+        entry = self.lookup(url)
+        if entry is None or not entry["fresh"]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"desc": entry["desc"], "lang": entry["lang"], "canonical": entry["canonical"]}
+
+    def put(self, url: str, res: dict):
+        key = self._key(url)
+        if not key:
+            return
+        res = res or {}
+        ok = 1 if res.get("desc") else 0
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO url_meta (url, desc, lang, canonical, ok, fetched_at, etag, last_modified)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, res.get("desc") or "", res.get("lang"), res.get("canonical"), ok, time.time(),
+                 res.get("etag"), res.get("last_modified")),
+            )
+            db.commit()
+
+    def purge_expired(self) -> int:
+        """Borra entradas caducadas. Devuelve cuántas."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            cur = db.execute(
+                "DELETE FROM url_meta WHERE (ok = 1 AND fetched_at < ?) OR (ok = 0 AND fetched_at < ?)",
+                (now - self.ttl_s, now - self.neg_ttl_s),
+            )
+            db.commit()
+            return cur.rowcount